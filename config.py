@@ -1,10 +1,19 @@
+import getpass
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent
 
+# Stats are kept in STATS_DIR; STATS_FILE is the single-file format of older versions.
 STATS_FILE = BASE_DIR / 'german_stats.json'
+STATS_DIR = BASE_DIR / 'german_stats'
+STATS_TIER_THRESHOLD = 1000 # items after which a stats category moves to the on-disk item store
+STATS_HOT_ITEMS = 2000 # items of such categories kept in memory (LRU)
+SYNC_FILE = BASE_DIR / 'german_sync.json'
 DATA_DIR = BASE_DIR / 'data'
 I18N_DIR = BASE_DIR / 'i18n'
+TRANSLATIONS_DIR = DATA_DIR / 'translations'
+MODES_FILE = BASE_DIR / 'modes.json'
 
 REGULAR_VERBS_FILE = DATA_DIR / 'regular_verbs.json'
 IRREGULAR_VERBS_FILE = DATA_DIR / 'irregular_verbs.json'
@@ -13,6 +22,46 @@ NOUNS_FILE = DATA_DIR / 'nouns.json'
 ARTICLES_FILE = DATA_DIR / 'articles.json'
 PERSONAL_PRONOUNS_FILE = DATA_DIR / 'personal_pronouns.json'
 CASE_SENTENCES_FILE = DATA_DIR / 'case_sentences.json'
+SENTENCE_FRAMES_FILE = DATA_DIR / 'sentence_frames.json'
 MODAL_VERBS_FILE = DATA_DIR / 'modal_verbs.json'
 W_FRAGEN_FILE = DATA_DIR / 'w_fragen.json'
-CONJUNCTIONS_FILE = DATA_DIR / 'conjunctions.json'
\ No newline at end of file
+CONJUNCTIONS_FILE = DATA_DIR / 'conjunctions.json'
+
+RAPID_FIRE_TIME_LIMIT = 5 # seconds per answer
+RAPID_FIRE_ROUND_LENGTH = 20
+
+CORPUS_POLL_INTERVAL = 2 # seconds between checks of the data files
+ANKI_BATCH_SIZE = 2000 # notes read from an Anki collection per query
+NOUN_REVIEW_CONFIDENCE = 0.7 # predicted genders/plurals below this are tagged for review
+
+ITEM_DIFFICULTY_FILE = DATA_DIR / 'item_difficulty.json'
+IRT_MIN_ANSWERS = 5 # answers over all learners before an item's difficulty is published
+IRT_L2 = 0.5 # prior that pulls abilities and difficulties towards the average
+
+DECAY_HALF_LIFE = 14 * 86400 # seconds until an answer counts half
+ADAPTIVE_MIN_EVIDENCE = 2 # decayed answers needed before an item's own accuracy is used
+ADAPTIVE_MEDIUM_ACCURACY = 0.6
+ADAPTIVE_HARD_ACCURACY = 0.85
+MIX_DUE_AFTER = 86400 # seconds without practice after which a topic counts as fully due
+SHUFFLE_BAG_RECENT = 3 # last drawn items a shuffle bag does not repeat
+SHUFFLE_BAG_WEAK_PROBES = 2000 # random items checked for weakness per round in decks without key lookup
+
+# Practice history tiers: (name, bucket width in seconds, buckets kept)
+HISTORY_TIERS = (
+    ('hour', 3600, 48),
+    ('day', 86400, 90),
+    ('week', 7 * 86400, 104)
+)
+
+USER_ID = os.environ.get('DEUTSCH_USER') or getpass.getuser()
+LEADERBOARD_FILE = BASE_DIR / 'leaderboard.json'
+LEADERBOARD_WEEKS = 8 # weekly boards kept
+# Class the learner belongs to; answers are added to the class dashboard when set.
+GROUP_ID = os.environ.get('DEUTSCH_GROUP')
+CLASSROOM_FILE = BASE_DIR / 'classroom.json'
+CLASSROOM_ACTIVE_WINDOW = 7 * 86400 # seconds since the last answer for a learner to count as active
+# Sharded server: learner stats live in LEARNERS_DIR/<user>, owned by one worker process each.
+LEARNERS_DIR = BASE_DIR / 'learners'
+SHARD_WORKERS = os.cpu_count() or 1
+SHARD_VNODES = 64 # points per worker on the hash ring; more points spread the users more evenly
+SHARD_PIPELINE_DEPTH = 2 # batches sent to a worker before the router waits for its replies
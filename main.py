@@ -1,84 +1,81 @@
+import argparse
 import config
-from utils.ui import clear_screen
+from utils.ui import Frame
 from utils.localization import Localization
-from modules.verb_trainer import VerbTrainer
-from modules.noun_trainer import NounTrainer
-from modules.case_trainer import CaseTrainer
-from utils.file_handler import load_json, save_json
-from modules.modal_verb_trainer import ModalVerbTrainer
-from modules.vocabulary_trainer import VocabularyTrainer
+from utils.stats_store import load_stats
+from utils.mode_registry import ModeRegistry
+from utils.stats_manager import on_score_change, on_answer_counted
+from utils.leaderboard import LeaderboardService
+from utils.classroom import ClassroomService
+from utils.timeseries import series, sparkline
+from utils.protocol import run_jsonl
 
 def main():
     """Main function to run the application."""
-    lang_code = select_language()
+    parser = argparse.ArgumentParser(description="German grammar trainer.")
+    parser.add_argument('--protocol', choices=('tty', 'jsonl'), default='tty',
+                        help="jsonl: read commands and write events as JSON lines, for driving the trainer from another process")
+    parser.add_argument('--lang', choices=('en', 'ru'), help="interface language (asked at start in tty mode, default en in jsonl mode)")
+    args = parser.parse_args()
+
+    if args.lang:
+        lang_code = args.lang
+    else:
+        lang_code = 'en' if args.protocol == 'jsonl' else select_language()
     loc = Localization(lang_code)
 
-    stats = load_json(config.STATS_FILE)
-    if stats is None:
-        stats = get_default_stats()
+    stats = load_stats()
 
-    default_stats = get_default_stats()
-    for category in default_stats:
-        if category not in stats:
-            stats[category] = default_stats[category]
+    leaderboard = LeaderboardService.load()
+    leaderboard.set_total(config.USER_ID, stats['total_score'])
+    on_score_change(lambda stats, points: leaderboard.record(config.USER_ID, points, stats['total_score']))
+
+    classroom = None
+    if config.GROUP_ID:
+        classroom = ClassroomService.load()
+        classroom.join(config.GROUP_ID, config.USER_ID, stats)
+        on_answer_counted(lambda stats, category, key, is_correct:
+                          classroom.record(config.GROUP_ID, config.USER_ID, category, key, is_correct))
+
+    registry = ModeRegistry()
+    if args.protocol == 'jsonl':
+        run_jsonl(registry, loc, stats, lambda: save_all(stats, leaderboard, classroom))
+        return
+
+    stats_choice = str(len(registry) + 1)
+    exit_choice = str(len(registry) + 2)
 
     while True:
-        clear_screen()
-        print(loc.get('app_title'))
-        print(loc.get('current_score', score=stats['total_score']))
-        print("\n" + loc.get('choose_mode'))
-        
-        print(loc.get('menu_verbs'))
-        print(loc.get('menu_nouns'))
-        print(loc.get('menu_cases'))
-        print(loc.get('menu_modals'))
-        print(loc.get('menu_w_fragen'))
-        print(loc.get('menu_conjunctions'))
-
-        print(loc.get('menu_stats'))
-        print(loc.get('menu_exit'))
+        frame = Frame(clear=True).add(
+            loc.get('app_title'),
+            loc.get('current_score', score=stats['total_score']),
+            "\n" + loc.get('choose_mode')
+        )
+        for number, mode in enumerate(registry, 1):
+            frame.add(f"{number}. {loc.get(mode['menu_key'])}")
+        frame.add(
+            f"{stats_choice}. {loc.get('menu_stats')}",
+            f"{exit_choice}. {loc.get('menu_exit')}"
+        ).render()
         
         choice = input(loc.get('enter_number'))
-        
-        trainer = None
 
         try:
-            if choice == '1':
-                trainer = VerbTrainer(loc)
-            elif choice == '2':
-                trainer = NounTrainer(loc)
-            elif choice == '3':
-                trainer = CaseTrainer(loc)
-            elif choice == '4':
-                trainer = ModalVerbTrainer(loc)
-            elif choice == '5':
-                trainer = VocabularyTrainer(
-                    loc, 
-                    data_file=config.W_FRAGEN_FILE, 
-                    category_key='w_fragen', 
-                    title_key='mode_w_fragen_title'
-                )
-            elif choice == '6':
-             trainer = VocabularyTrainer(
-                loc, 
-                data_file=config.CONJUNCTIONS_FILE, 
-                category_key='conjunctions', 
-                title_key='mode_conjunctions_title'
-            )
-            elif choice == '7':
-                display_stats(stats, loc)
+            if choice == stats_choice:
+                display_stats(stats, loc, leaderboard)
                 continue
-            elif choice == '8':
+            elif choice == exit_choice:
                 print(loc.get('goodbye'))
                 break
+            elif choice.isdigit() and 1 <= int(choice) <= len(registry):
+                trainer = registry.create(registry.modes[int(choice) - 1], loc)
             else:
                 print(loc.get('invalid_input'))
                 input(loc.get('press_enter'))
                 continue
 
-            if trainer:
-                trainer.run(stats)
-                save_json(config.STATS_FILE, stats)
+            trainer.run(stats)
+            save_all(stats, leaderboard, classroom)
 
         except FileNotFoundError as e:
             print(f"Error: {e}")
@@ -87,118 +84,87 @@ def main():
              print(f"An unexpected error occurred: {e}")
              input(loc.get('press_enter'))
 
+def save_all(stats, leaderboard, classroom):
+    stats.save()
+    leaderboard.save()
+    if classroom:
+        classroom.save()
+
 def select_language():
     """Prompts the user to select a language."""
     while True:
-        clear_screen()
-        print("--- Language Selection / Выбор языка ---")
-        print("1. English")
-        print("2. Русский")
+        Frame(clear=True).add(
+            "--- Language Selection / Выбор языка ---",
+            "1. English",
+            "2. Русский"
+        ).render()
         choice = input("\nChoose your language / Выберите язык (1-2): ")
         if choice == '1':
             return 'en'
         if choice == '2':
             return 'ru'
 
-def get_default_stats():
-    """Returns a default stats structure."""
-    pronoun_rules = load_json(config.PRONOUN_RULES_FILE) or []
-    pronoun_groups = {rule['group']: rule['ending'] for rule in pronoun_rules}
-    articles = load_json(config.ARTICLES_FILE) or {}
-    article_keys = {f"{gender}-{case}": {"correct": 0, "incorrect": 0} 
-                    for gender in articles for case in articles[gender]}
-
-    pronouns = load_json(config.PERSONAL_PRONOUNS_FILE) or {}
-    pronoun_keys = {f"{pronoun}-{case}": {"correct": 0, "incorrect": 0}
-                    for case in pronouns for pronoun in pronouns[case]}
-
-    
-    return {
-        "total_score": 0,
-        "endings": {e: {"correct": 0, "incorrect": 0} for e in pronoun_groups.values()},
-        "pronoun_groups": {g: {"correct": 0, "incorrect": 0} for g in pronoun_groups.keys()},
-        "articles": {
-            "der": {"correct": 0, "incorrect": 0},
-            "die": {"correct": 0, "incorrect": 0},
-            "das": {"correct": 0, "incorrect": 0}
-        },
-        "singular_plural": {
-            "main": {"correct": 0, "incorrect": 0}
-        },
-        "article_declension": article_keys,
-        "pronoun_declension": pronoun_keys,
-        "modal_verbs": {}
-    }
-
-def display_stats(stats, loc):
+def display_stats(stats, loc, leaderboard):
     """Displays user statistics."""
-    clear_screen()
-    print(loc.get('stats_title'))
-    print(loc.get('total_score', score=stats['total_score']))
+    week = leaderboard.week()
+    frame = Frame(clear=True).add(
+        loc.get('stats_title'),
+        loc.get('total_score', score=stats['total_score']),
+        loc.get('leaderboard_rank', rank=leaderboard.total.rank(config.USER_ID), count=len(leaderboard.total)),
+        loc.get('leaderboard_week', points=week.scores.get(config.USER_ID, 0),
+                rank=week.rank(config.USER_ID) or '-', count=len(week)) + "\n"
+    )
+
+    cache = stats.cache_info()
+    if cache['tiered']:
+        # Only learners with big categories have a tiered store worth sizing.
+        frame.add(loc.get('stats_cache', hits=cache['hits'], misses=cache['misses'], rate=cache['hit_rate'],
+                          size=cache['size'], capacity=cache['capacity']) + "\n")
+
+    days = series(stats, 'day', 14)
+    weeks = series(stats, 'week', 8)
+    frame.add(
+        loc.get('stats_history_title'),
+        loc.get('history_daily', chart=sparkline([answers for _, answers, _ in days]),
+                answers=sum(answers for _, answers, _ in days)),
+        loc.get('history_weekly', accuracy=" ".join(
+            f"{correct / answers:.0%}".rjust(4) if answers else "   -" for _, answers, correct in weeks)) + "\n"
+    )
     
-    print(loc.get('stats_endings_title'))
-    for ending, data in stats['endings'].items():
-        correct, incorrect = data['correct'], data['incorrect']
-        total = correct + incorrect
-        percentage = correct / total if total > 0 else 0
-        bar = '█' * int(percentage * 20)
-        print(f"{ending.ljust(4)} [{bar.ljust(20)}] {percentage:.0%}")
-
-    print(loc.get('stats_pronouns_title'))
-    for group, data in stats['pronoun_groups'].items():
-        correct, incorrect = data['correct'], data['incorrect']
-        total = correct + incorrect
-        percentage = correct / total if total > 0 else 0
-        bar = '█' * int(percentage * 20)
-        print(f"{group.ljust(20)} [{bar.ljust(20)}] {percentage:.0%}")
-
-    print(loc.get('stats_articles_title'))
+    frame.add(loc.get('stats_endings_title'))
+    for ending, data in stats.get('endings', {}).items():
+        frame.add(_stat_line(ending, data, 4))
+
+    frame.add(loc.get('stats_pronouns_title'))
+    for group, data in stats.get('pronoun_groups', {}).items():
+        frame.add(_stat_line(group, data, 20))
+
+    frame.add(loc.get('stats_articles_title'))
     for article, data in stats.get('articles', {}).items():
-        correct, incorrect = data['correct'], data['incorrect']
-        total = correct + incorrect
-        percentage = correct / total if total > 0 else 0
-        bar = '█' * int(percentage * 20)
-        print(f"{article.ljust(4)} [{bar.ljust(20)}] {percentage:.0%}")
+        frame.add(_stat_line(article, data, 4))
     
-    print(loc.get('stats_plurals_title'))
+    frame.add(loc.get('stats_plurals_title'))
     sp_data = stats.get('singular_plural', {}).get('main', {"correct": 0, "incorrect": 0})
-    correct, incorrect = sp_data['correct'], sp_data['incorrect']
+    frame.add(_stat_line('Singular/Plural', sp_data, 20))
+
+    for category, title_key in [('article_declension', 'stats_article_decl_title'),
+                                ('pronoun_declension', 'stats_pronoun_decl_title'),
+                                ('modal_verbs', 'stats_modals_title')]:
+        if category in stats and any(v['correct'] or v['incorrect'] for v in stats[category].values()):
+            frame.add(loc.get(title_key))
+            for key, data in sorted(stats[category].items()):
+                if data['correct'] + data['incorrect'] > 0:
+                    frame.add(_stat_line(key, data, 20))
+    
+    frame.render()
+    input(f"\n{loc.get('press_enter')}")
+
+def _stat_line(label, data, width):
+    correct, incorrect = data['correct'], data['incorrect']
     total = correct + incorrect
     percentage = correct / total if total > 0 else 0
     bar = '█' * int(percentage * 20)
-    print(f"{'Singular/Plural'.ljust(20)} [{bar.ljust(20)}] {percentage:.0%}")
-
-    if 'article_declension' in stats and any(v['correct'] or v['incorrect'] for v in stats['article_declension'].values()):
-        print(loc.get('stats_article_decl_title'))
-        for key, data in sorted(stats['article_declension'].items()):
-            correct, incorrect = data['correct'], data['incorrect']
-            total = correct + incorrect
-            if total > 0:
-                percentage = correct / total
-                bar = '█' * int(percentage * 20)
-                print(f"{key.ljust(20)} [{bar.ljust(20)}] {percentage:.0%}")
-    
-    if 'pronoun_declension' in stats and any(v['correct'] or v['incorrect'] for v in stats['pronoun_declension'].values()):
-        print(loc.get('stats_pronoun_decl_title'))
-        for key, data in sorted(stats['pronoun_declension'].items()):
-            correct, incorrect = data['correct'], data['incorrect']
-            total = correct + incorrect
-            if total > 0:
-                percentage = correct / total
-                bar = '█' * int(percentage * 20)
-                print(f"{key.ljust(20)} [{bar.ljust(20)}] {percentage:.0%}")
-
-    if 'modal_verbs' in stats and any(v['correct'] or v['incorrect'] for v in stats['modal_verbs'].values()):
-        print(loc.get('stats_modals_title'))
-        for key, data in sorted(stats['modal_verbs'].items()):
-            correct, incorrect = data['correct'], data['incorrect']
-            total = correct + incorrect
-            if total > 0:
-                percentage = correct / total
-                bar = '█' * int(percentage * 20)
-                print(f"{key.ljust(20)} [{bar.ljust(20)}] {percentage:.0%}")
-    
-    input(f"\n{loc.get('press_enter')}")
+    return f"{label.ljust(width)} [{bar.ljust(20)}] {percentage:.0%}"
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,26 +1,85 @@
 import random
 from utils.file_handler import load_json
-from utils.ui import clear_screen
+from utils.records import SentenceTask, build_records
+from utils.ui import Frame
+from utils.stats_manager import count_answer, add_score
+from utils.quiz import Question, QuizRunner, choose_difficulty
+from utils.adaptive import resolve_difficulty
+from utils.scheduler import QuestionSource
+from utils.shuffle_bag import Sampler
+from utils.deck import Deck, choose_items
+from utils.corpus_watcher import default_watcher
+from utils.translations import translate
+from utils.sentence_generator import load_space
 import config
 
 class CaseTrainer:
-    def __init__(self, loc):
+    def __init__(self, loc, sampling='random'):
+        """:param sampling: выбор предложений: 'random' или 'bag'"""
         self.loc = loc
+        self.samplers = {kind: Sampler(f"case_{kind}", sampling, weak_keys=self._stats_keys)
+                         for kind in ('articles', 'pronouns', 'generated')}
         self.articles = load_json(config.ARTICLES_FILE)
         self.pronouns = load_json(config.PERSONAL_PRONOUNS_FILE)
-        self.sentences = load_json(config.CASE_SENTENCES_FILE)
+        sentences = self._load_sentences()
+        self.generated = load_space()
         
-        if not all([self.articles, self.pronouns, self.sentences]):
+        if not all([self.articles, self.pronouns, sentences, self.generated]):
             raise FileNotFoundError("Could not load one or more data files for the case trainer.")
 
+        self.decks = {kind: Deck(tasks, text_fields=('sentence', 'noun', 'pronoun_nom'),
+                                 facet_fields=('gender', 'case', 'noun', 'pronoun_nom'), extra_text=self._translation,
+                                 sources=[config.CASE_SENTENCES_FILE])
+                      for kind, tasks in sentences.items()}
+        self.session_sentences = dict(self.decks)
+        default_watcher.watch(config.CASE_SENTENCES_FILE, self._reload_sentences)
+        default_watcher.watch(config.SENTENCE_FRAMES_FILE, self._reload_generated)
+        default_watcher.watch(config.NOUNS_FILE, self._reload_generated)
+        default_watcher.watch(config.ARTICLES_FILE, self._reload_tables)
+        default_watcher.watch(config.PERSONAL_PRONOUNS_FILE, self._reload_tables)
+
+    def _stats_keys(self, task):
+        # The keys the questions about a task are counted under, so weak forms refill the bag.
+        if task.pronoun_nom:
+            return [('pronoun_declension', f"{task.pronoun_nom}-{task.case}")]
+        return [('article_declension', f"{task.gender}-{task.case}")]
+
+    def _translation(self, task):
+        return translate(task, 'case_sentences', task.id, self.loc.language)
+
+    def _load_sentences(self):
+        sentences = load_json(config.CASE_SENTENCES_FILE)
+        if not sentences:
+            return None
+        return {kind: build_records(tasks, SentenceTask, f"{config.CASE_SENTENCES_FILE} [{kind}]")
+                for kind, tasks in sentences.items()}
+
+    def _reload_sentences(self, path):
+        sentences = self._load_sentences()
+        if sentences:
+            for kind, deck in self.decks.items():
+                if sentences.get(kind):
+                    deck.update(sentences[kind])
+
+    def _reload_tables(self, path):
+        # Declension tables are plain JSON; a file that does not parse keeps the loaded table.
+        self.articles = load_json(config.ARTICLES_FILE) or self.articles
+        self.pronouns = load_json(config.PERSONAL_PRONOUNS_FILE) or self.pronouns
+
+    def _reload_generated(self, path):
+        # The space holds no sentences, only frames and nouns, so it is simply rebuilt.
+        self.generated = load_space() or self.generated
+
     def run(self, stats):
         """Main entry point for the case trainer module."""
         while True:
-            clear_screen()
-            print(self.loc.get('choose_case_mode'))
-            print(self.loc.get('case_mode_1'))
-            print(self.loc.get('case_mode_2'))
-            print(self.loc.get('case_mode_3'))
+            Frame(clear=True).add(
+                self.loc.get('choose_case_mode'),
+                self.loc.get('case_mode_1'),
+                self.loc.get('case_mode_2'),
+                self.loc.get('case_mode_3'),
+                self.loc.get('case_mode_4')
+            ).render()
             choice = input(self.loc.get('enter_number'))
             
             if choice == '1':
@@ -32,195 +91,157 @@ class CaseTrainer:
             elif choice == '3':
                 self._run_definite_article_drill(stats)
                 break
+            elif choice == '4':
+                self._run_generated(stats)
+                break
             else:
                 print(self.loc.get('invalid_input'))
                 input(self.loc.get('press_enter'))
     
-    def _run_article_declension(self, stats):
-        difficulty = self._choose_difficulty()
-        clear_screen()
-        print(self.loc.get('mode_title', mode=5, title=self.loc.get('mode_5_title'), difficulty=difficulty.upper()))
-        print(self.loc.get('exit_to_menu_prompt'))
+    def question_sources(self, stats, difficulty):
+        """Question kinds of this trainer for the mixed mode."""
+        on_answer = lambda question, is_correct: self._update_stats(stats, question.category, question.key, is_correct)
+        return [
+            QuestionSource('case_articles', 'article_declension', 'mode_5_title', lambda: self._make_article_declension_question(stats, difficulty), on_answer),
+            QuestionSource('case_pronouns', 'pronoun_declension', 'mode_6_title', lambda: self._make_pronoun_declension_question(stats, difficulty), on_answer)
+        ]
+
+    def _run_quiz(self, stats, next_question, runner=None):
+        runner = runner or QuizRunner(self.loc)
+        runner.run(
+            stats,
+            next_question,
+            lambda question, is_correct: self._update_stats(stats, question.category, question.key, is_correct)
+        )
 
-        while True:
-            task = random.choice(self.sentences['articles'])
-            sentence_template = task['sentence']
-            gender = task['gender']
-            case = task['case']
-            noun = task['noun']
-            correct_answer = self.articles[gender][case]['bestimmter']
-            
-            print(self.loc.get('current_score', score=stats['total_score']))
-            print(self.loc.get('question_fill_blank'))
-            
-            print(f"  {sentence_template.format(blank='___')}")
-            if 'translation' in task and self.loc.language in task['translation']:
-                translation_text = task['translation'][self.loc.language]
-                print(f"  {self.loc.get('translation_hint', text=translation_text)}")
-            
-            gender_article = self.articles[gender]['nominativ']['bestimmter']
-            print(self.loc.get('prompt_details_article', case=case.capitalize(), gender_article=gender_article, noun=noun))
-
-            user_answer = ""
-            if difficulty == 'easy':
-                options = list({
-                    correct_answer, 
-                    self.articles[gender]['nominativ']['bestimmter'],
-                    self.articles[gender]['dativ']['bestimmter'] if case != 'dativ' else self.articles[gender]['akkusativ']['bestimmter']
-                })
-                random.shuffle(options)
-                for i, option in enumerate(options, 1):
-                    print(f"{i}. {option}")
-                user_choice = input(f"\n{self.loc.get('your_choice', options=f'1-{len(options)}')} ").lower()
-                if user_choice == 'm': break
-                try:
-                    user_answer = options[int(user_choice) - 1]
-                except (ValueError, IndexError):
-                    print(f"\n⚠️ {self.loc.get('invalid_input')}\n")
-                    continue
-            elif difficulty == 'medium':
-                 hint = correct_answer[0] + "_" * (len(correct_answer) - 1)
-                 user_answer = input(f"\n{self.loc.get('enter_answer_prompt')} ({hint}): ").strip().lower()
-                 if user_answer == 'm': break
-            else: # hard
-                user_answer = input(f"\n{self.loc.get('enter_answer_prompt')}").strip().lower()
-                if user_answer == 'm': break
-
-            stat_key = f"{gender}-{case}"
-            if user_answer == correct_answer:
-                print(self.loc.get('correct'))
-                self._update_stats(stats, 'article_declension', stat_key, True)
-            else:
-                print(self.loc.get('incorrect', answer=correct_answer))
-                self._update_stats(stats, 'article_declension', stat_key, False)
-            
-            print("-" * 20)
+    def _run_article_declension(self, stats):
+        difficulty = choose_difficulty(self.loc)
+        self.session_sentences['articles'] = choose_items(self.loc, self.decks['articles'])
+        Frame(clear=True).add(
+            self.loc.get('mode_title', mode=5, title=self.loc.get('mode_5_title'), difficulty=difficulty.upper()),
+            self.loc.get('exit_to_menu_prompt')
+        ).render()
+        self._run_quiz(stats, lambda: self._make_article_declension_question(stats, difficulty))
+
+    def _make_article_declension_question(self, stats, difficulty, task=None):
+        put_back = None
+        if task is None:
+            task, put_back = self.samplers['articles'].choose(stats, self.session_sentences['articles'])
+        sentence_template = task.sentence
+        gender = task.gender
+        case = task.case
+        noun = task.noun
+        correct_answer = self.articles[gender][case]['bestimmter']
+
+        lines = [self.loc.get('question_fill_blank'), f"  {sentence_template.format(blank='___')}"]
+        translation_text = self._translation(task)
+        if translation_text:
+            lines.append(f"  {self.loc.get('translation_hint', text=translation_text)}")
+        
+        gender_article = self.articles[gender]['nominativ']['bestimmter']
+        lines.append(self.loc.get('prompt_details_article', case=case.capitalize(), gender_article=gender_article, noun=noun))
+
+        question = Question(lines, correct_answer, category='article_declension', key=f"{gender}-{case}", on_discard=put_back)
+        difficulty = resolve_difficulty(stats, difficulty, question.category, question.key)
+        if difficulty == 'easy':
+            question.options = list({
+                correct_answer, 
+                self.articles[gender]['nominativ']['bestimmter'],
+                self.articles[gender]['dativ']['bestimmter'] if case != 'dativ' else self.articles[gender]['akkusativ']['bestimmter']
+            })
+            random.shuffle(question.options)
+        elif difficulty == 'medium':
+            question.hint = correct_answer[0] + "_" * (len(correct_answer) - 1)
+        return question
 
     def _run_pronoun_declension(self, stats):
-        difficulty = self._choose_difficulty()
-        clear_screen()
-        print(self.loc.get('mode_title', mode=6, title=self.loc.get('mode_6_title'), difficulty=difficulty.upper()))
-        print(self.loc.get('exit_to_menu_prompt'))
-
-        while True:
-            task = random.choice(self.sentences['pronouns'])
-            sentence_template = task['sentence']
-            pronoun_nom = task['pronoun_nom']
-            case = task['case']
-            correct_answer = self.pronouns[case][pronoun_nom]
-
-            print(self.loc.get('current_score', score=stats['total_score']))
-            print(self.loc.get('question_fill_blank'))
-
-            pronoun_display = pronoun_nom
-            if 'key' in task:
-                 pronoun_display += f" {self.loc.get(task['key'])}"
-            print(f"  {sentence_template.format(blank=f'___ ({pronoun_display})')}")
-            if 'translation' in task and self.loc.language in task['translation']:
-                translation_text = task['translation'][self.loc.language]
-                print(f"  {self.loc.get('translation_hint', text=translation_text)}")
-
-            user_answer = ""
-            if difficulty == 'easy':
-                other_case = 'dativ' if case == 'akkusativ' else 'akkusativ'
-                options = [correct_answer, self.pronouns[other_case][pronoun_nom]]
-                random.shuffle(options)
-                for i, option in enumerate(options, 1):
-                    print(f"{i}. {option}")
-                user_choice = input(f"\n{self.loc.get('your_choice', options='1-2')} ").lower()
-                if user_choice == 'm': break
-                try:
-                    user_answer = options[int(user_choice) - 1]
-                except (ValueError, IndexError):
-                    user_answer = ""
-                    print(f"\n⚠️ {self.loc.get('invalid_input')}\n")
-                    continue
-            elif difficulty == 'medium':
-                hint = correct_answer[0] + "_" * (len(correct_answer) - 1)
-                user_answer = input(f"\n{self.loc.get('enter_answer_prompt')} ({hint}): ").strip().lower()
-                if user_answer == 'm': break
-            else: # hard
-                user_answer = input(f"\n{self.loc.get('enter_answer_prompt')}").strip().lower()
-                if user_answer == 'm': break
-            
-            stat_key = f"{pronoun_nom}-{case}"
-            if user_answer == correct_answer:
-                print(self.loc.get('correct'))
-                self._update_stats(stats, 'pronoun_declension', stat_key, True)
-            else:
-                print(self.loc.get('incorrect', answer=correct_answer))
-                self._update_stats(stats, 'pronoun_declension', stat_key, False)
-
-            print("-" * 20)
+        difficulty = choose_difficulty(self.loc)
+        self.session_sentences['pronouns'] = choose_items(self.loc, self.decks['pronouns'])
+        Frame(clear=True).add(
+            self.loc.get('mode_title', mode=6, title=self.loc.get('mode_6_title'), difficulty=difficulty.upper()),
+            self.loc.get('exit_to_menu_prompt')
+        ).render()
+        self._run_quiz(stats, lambda: self._make_pronoun_declension_question(stats, difficulty))
+
+    def _make_pronoun_declension_question(self, stats, difficulty, task=None):
+        put_back = None
+        if task is None:
+            task, put_back = self.samplers['pronouns'].choose(stats, self.session_sentences['pronouns'])
+        sentence_template = task.sentence
+        pronoun_nom = task.pronoun_nom
+        case = task.case
+        correct_answer = self.pronouns[case][pronoun_nom]
+
+        pronoun_display = pronoun_nom
+        if task.key:
+             pronoun_display += f" {self.loc.get(task.key)}"
+        lines = [self.loc.get('question_fill_blank'), f"  {sentence_template.format(blank=f'___ ({pronoun_display})')}"]
+        translation_text = self._translation(task)
+        if translation_text:
+            lines.append(f"  {self.loc.get('translation_hint', text=translation_text)}")
+
+        question = Question(lines, correct_answer, category='pronoun_declension', key=f"{pronoun_nom}-{case}", on_discard=put_back)
+        difficulty = resolve_difficulty(stats, difficulty, question.category, question.key)
+        if difficulty == 'easy':
+            other_case = 'dativ' if case == 'akkusativ' else 'akkusativ'
+            question.options = [correct_answer, self.pronouns[other_case][pronoun_nom]]
+            random.shuffle(question.options)
+        elif difficulty == 'medium':
+            question.hint = correct_answer[0] + "_" * (len(correct_answer) - 1)
+        return question
     
+    def _run_generated(self, stats):
+        """Mode 4: sentences built from frames and nouns, so they do not repeat."""
+        difficulty = choose_difficulty(self.loc)
+        Frame(clear=True).add(
+            self.loc.get('mode_title', mode=9, title=self.loc.get('mode_generated_title'), difficulty=difficulty.upper()),
+            self.loc.get('generated_space_size', count=len(self.generated)),
+            self.loc.get('exit_to_menu_prompt')
+        ).render()
+        self._run_quiz(stats, lambda: self._make_generated_question(stats, difficulty))
+
+    def _make_generated_question(self, stats, difficulty):
+        # Both samplers draw an index, and only that one sentence is built.
+        task, put_back = self.samplers['generated'].choose(stats, self.generated)
+        if task.pronoun_nom:
+            question = self._make_pronoun_declension_question(stats, difficulty, task)
+        else:
+            question = self._make_article_declension_question(stats, difficulty, task)
+        question.on_discard = put_back
+        return question
+
     def _run_definite_article_drill(self, stats):
         """Mode 3: Rapid Fire Definite Articles."""
-        difficulty = self._choose_difficulty()
-        clear_screen()
-        print(self.loc.get('mode_title', mode=8, title=self.loc.get('mode_8_title'), difficulty=difficulty.upper()))
-        print(self.loc.get('exit_to_menu_prompt'))
+        difficulty = choose_difficulty(self.loc)
+        Frame(clear=True).add(
+            self.loc.get('mode_title', mode=8, title=self.loc.get('mode_8_title'), difficulty=difficulty.upper()),
+            self.loc.get('rapid_fire_rules', questions=config.RAPID_FIRE_ROUND_LENGTH, seconds=config.RAPID_FIRE_TIME_LIMIT),
+            self.loc.get('exit_to_menu_prompt')
+        ).render()
 
+        runner = QuizRunner(self.loc, time_limit=config.RAPID_FIRE_TIME_LIMIT, round_length=config.RAPID_FIRE_ROUND_LENGTH)
+        self._run_quiz(stats, lambda: self._make_definite_article_question(stats, difficulty), runner)
+
+    def _make_definite_article_question(self, stats, difficulty):
         genders = ['maskulin', 'feminin', 'neutral', 'plural']
         cases = ['nominativ', 'akkusativ', 'dativ', 'genitiv']
-
-        while True:
-            gender = random.choice(genders)
-            case = random.choice(cases)
-            correct_answer = self.articles[gender][case]['bestimmter']
-
-            print(self.loc.get('current_score', score=stats['total_score']))
-            print(self.loc.get('question_def_article', gender=gender.capitalize(), case=case.capitalize()))
-
-            user_answer = ""
-            if difficulty == 'easy':
-                options = ['der', 'die', 'das', 'den', 'dem', 'des']
-                # Filter options to always include correct answer and some random others
-                current_options = list(set([correct_answer] + random.sample(options, 3)))
-                random.shuffle(current_options)
-                
-                for i, option in enumerate(current_options, 1):
-                    print(f"{i}. {option}")
-                
-                user_choice = input(f"\n{self.loc.get('your_choice', options=f'1-{len(current_options)}')} ").lower()
-                if user_choice == 'm': break
-                try:
-                    user_answer = current_options[int(user_choice) - 1]
-                except (ValueError, IndexError):
-                    print(f"\n⚠️ {self.loc.get('invalid_input')}\n")
-                    continue
-            else:
-                user_answer = input(self.loc.get('enter_answer_prompt')).strip().lower()
-                if user_answer == 'm': break
-
-            stat_key = f"{gender}-{case}"
-            if user_answer == correct_answer:
-                print(self.loc.get('correct'))
-                self._update_stats(stats, 'article_declension', stat_key, True)
-            else:
-                print(self.loc.get('incorrect', answer=correct_answer))
-                self._update_stats(stats, 'article_declension', stat_key, False)
-            
-            print("-" * 20)
-
-    def _choose_difficulty(self):
-        while True:
-            print(self.loc.get('choose_difficulty'))
-            print(self.loc.get('difficulty_easy'))
-            print(self.loc.get('difficulty_medium'))
-            print(self.loc.get('difficulty_hard'))
-            choice = input(self.loc.get('your_choice', options="1-3") + " ")
-            if choice == '1': return 'easy'
-            if choice == '2': return 'medium'
-            if choice == '3': return 'hard'
-            print(self.loc.get('invalid_input'))
+        gender = random.choice(genders)
+        case = random.choice(cases)
+        correct_answer = self.articles[gender][case]['bestimmter']
+
+        question = Question([self.loc.get('question_def_article', gender=gender.capitalize(), case=case.capitalize())],
+                            correct_answer, category='article_declension', key=f"{gender}-{case}")
+        difficulty = resolve_difficulty(stats, difficulty, question.category, question.key)
+        if difficulty == 'easy':
+            options = ['der', 'die', 'das', 'den', 'dem', 'des']
+            # Filter options to always include correct answer and some random others
+            question.options = list(set([correct_answer] + random.sample(options, 3)))
+            random.shuffle(question.options)
+        return question
 
     def _update_stats(self, stats, category, key, is_correct):
-        if key not in stats[category]:
-             stats[category][key] = {"correct": 0, "incorrect": 0}
-
         if is_correct:
-            stats['total_score'] += 2
-            stats[category][key]['correct'] += 1
+            add_score(stats, 2)
         else:
-            stats['total_score'] = max(0, stats['total_score'] - 1)
-            stats[category][key]['incorrect'] += 1
\ No newline at end of file
+            add_score(stats, -1)
+        count_answer(stats, category, key, is_correct)
\ No newline at end of file
@@ -0,0 +1,47 @@
+import random
+from utils.ui import Frame
+from utils.quiz import QuizRunner
+from utils.scheduler import Scheduler
+from utils.mode_registry import ModeRegistry
+
+class MixedTrainer:
+    """Daily mix: one session that draws questions from all other trainers, weakest topics first."""
+    def __init__(self, loc, modes, session_length=20, quotas=None):
+        """
+        :param modes: id режимов из modes.json, из которых берутся вопросы
+        :param session_length: число вопросов в сессии
+        :param quotas: максимальное число вопросов на категорию статистики
+        """
+        self.loc = loc
+        self.session_length = session_length
+        self.quotas = quotas
+        registry = ModeRegistry()
+        self.trainers = [registry.create(registry.get(mode_id), loc) for mode_id in modes]
+
+    def question_sources(self, stats, difficulty):
+        """Question kinds of all trainers in the mix."""
+        return [source for trainer in self.trainers for source in trainer.question_sources(stats, difficulty)]
+
+    def run(self, stats):
+        sources = self.question_sources(stats, 'adaptive')
+        # Sources with equal priority (e.g. without any stats yet) are asked in random order.
+        random.shuffle(sources)
+        scheduler = Scheduler(sources, stats, self.quotas)
+        sources_by_id = {source.source_id: source for source in sources}
+
+        def next_question():
+            source = scheduler.next()
+            question = source.next_question()
+            question.source = source.source_id
+            question.lines = [f"[{self.loc.get(source.title_key)}]", *question.lines]
+            return question
+
+        Frame(clear=True).add(
+            self.loc.get('mode_mix_title', questions=self.session_length),
+            self.loc.get('exit_to_menu_prompt')
+        ).render()
+        QuizRunner(self.loc, round_length=self.session_length).run(
+            stats,
+            next_question,
+            lambda question, is_correct: sources_by_id[question.source].on_answer(question, is_correct)
+        )
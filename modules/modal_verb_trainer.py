@@ -1,121 +1,114 @@
 import random
-from utils.file_handler import load_json
-from utils.ui import clear_screen
+from utils.file_handler import load_records
+from utils.records import ModalVerb, PronounRule
+from utils.ui import Frame
+from utils.stats_manager import count_answer, add_score
+from utils.translations import translate
+from utils.quiz import Question, QuizRunner, choose_difficulty
+from utils.adaptive import resolve_difficulty
+from utils.scheduler import QuestionSource
+from utils.shuffle_bag import Sampler
+from utils.corpus_watcher import default_watcher
 import config
 
 class ModalVerbTrainer:
-    def __init__(self, loc):
+    def __init__(self, loc, sampling='random'):
+        """:param sampling: выбор модальных глаголов: 'random' или 'bag'"""
         self.loc = loc
-        self.modal_verbs = load_json(config.MODAL_VERBS_FILE)
-        self.pronoun_rules = load_json(config.PRONOUN_RULES_FILE)
+        # A verb is weak if any of its forms is: the pronoun is chosen apart from the verb.
+        self.sampler = Sampler('modal_verbs', sampling, weak_keys=lambda verb: [
+            ('modal_verbs', f"{verb.infinitive}-{rule.pronoun}") for rule in self.pronoun_rules])
+        self.modal_verbs = load_records(config.MODAL_VERBS_FILE, ModalVerb)
+        self.pronoun_rules = load_records(config.PRONOUN_RULES_FILE, PronounRule)
         
         if not self.modal_verbs or not self.pronoun_rules:
             raise FileNotFoundError("Could not load modal verbs or pronoun rules data.")
+        default_watcher.watch(config.MODAL_VERBS_FILE, self._reload_modal_verbs)
+        default_watcher.watch(config.PRONOUN_RULES_FILE, self._reload_pronoun_rules)
+
+    def _reload_modal_verbs(self, path):
+        # A short list without indexes: it is replaced, and the bag sees a new deck.
+        self.modal_verbs = load_records(path, ModalVerb) or self.modal_verbs
+
+    def _reload_pronoun_rules(self, path):
+        self.pronoun_rules = load_records(path, PronounRule) or self.pronoun_rules
 
     def run(self, stats):
         """Main entry point for the modal verb trainer module."""
-        difficulty = self._choose_difficulty()
+        difficulty = choose_difficulty(self.loc)
         self._run_conjugation(stats, difficulty)
 
+    def question_sources(self, stats, difficulty):
+        """Question kinds of this trainer for the mixed mode."""
+        on_answer = lambda question, is_correct: self._update_stats(stats, question.category, question.key, is_correct)
+        return [
+            QuestionSource('modal_verbs', 'modal_verbs', 'mode_7_title', lambda: self._make_conjugation_question(stats, difficulty), on_answer)
+        ]
+
     def _get_correct_form(self, verb_data, pronoun_rule):
         """Determines the correct conjugated form of a modal verb."""
-        pronoun = pronoun_rule['pronoun']
-        key = pronoun_rule.get('key')
+        pronoun = pronoun_rule.pronoun
+        key = pronoun_rule.key
         
         if pronoun in ['ich', 'er', 'es'] or key == 'she':
-            return verb_data['forms']['ich/er/sie/es']
+            return verb_data.forms['ich/er/sie/es']
         if pronoun == 'du':
-            return verb_data['forms']['du']
+            return verb_data.forms['du']
         if pronoun == 'ihr':
-            return verb_data['forms']['ihr']
+            return verb_data.forms['ihr']
         # Default for wir, sie (they), Sie (formal)
-        return verb_data['forms']['wir/sie_plural/Sie']
+        return verb_data.forms['wir/sie_plural/Sie']
 
     def _run_conjugation(self, stats, difficulty):
-        clear_screen()
-        print(self.loc.get('mode_title', mode=7, title=self.loc.get('mode_7_title'), difficulty=difficulty.upper()))
-        print(self.loc.get('exit_to_menu_prompt'))
-
-        while True:
-            verb_data = random.choice(self.modal_verbs)
-            pronoun_rule = random.choice(self.pronoun_rules)
-            
-            infinitive = verb_data['infinitive']
-            correct_answer = self._get_correct_form(verb_data, pronoun_rule)
-
-            pronoun_display = pronoun_rule['pronoun']
-            if 'key' in pronoun_rule:
-                pronoun_display += f" {self.loc.get(pronoun_rule['key'])}"
-            
-            print(self.loc.get('current_score', score=stats['total_score']))
-            print(self.loc.get('question_modal', pronoun=pronoun_display, infinitive=infinitive))
-            
-            verb_translation = verb_data['translation'][self.loc.language]
-            print(f"  ({self.loc.get('translation_hint', text=verb_translation)})")
+        Frame(clear=True).add(
+            self.loc.get('mode_title', mode=7, title=self.loc.get('mode_7_title'), difficulty=difficulty.upper()),
+            self.loc.get('exit_to_menu_prompt')
+        ).render()
+        QuizRunner(self.loc).run(
+            stats,
+            lambda: self._make_conjugation_question(stats, difficulty),
+            lambda question, is_correct: self._update_stats(stats, question.category, question.key, is_correct)
+        )
 
-            user_answer = ""
-            if difficulty == 'easy':
-                options = {correct_answer, infinitive}
-                # Add one more incorrect option
-                all_forms = list(verb_data['forms'].values())
-                random.shuffle(all_forms)
-                for form in all_forms:
-                    if form not in options:
-                        options.add(form)
-                        break
-                
-                shuffled_options = list(options)
-                random.shuffle(shuffled_options)
+    def _make_conjugation_question(self, stats, difficulty):
+        verb_data, put_back = self.sampler.choose(stats, self.modal_verbs)
+        pronoun_rule = random.choice(self.pronoun_rules)
+        
+        infinitive = verb_data.infinitive
+        correct_answer = self._get_correct_form(verb_data, pronoun_rule)
 
-                for i, option in enumerate(shuffled_options):
-                    print(f"{i+1}. {option}")
-                
-                user_choice = input(f"\n{self.loc.get('your_choice', options=f'1-{len(shuffled_options)}')} ").lower()
-                if user_choice == 'm': break
-                try:
-                    user_answer = shuffled_options[int(user_choice) - 1]
-                except (ValueError, IndexError):
-                    print(f"\n⚠️ {self.loc.get('invalid_input')}\n")
-                    continue
-            
-            elif difficulty == 'medium':
-                hint = correct_answer[0] + "_" * (len(correct_answer) - 1)
-                user_answer = input(f"\n{self.loc.get('enter_answer_prompt')} ({hint}): ").strip().lower()
-                if user_answer == 'm': break
-            
-            else: # hard
-                user_answer = input(f"\n{self.loc.get('enter_answer_prompt')}").strip().lower()
-                if user_answer == 'm': break
+        pronoun_display = pronoun_rule.pronoun
+        if pronoun_rule.key:
+            pronoun_display += f" {self.loc.get(pronoun_rule.key)}"
+        
+        verb_translation = translate(verb_data, 'modal_verbs', infinitive, self.loc.language) or "???"
+        lines = [
+            self.loc.get('question_modal', pronoun=pronoun_display, infinitive=infinitive),
+            f"  ({self.loc.get('translation_hint', text=verb_translation)})"
+        ]
+        question = Question(lines, correct_answer, category='modal_verbs', key=f"{infinitive}-{pronoun_display.split(' ')[0]}",
+                            on_discard=put_back)
+        difficulty = resolve_difficulty(stats, difficulty, question.category, question.key)
 
-            stat_key = f"{infinitive}-{pronoun_display.split(' ')[0]}"
-            if user_answer == correct_answer:
-                print(self.loc.get('correct'))
-                self._update_stats(stats, 'modal_verbs', stat_key, True)
-            else:
-                print(self.loc.get('incorrect', answer=correct_answer))
-                self._update_stats(stats, 'modal_verbs', stat_key, False)
+        if difficulty == 'easy':
+            options = {correct_answer, infinitive}
+            # Add one more incorrect option
+            all_forms = list(verb_data.forms.values())
+            random.shuffle(all_forms)
+            for form in all_forms:
+                if form not in options:
+                    options.add(form)
+                    break
             
-            print("-" * 20)
-
-    def _choose_difficulty(self):
-        while True:
-            print(self.loc.get('choose_difficulty'))
-            print(self.loc.get('difficulty_easy'))
-            print(self.loc.get('difficulty_medium'))
-            print(self.loc.get('difficulty_hard'))
-            choice = input(self.loc.get('your_choice', options="1-3") + " ")
-            if choice == '1': return 'easy'
-            if choice == '2': return 'medium'
-            if choice == '3': return 'hard'
-            print(self.loc.get('invalid_input'))
+            question.options = list(options)
+            random.shuffle(question.options)
+        elif difficulty == 'medium':
+            question.hint = correct_answer[0] + "_" * (len(correct_answer) - 1)
+        return question
 
     def _update_stats(self, stats, category, key, is_correct):
-        if key not in stats[category]:
-             stats[category][key] = {"correct": 0, "incorrect": 0}
-
         if is_correct:
-            stats['total_score'] += 1
-            stats[category][key]['correct'] += 1
+            add_score(stats, 1)
         else:
-            stats['total_score'] = max(0, stats['total_score'] - 1)
-            stats[category][key]['incorrect'] += 1
\ No newline at end of file
+            add_score(stats, -1)
+        count_answer(stats, category, key, is_correct)
\ No newline at end of file
@@ -1,23 +1,50 @@
 import random
-from utils.file_handler import load_json
-from utils.ui import clear_screen
+from utils.file_handler import load_corpus, load_records
+from utils.records import Noun
+from utils.ui import Frame
+from utils.stats_manager import count_answer, add_score
+from utils.quiz import Question, QuizRunner, choose_difficulty
+from utils.adaptive import resolve_difficulty
+from utils.scheduler import QuestionSource
+from utils.shuffle_bag import Sampler
+from utils.item_priors import prior_weight
+from utils.deck import Deck, choose_items
+from utils.corpus_watcher import default_watcher
+from utils.noun_predictor import NounPredictor
 import config
 
 class NounTrainer:
-    def __init__(self, loc):
+    def __init__(self, loc, sampling='random'):
+        """:param sampling: выбор существительных: 'random' или 'bag'"""
         self.loc = loc
-        self.nouns = load_json(config.NOUNS_FILE)
+        # Nouns of a weak gender go into the article bag twice; plurals have no per-noun stats.
+        self.samplers = {'articles': Sampler('noun_articles', sampling, weak_category='articles', key_field='gender'),
+                         'plurals': Sampler('noun_plurals', sampling)}
+        nouns = load_corpus(config.NOUNS_FILE, Noun, key_field='singular')
         
-        if not self.nouns:
+        if not nouns:
             raise FileNotFoundError("Could not load nouns data file.")
 
+        self.deck = Deck(nouns, text_fields=('singular', 'plural'), facet_fields=('gender',), key_field='singular',
+                         sources=[config.NOUNS_FILE])
+        self.session_nouns = self.deck
+        self._predictor = None
+        default_watcher.watch(config.NOUNS_FILE, self._reload)
+
+    def _reload(self, path):
+        nouns = load_records(path, Noun)
+        if nouns:
+            self.deck.update(nouns)
+            self._predictor = None
+
     def run(self, stats):
         """Main entry point for the noun trainer module."""
         while True:
-            clear_screen()
-            print(self.loc.get('choose_noun_mode'))
-            print(self.loc.get('noun_mode_1'))
-            print(self.loc.get('noun_mode_2'))
+            Frame(clear=True).add(
+                self.loc.get('choose_noun_mode'),
+                self.loc.get('noun_mode_1'),
+                self.loc.get('noun_mode_2')
+            ).render()
             choice = input(self.loc.get('enter_number'))
             
             if choice == '1':
@@ -30,124 +57,100 @@ class NounTrainer:
                 print(self.loc.get('invalid_input'))
                 input(self.loc.get('press_enter'))
 
+    def question_sources(self, stats, difficulty):
+        """Question kinds of this trainer for the mixed mode."""
+        on_answer = lambda question, is_correct: self._update_stats(stats, question.category, question.key, is_correct)
+        return [
+            QuestionSource('noun_articles', 'articles', 'mode_3_title', lambda: self._make_article_question(stats, difficulty), on_answer),
+            QuestionSource('noun_plural', 'singular_plural', 'mode_4_title', lambda: self._make_plural_question(stats, difficulty), on_answer)
+        ]
+
     def _run_guess_article(self, stats):
         """Mode: Guess the article for a noun."""
-        difficulty = self._choose_difficulty()
-        clear_screen()
-        print(self.loc.get('mode_title', mode=3, title=self.loc.get('mode_3_title'), difficulty=difficulty.upper()))
-        print(self.loc.get('exit_to_menu_prompt'))
-
-        while True:
-            target_article = self._get_weighted_choice(stats, 'articles')
-            possible_nouns = [n for n in self.nouns if n['gender'] == target_article]
-            chosen_noun = random.choice(possible_nouns)
-            word = chosen_noun['singular']
-            correct_answer = chosen_noun['gender']
-            
-            print(self.loc.get('current_score', score=stats['total_score']))
-            print(self.loc.get('question_article', word=word))
+        difficulty = choose_difficulty(self.loc)
+        self.session_nouns = choose_items(self.loc, self.deck)
+        Frame(clear=True).add(
+            self.loc.get('mode_title', mode=3, title=self.loc.get('mode_3_title'), difficulty=difficulty.upper()),
+            self.loc.get('exit_to_menu_prompt')
+        ).render()
+        QuizRunner(self.loc).run(
+            stats,
+            lambda: self._make_article_question(stats, difficulty),
+            lambda question, is_correct: self._update_stats(stats, question.category, question.key, is_correct)
+        )
 
-            user_answer = ""
-            if difficulty == 'easy':
-                options = ['der', 'die', 'das']
-                random.shuffle(options)
-                for i, option in enumerate(options, 1):
-                    print(f"{i}. {option}")
-                user_choice = input(f"\n{self.loc.get('your_choice', options='1-3')} ").lower()
-                if user_choice == 'm': break
-                try:
-                    user_answer = options[int(user_choice) - 1]
-                except (ValueError, IndexError):
-                    print(f"\n⚠️ {self.loc.get('invalid_input')}\n")
-                    continue
-            elif difficulty == 'medium':
-                hint = correct_answer[0] + "_" * (len(correct_answer) - 1)
-                user_answer = input(f"{self.loc.get('enter_article_prompt')} ({hint}): ").strip().lower()
-                if user_answer == 'm': break
-            else: # hard
-                user_answer = input(self.loc.get('enter_article_prompt')).strip().lower()
-                if user_answer == 'm': break
+    def _make_article_question(self, stats, difficulty):
+        put_back = None
+        if self.samplers['articles'].sampling == 'bag':
+            # Every noun is covered; the weak articles come from the refill with their nouns.
+            chosen_noun, put_back = self.samplers['articles'].choose(stats, self.session_nouns)
+        else:
+            target_article = self._get_weighted_choice(stats, 'articles', ['der', 'die', 'das'])
+            # Rejection sampling keeps this O(1) on large decks; a filtered session
+            # may not contain the target gender at all, then any noun is used.
+            for _ in range(32):
+                chosen_noun = random.choice(self.session_nouns)
+                if chosen_noun.gender == target_article:
+                    break
+        correct_answer = chosen_noun.gender
 
-            if user_answer == correct_answer:
-                print(self.loc.get('correct'))
-                self._update_stats(stats, 'articles', correct_answer, True)
-            else:
-                print(self.loc.get('incorrect', answer=correct_answer))
-                self._update_stats(stats, 'articles', correct_answer, False)
-            
-            print("-" * 20)
+        question = Question([self.loc.get('question_article', word=chosen_noun.singular)], correct_answer,
+                            category='articles', key=correct_answer, prompt_key='enter_article_prompt', on_discard=put_back)
+        difficulty = resolve_difficulty(stats, difficulty, question.category, question.key)
+        if difficulty == 'easy':
+            question.options = ['der', 'die', 'das']
+            random.shuffle(question.options)
+        elif difficulty == 'medium':
+            question.hint = correct_answer[0] + "_" * (len(correct_answer) - 1)
+        return question
 
     def _run_singular_plural(self, stats):
         """Mode: Convert between singular and plural forms."""
-        difficulty = self._choose_difficulty()
-        clear_screen()
-        print(self.loc.get('mode_title', mode=4, title=self.loc.get('mode_4_title'), difficulty=difficulty.upper()))
-        print(self.loc.get('exit_to_menu_prompt'))
-        
-        while True:
-            chosen_noun = random.choice(self.nouns)
-            to_plural = random.choice([True, False])
+        difficulty = choose_difficulty(self.loc)
+        self.session_nouns = choose_items(self.loc, self.deck)
+        Frame(clear=True).add(
+            self.loc.get('mode_title', mode=4, title=self.loc.get('mode_4_title'), difficulty=difficulty.upper()),
+            self.loc.get('exit_to_menu_prompt')
+        ).render()
+        QuizRunner(self.loc).run(
+            stats,
+            lambda: self._make_plural_question(stats, difficulty),
+            lambda question, is_correct: self._update_stats(stats, question.category, question.key, is_correct)
+        )
 
-            if to_plural:
-                question_word = f"{chosen_noun['gender']} {chosen_noun['singular']}"
-                correct_answer_full = f"die {chosen_noun['plural']}"
-                correct_answer_medium = chosen_noun['plural']
-                print(self.loc.get('question_plural', word=question_word))
-            else:
-                question_word = f"die {chosen_noun['plural']}"
-                correct_answer_full = f"{chosen_noun['gender']} {chosen_noun['singular']}"
-                correct_answer_medium = chosen_noun['singular']
-                print(self.loc.get('question_singular', word=question_word))
+    def _make_plural_question(self, stats, difficulty):
+        chosen_noun, put_back = self.samplers['plurals'].choose(stats, self.session_nouns)
+        to_plural = random.choice([True, False])
 
-            print(self.loc.get('current_score', score=stats['total_score']))
+        if to_plural:
+            question_word = f"{chosen_noun.gender} {chosen_noun.singular}"
+            correct_answer_full = f"die {chosen_noun.plural}"
+            correct_answer_medium = chosen_noun.plural
+            text = self.loc.get('question_plural', word=question_word)
+        else:
+            question_word = f"die {chosen_noun.plural}"
+            correct_answer_full = f"{chosen_noun.gender} {chosen_noun.singular}"
+            correct_answer_medium = chosen_noun.singular
+            text = self.loc.get('question_singular', word=question_word)
 
-            user_answer = ""
-            is_correct = False
-
-            if difficulty == 'easy':
-                options = self._generate_plural_options(correct_answer_full, chosen_noun, to_plural)
-                for i, option in enumerate(options, 1):
-                    print(f"{i}. {option}")
-                user_choice = input(f"\n{self.loc.get('your_choice', options='1-3')} ").lower()
-                if user_choice == 'm': break
-                try:
-                    user_answer = options[int(user_choice) - 1]
-                    if user_answer == correct_answer_full:
-                        is_correct = True
-                except (ValueError, IndexError):
-                    print(f"\n⚠️ {self.loc.get('invalid_input')}\n")
-                    continue
-            
-            elif difficulty == 'medium':
-                user_answer = input(self.loc.get('enter_answer_prompt')).strip().lower()
-                if user_answer == 'm': break
-                if user_answer == correct_answer_medium:
-                    is_correct = True
-            
-            else: # hard
-                user_answer = input(self.loc.get('enter_answer_prompt')).strip().lower()
-                if user_answer == 'm': break
-                if user_answer == correct_answer_full:
-                    is_correct = True
-            
-            if is_correct:
-                print(self.loc.get('correct'))
-                self._update_stats(stats, 'singular_plural', 'main', True)
-            else:
-                print(self.loc.get('incorrect', answer=correct_answer_full))
-                self._update_stats(stats, 'singular_plural', 'main', False)
-            
-            print("-" * 20)
+        question = Question([text], correct_answer_full, category='singular_plural', key='main', on_discard=put_back)
+        difficulty = resolve_difficulty(stats, difficulty, question.category, question.key)
+        if difficulty == 'easy':
+            question.options = self._generate_plural_options(correct_answer_full, chosen_noun, to_plural)
+        elif difficulty == 'medium':
+            # Medium accepts the bare word without the article.
+            question.check = lambda answer: answer.strip().lower() == correct_answer_medium.lower()
+        return question
 
     def _generate_plural_options(self, correct_option, noun, to_plural):
         options = {correct_option}
-        base_word = noun['singular']
+        base_word = noun.singular
         
         if to_plural:
-            wrong_endings = ['en', 's', 'e', 'er', '']
-            while len(options) < 3:
-                ending = random.choice(wrong_endings)
-                options.add(f"die {base_word}{ending}")
+            # Wrong plurals follow the plural classes other nouns with the same ending take,
+            # so they look like real German plurals rather than random endings.
+            for plural in self._get_predictor().wrong_plurals(base_word, noun.plural):
+                options.add(f"die {plural}")
         else:
             wrong_articles = ['der', 'die', 'das']
             while len(options) < 3:
@@ -158,27 +161,21 @@ class NounTrainer:
         random.shuffle(shuffled_options)
         return shuffled_options
 
-    def _choose_difficulty(self):
-        while True:
-            print(self.loc.get('choose_difficulty'))
-            print(self.loc.get('difficulty_easy'))
-            print(self.loc.get('difficulty_medium'))
-            print(self.loc.get('difficulty_hard'))
-            choice = input(self.loc.get('your_choice', options="1-3") + " ")
-            if choice == '1': return 'easy'
-            if choice == '2': return 'medium'
-            if choice == '3': return 'hard'
-            print(self.loc.get('invalid_input'))
+    def _get_predictor(self):
+        # Built on first use from the loaded deck, and again after the nouns file changed.
+        if self._predictor is None:
+            self._predictor = NounPredictor(self.deck)
+        return self._predictor
 
-    def _get_weighted_choice(self, stats, category):
-        items = list(stats[category].keys())
-        weights = [stats[category][item]['incorrect'] + 1 for item in items]
+    def _get_weighted_choice(self, stats, category, items):
+        counters = stats.get(category, {})
+        weights = [counters[item].get('incorrect', 0) + 1 if item in counters else prior_weight(category, item)
+                   for item in items]
         return random.choices(items, weights=weights, k=1)[0]
     
     def _update_stats(self, stats, category, key, is_correct):
         if is_correct:
-            stats['total_score'] += 1
-            stats[category][key]['correct'] += 1
+            add_score(stats, 1)
         else:
-            stats['total_score'] = max(0, stats['total_score'] - 1)
-            stats[category][key]['incorrect'] += 1
\ No newline at end of file
+            add_score(stats, -1)
+        count_answer(stats, category, key, is_correct)
\ No newline at end of file
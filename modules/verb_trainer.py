@@ -1,15 +1,28 @@
 import random
 import re
-from utils.file_handler import load_json
-from utils.ui import clear_screen
+from utils.file_handler import load_corpus, load_records
+from utils.records import Verb, IrregularVerb, PronounRule
+from utils.corpus_store import ChainedSequence
+from utils.ui import Frame
+from utils.stats_manager import count_answer, add_score
+from utils.quiz import Question, QuizRunner, choose_difficulty
+from utils.adaptive import resolve_difficulty
+from utils.scheduler import QuestionSource
+from utils.shuffle_bag import Sampler
+from utils.item_priors import prior_weight
+from utils.deck import Deck, choose_items
+from utils.corpus_watcher import default_watcher
 import config
 
 class VerbTrainer:
-    def __init__(self, loc):
+    def __init__(self, loc, sampling='random'):
+        """:param sampling: выбор глаголов в режимах Perfekt: 'random' или 'bag'"""
         self.loc = loc
-        self.regular_verbs = load_json(config.REGULAR_VERBS_FILE)
-        self.irregular_verbs = load_json(config.IRREGULAR_VERBS_FILE)
-        self.pronoun_rules = load_json(config.PRONOUN_RULES_FILE)
+        self.samplers = {category: Sampler(category, sampling, weak_category=category, key_field='infinitive')
+                         for category in ('perfekt_auxiliary', 'partizip_2')}
+        self.regular_verbs = load_corpus(config.REGULAR_VERBS_FILE, Verb)
+        self.irregular_verbs = load_corpus(config.IRREGULAR_VERBS_FILE, IrregularVerb)
+        self.pronoun_rules = load_records(config.PRONOUN_RULES_FILE, PronounRule)
         
         if not all([self.regular_verbs, self.irregular_verbs, self.pronoun_rules]):
             raise FileNotFoundError("Could not load one or more data files for the verb trainer.")
@@ -18,20 +31,46 @@ class VerbTrainer:
 
     def _prepare_data(self):
         """Pre-processes loaded data for easier use."""
-        self.pronoun_groups = {rule['group']: rule['ending'] for rule in self.pronoun_rules}
+        self._prepare_pronouns()
+        self.deck = Deck(ChainedSequence(self.regular_verbs, self.irregular_verbs),
+                         text_fields=('infinitive', 'partizip_2'), facet_fields=('auxiliary',), key_field='infinitive',
+                         sources=[config.REGULAR_VERBS_FILE, config.IRREGULAR_VERBS_FILE])
+        self.session_verbs = self.deck
+        default_watcher.watch(config.REGULAR_VERBS_FILE, self._reload_verbs)
+        default_watcher.watch(config.IRREGULAR_VERBS_FILE, self._reload_verbs)
+        default_watcher.watch(config.PRONOUN_RULES_FILE, self._reload_pronouns)
+
+    def _prepare_pronouns(self):
+        self.pronoun_groups = {rule.group: rule.ending for rule in self.pronoun_rules}
+        self.endings = list(dict.fromkeys(self.pronoun_groups.values()))
         
         self.group_to_pronouns_set = {group: set() for group in self.pronoun_groups}
         for rule in self.pronoun_rules:
-            base_pronoun = re.sub(r' \(.*\)', '', rule['pronoun'])
-            self.group_to_pronouns_set[rule['group']].add(base_pronoun)
+            base_pronoun = re.sub(r' \(.*\)', '', rule.pronoun)
+            self.group_to_pronouns_set[rule.group].add(base_pronoun)
+
+    def _reload_verbs(self, path):
+        """Both verb files feed one deck, so a change in either re-diffs the combined list."""
+        regular_verbs = load_records(config.REGULAR_VERBS_FILE, Verb)
+        irregular_verbs = load_records(config.IRREGULAR_VERBS_FILE, IrregularVerb)
+        if regular_verbs and irregular_verbs:
+            self.regular_verbs, self.irregular_verbs = regular_verbs, irregular_verbs
+            self.deck.update(regular_verbs + irregular_verbs)
+
+    def _reload_pronouns(self, path):
+        pronoun_rules = load_records(path, PronounRule)
+        if pronoun_rules:
+            self.pronoun_rules = pronoun_rules
+            self._prepare_pronouns()
 
     def run(self, stats):
         """Main entry point for the verb trainer module."""
         while True:
-            clear_screen()
-            print(self.loc.get('choose_tense'))
-            print(self.loc.get('tense_present'))
-            print(self.loc.get('tense_perfect'))
+            Frame(clear=True).add(
+                self.loc.get('choose_tense'),
+                self.loc.get('tense_present'),
+                self.loc.get('tense_perfect')
+            ).render()
             choice = input(self.loc.get('enter_number'))
 
             if choice == '1':
@@ -46,18 +85,19 @@ class VerbTrainer:
 
     def _run_present_tense(self, stats):
         while True:
-            clear_screen()
-            print(self.loc.get('choose_verb_mode'))
-            print(self.loc.get('verb_mode_1'))
-            print(self.loc.get('verb_mode_2'))
+            Frame(clear=True).add(
+                self.loc.get('choose_verb_mode'),
+                self.loc.get('verb_mode_1'),
+                self.loc.get('verb_mode_2')
+            ).render()
             choice = input(self.loc.get('enter_number'))
             
             if choice == '1':
-                difficulty = self._choose_difficulty()
+                difficulty = choose_difficulty(self.loc)
                 self._run_mode_1(stats, difficulty)
                 break
             elif choice == '2':
-                difficulty = self._choose_difficulty()
+                difficulty = choose_difficulty(self.loc)
                 self._run_mode_2(stats, difficulty)
                 break
             elif choice == 'm':
@@ -68,18 +108,21 @@ class VerbTrainer:
 
     def _run_perfect_tense(self, stats):
         while True:
-            clear_screen()
-            print(self.loc.get('choose_perfekt_mode'))
-            print(self.loc.get('perfekt_mode_1'))
-            print(self.loc.get('perfekt_mode_2'))
+            Frame(clear=True).add(
+                self.loc.get('choose_perfekt_mode'),
+                self.loc.get('perfekt_mode_1'),
+                self.loc.get('perfekt_mode_2')
+            ).render()
             choice = input(self.loc.get('enter_number'))
 
             if choice == '1':
-                difficulty = self._choose_difficulty()
+                difficulty = choose_difficulty(self.loc)
+                self.session_verbs = choose_items(self.loc, self.deck)
                 self._run_perfekt_auxiliary(stats, difficulty)
                 break
             elif choice == '2':
-                difficulty = self._choose_difficulty()
+                difficulty = choose_difficulty(self.loc)
+                self.session_verbs = choose_items(self.loc, self.deck)
                 self._run_perfekt_partizip(stats, difficulty)
                 break
             elif choice == 'm':
@@ -88,249 +131,154 @@ class VerbTrainer:
                 print(self.loc.get('invalid_input'))
                 input(self.loc.get('press_enter'))
 
-    def _choose_difficulty(self):
-        """Menu for selecting difficulty."""
-        while True:
-            print(self.loc.get('choose_difficulty'))
-            print(self.loc.get('difficulty_easy'))
-            print(self.loc.get('difficulty_medium'))
-            print(self.loc.get('difficulty_hard'))
-            choice = input(self.loc.get('your_choice', options="1-3") + " ")
-            if choice == '1': return 'easy'
-            if choice == '2': return 'medium'
-            if choice == '3': return 'hard'
-            print(self.loc.get('invalid_input'))
-    
-    def _get_weighted_choice(self, stats, category):
-        items = list(stats[category].keys())
-        weights = [stats[category][item]['incorrect'] + 1 for item in items]
+    def question_sources(self, stats, difficulty):
+        """Question kinds of this trainer for the mixed mode."""
+        on_answer = lambda question, is_correct: self._update_stats(stats, question.category, question.key, is_correct)
+        return [
+            QuestionSource('verb_endings', 'endings', 'mode_1_title', lambda: self._make_ending_question(stats, difficulty), on_answer),
+            QuestionSource('verb_pronouns', 'pronoun_groups', 'mode_2_title', lambda: self._make_pronoun_question(stats, difficulty), on_answer),
+            QuestionSource('perfekt_auxiliary', 'perfekt_auxiliary', 'mode_perfekt_aux_title', lambda: self._make_auxiliary_question(stats, difficulty), on_answer),
+            QuestionSource('partizip_2', 'partizip_2', 'mode_perfekt_part2_title', lambda: self._make_partizip_question(stats, difficulty), on_answer)
+        ]
+
+    def _get_weighted_choice(self, stats, category, items):
+        counters = stats.get(category, {})
+        weights = [counters[item].get('incorrect', 0) + 1 if item in counters else prior_weight(category, item)
+                   for item in items]
         return random.choices(items, weights=weights, k=1)[0]
     
-    def _get_verb_stem(self, verb_data):
-        """Helper to get stem from verb data object or string (legacy support if needed)."""
-        if isinstance(verb_data, dict):
-            return verb_data['infinitive'][:-2] # Simple heuristic for regular verbs
-        return verb_data[:-2]
+    def _run_quiz(self, stats, next_question):
+        QuizRunner(self.loc).run(
+            stats,
+            next_question,
+            lambda question, is_correct: self._update_stats(stats, question.category, question.key, is_correct)
+        )
 
     def _run_mode_1(self, stats, difficulty):
         """Mode 1: Guess the ending (Präsens)."""
-        clear_screen()
-        print(self.loc.get('mode_title', mode=1, title=self.loc.get('mode_1_title'), difficulty=difficulty.upper()))
-        print(self.loc.get('exit_to_menu_prompt'))
-
-        while True:
-            target_ending = self._get_weighted_choice(stats, 'endings')
-            possible_rules = [r for r in self.pronoun_rules if r['ending'] == target_ending]
-            chosen_rule = random.choice(possible_rules)
-            pronoun, stat_group = chosen_rule['pronoun'], chosen_rule['group']
-            
-            use_irregular = difficulty in ['medium', 'hard'] and random.choice([True, False])
-            if use_irregular and chosen_rule['pronoun'] in ['du', 'er', 'sie (она)', 'es']:
-                verb_data = random.choice(self.irregular_verbs)
-                verb_stem = verb_data['change'].get(stat_group.split(' ')[0], verb_data['stem'])
-            else:
-                verb_obj = random.choice(self.regular_verbs)
-                verb_stem = verb_obj['infinitive'][:-2]
+        Frame(clear=True).add(
+            self.loc.get('mode_title', mode=1, title=self.loc.get('mode_1_title'), difficulty=difficulty.upper()),
+            self.loc.get('exit_to_menu_prompt')
+        ).render()
+        self._run_quiz(stats, lambda: self._make_ending_question(stats, difficulty))
 
-            pronoun_display = chosen_rule['pronoun']
-            if 'key' in chosen_rule:
-                pronoun_display += f" {self.loc.get(chosen_rule['key'])}"
+    def _make_ending_question(self, stats, difficulty):
+        target_ending = self._get_weighted_choice(stats, 'endings', self.endings)
+        possible_rules = [r for r in self.pronoun_rules if r.ending == target_ending]
+        chosen_rule = random.choice(possible_rules)
+        pronoun, stat_group = chosen_rule.pronoun, chosen_rule.group
+        difficulty = resolve_difficulty(stats, difficulty, 'endings', target_ending)
+        
+        use_irregular = difficulty in ['medium', 'hard'] and random.choice([True, False])
+        if use_irregular and chosen_rule.pronoun in ['du', 'er', 'sie (она)', 'es']:
+            verb_data = random.choice(self.irregular_verbs)
+            verb_stem = verb_data.change.get(stat_group.split(' ')[0], verb_data.stem)
+        else:
+            verb_obj = random.choice(self.regular_verbs)
+            verb_stem = verb_obj.infinitive[:-2]
 
-            print(self.loc.get('current_score', score=stats['total_score']))
-            print(self.loc.get('question_ending', pronoun=pronoun_display, stem=verb_stem))
+        pronoun_display = chosen_rule.pronoun
+        if chosen_rule.key:
+            pronoun_display += f" {self.loc.get(chosen_rule.key)}"
 
-            if difficulty in ['easy', 'medium']:
-                options = list(self.pronoun_groups.values())
-                random.shuffle(options)
-                for i, option in enumerate(options, 1):
-                    print(f"{i}. {option}")
-                
-                user_choice = input(f"\n{self.loc.get('your_choice', options='1-4')} ").lower()
-                if user_choice == 'm': break
-
-                try:
-                    user_answer = options[int(user_choice) - 1]
-                except (ValueError, IndexError):
-                    print(f"\n⚠️ {self.loc.get('invalid_input')}\n")
-                    continue
-            else: # hard
-                user_answer = input(self.loc.get('enter_ending_prompt')).strip().lower()
-                if user_answer == 'm': break
-                if not user_answer.startswith('-'):
-                    user_answer = '-' + user_answer
-            
-            if user_answer == target_ending:
-                print(self.loc.get('correct'))
-                self._update_stats(stats, 'endings', target_ending, True)
-            else:
-                print(self.loc.get('incorrect', answer=target_ending))
-                print(self.loc.get('incorrect_example', pronoun=pronoun, stem=verb_stem, ending=target_ending.replace('-', '')))
-                self._update_stats(stats, 'endings', target_ending, False)
-            
-            print("-" * 20)
+        question = Question(
+            [self.loc.get('question_ending', pronoun=pronoun_display, stem=verb_stem)], target_ending,
+            category='endings', key=target_ending, prompt_key='enter_ending_prompt',
+            incorrect_lines=[self.loc.get('incorrect_example', pronoun=pronoun, stem=verb_stem, ending=target_ending.replace('-', ''))]
+        )
+        if difficulty in ['easy', 'medium']:
+            question.options = list(self.pronoun_groups.values())
+            random.shuffle(question.options)
+        else: # hard
+            question.check = lambda answer: '-' + answer.strip().lower().lstrip('-') == target_ending
+        return question
 
     def _run_mode_2(self, stats, difficulty):
         """Mode 2: Guess the pronoun (Präsens)."""
-        clear_screen()
-        print(self.loc.get('mode_title', mode=2, title=self.loc.get('mode_2_title'), difficulty=difficulty.upper()))
-        print(self.loc.get('exit_to_menu_prompt'))
+        Frame(clear=True).add(
+            self.loc.get('mode_title', mode=2, title=self.loc.get('mode_2_title'), difficulty=difficulty.upper()),
+            self.loc.get('exit_to_menu_prompt')
+        ).render()
+        self._run_quiz(stats, lambda: self._make_pronoun_question(stats, difficulty))
+
+    def _make_pronoun_question(self, stats, difficulty):
+        target_group = self._get_weighted_choice(stats, 'pronoun_groups', list(self.pronoun_groups))
+        correct_ending = self.pronoun_groups[target_group]
+        difficulty = resolve_difficulty(stats, difficulty, 'pronoun_groups', target_group)
         
-        while True:
-            target_group = self._get_weighted_choice(stats, 'pronoun_groups')
-            correct_ending = self.pronoun_groups[target_group]
+        verb_stem = ''
+        use_irregular = difficulty in ['medium', 'hard'] and random.choice([True, False])
+        if use_irregular and target_group in ['du', 'er / sie / es / ihr']:
+            verb_data = random.choice(self.irregular_verbs)
+            # Find the irregular stem for du or er/sie/es
+            base_pronoun_for_change = target_group.split(' ')[0]
+            verb_stem = verb_data.change.get(base_pronoun_for_change, verb_data.stem)
+        else:
+            verb_obj = random.choice(self.regular_verbs)
+            verb_stem = verb_obj.infinitive[:-2]
             
-            verb_stem = ''
-            use_irregular = difficulty in ['medium', 'hard'] and random.choice([True, False])
-            if use_irregular and target_group in ['du', 'er / sie / es / ihr']:
-                verb_data = random.choice(self.irregular_verbs)
-                # Find the irregular stem for du or er/sie/es
-                base_pronoun_for_change = target_group.split(' ')[0]
-                verb_stem = verb_data['change'].get(base_pronoun_for_change, verb_data['stem'])
-            else:
-                verb_obj = random.choice(self.regular_verbs)
-                verb_stem = verb_obj['infinitive'][:-2]
-                
-            conjugated_verb = verb_stem + correct_ending.replace('-', '')
-
-            print(self.loc.get('current_score', score=stats['total_score']))
-            print(self.loc.get('question_pronoun', verb=conjugated_verb))
-
-            is_correct = False
-            if difficulty in ['easy', 'medium']:
-                options = list(self.pronoun_groups.keys())
-                random.shuffle(options)
-                for i, option in enumerate(options, 1):
-                    print(f"{i}. {option}")
-                
-                user_choice = input(f"\n{self.loc.get('your_choice', options='1-4')} ").lower()
-                if user_choice == 'm': break
+        conjugated_verb = verb_stem + correct_ending.replace('-', '')
 
-                try:
-                    user_answer_group = options[int(user_choice) - 1]
-                    if user_answer_group == target_group:
-                        is_correct = True
-                except (ValueError, IndexError):
-                    print(f"\n⚠️ {self.loc.get('invalid_input')}\n")
-                    continue
-            else: # hard
-                user_input = input(self.loc.get('enter_pronouns_prompt'))
-                if user_input.lower() == 'm': break
-                
-                user_pronouns_set = set(user_input.split())
-                correct_pronouns_set = self.group_to_pronouns_set[target_group]
-                
-                if user_pronouns_set == correct_pronouns_set:
-                    is_correct = True
-
-            if is_correct:
-                print(self.loc.get('correct'))
-                self._update_stats(stats, 'pronoun_groups', target_group, True)
-            else:
-                print(self.loc.get('incorrect', answer=target_group))
-                if difficulty == 'hard':
-                    correct_string = " ".join(sorted(list(self.group_to_pronouns_set[target_group])))
-                    print(self.loc.get('incorrect_hard_pronoun', answer=correct_string))
-                self._update_stats(stats, 'pronoun_groups', target_group, False)
-            
-            print("-" * 20)
+        question = Question([self.loc.get('question_pronoun', verb=conjugated_verb)], target_group,
+                            category='pronoun_groups', key=target_group)
+        if difficulty in ['easy', 'medium']:
+            question.options = list(self.pronoun_groups.keys())
+            random.shuffle(question.options)
+        else: # hard
+            correct_pronouns_set = self.group_to_pronouns_set[target_group]
+            correct_string = " ".join(sorted(correct_pronouns_set))
+            question.prompt_key = 'enter_pronouns_prompt'
+            question.check = lambda answer: set(answer.split()) == correct_pronouns_set
+            question.incorrect_lines = [self.loc.get('incorrect_hard_pronoun', answer=correct_string)]
+        return question
 
     def _run_perfekt_auxiliary(self, stats, difficulty):
         """Perfekt Mode 1: Guess Auxiliary (haben/sein)."""
-        clear_screen()
-        print(self.loc.get('mode_title', mode=3, title=self.loc.get('mode_perfekt_aux_title'), difficulty=difficulty.upper()))
-        print(self.loc.get('exit_to_menu_prompt'))
-
-        while True:
-            # Combine regular and irregular verbs for selection
-            all_verbs = self.regular_verbs + self.irregular_verbs
-            verb_data = random.choice(all_verbs)
-            infinitive = verb_data['infinitive']
-            correct_aux = verb_data['auxiliary']
+        Frame(clear=True).add(
+            self.loc.get('mode_title', mode=3, title=self.loc.get('mode_perfekt_aux_title'), difficulty=difficulty.upper()),
+            self.loc.get('exit_to_menu_prompt')
+        ).render()
+        self._run_quiz(stats, lambda: self._make_auxiliary_question(stats, difficulty))
 
-            print(self.loc.get('current_score', score=stats['total_score']))
-            print(self.loc.get('question_auxiliary', verb=infinitive))
-
-            user_answer = ""
-            if difficulty == 'easy':
-                options = ['haben', 'sein']
-                random.shuffle(options)
-                for i, option in enumerate(options, 1):
-                    print(f"{i}. {option}")
-                
-                user_choice = input(f"\n{self.loc.get('your_choice', options='1-2')} ").lower()
-                if user_choice == 'm': break
-                try:
-                    user_answer = options[int(user_choice) - 1]
-                except (ValueError, IndexError):
-                    print(f"\n⚠️ {self.loc.get('invalid_input')}\n")
-                    continue
-            else:
-                user_answer = input(self.loc.get('enter_answer_prompt')).strip().lower()
-                if user_answer == 'm': break
-
-            if user_answer == correct_aux:
-                print(self.loc.get('correct'))
-                # We can track stats for auxiliary verbs if we want, for now just total score
-                stats['total_score'] += 1
-            else:
-                print(self.loc.get('incorrect', answer=correct_aux))
-                stats['total_score'] = max(0, stats['total_score'] - 1)
-            
-            print("-" * 20)
+    def _make_auxiliary_question(self, stats, difficulty):
+        # Combine regular and irregular verbs for selection
+        verb_data, put_back = self.samplers['perfekt_auxiliary'].choose(stats, self.session_verbs)
+        question = Question([self.loc.get('question_auxiliary', verb=verb_data.infinitive)], verb_data.auxiliary,
+                            category='perfekt_auxiliary', key=verb_data.infinitive, on_discard=put_back)
+        difficulty = resolve_difficulty(stats, difficulty, question.category, question.key)
+        if difficulty == 'easy':
+            question.options = ['haben', 'sein']
+            random.shuffle(question.options)
+        return question
 
     def _run_perfekt_partizip(self, stats, difficulty):
         """Perfekt Mode 2: Guess Partizip II."""
-        clear_screen()
-        print(self.loc.get('mode_title', mode=4, title=self.loc.get('mode_perfekt_part2_title'), difficulty=difficulty.upper()))
-        print(self.loc.get('exit_to_menu_prompt'))
-
-        while True:
-            all_verbs = self.regular_verbs + self.irregular_verbs
-            verb_data = random.choice(all_verbs)
-            infinitive = verb_data['infinitive']
-            correct_partizip = verb_data['partizip_2']
+        Frame(clear=True).add(
+            self.loc.get('mode_title', mode=4, title=self.loc.get('mode_perfekt_part2_title'), difficulty=difficulty.upper()),
+            self.loc.get('exit_to_menu_prompt')
+        ).render()
+        self._run_quiz(stats, lambda: self._make_partizip_question(stats, difficulty))
 
-            print(self.loc.get('current_score', score=stats['total_score']))
-            print(self.loc.get('question_partizip', verb=infinitive))
+    def _make_partizip_question(self, stats, difficulty):
+        verb_data, put_back = self.samplers['partizip_2'].choose(stats, self.session_verbs)
+        correct_partizip = verb_data.partizip_2
 
-            user_answer = ""
-            if difficulty == 'easy':
-                # Generate distractors
-                distractors = [v['partizip_2'] for v in random.sample(all_verbs, 3) if v['partizip_2'] != correct_partizip]
-                options = [correct_partizip] + distractors[:3]
-                random.shuffle(options)
-                for i, option in enumerate(options, 1):
-                    print(f"{i}. {option}")
-                
-                user_choice = input(f"\n{self.loc.get('your_choice', options='1-4')} ").lower()
-                if user_choice == 'm': break
-                try:
-                    user_answer = options[int(user_choice) - 1]
-                except (ValueError, IndexError):
-                    print(f"\n⚠️ {self.loc.get('invalid_input')}\n")
-                    continue
-            elif difficulty == 'medium':
-                # Hint: first letter and length
-                hint = correct_partizip[0] + "_" * (len(correct_partizip) - 1)
-                user_answer = input(f"\n{self.loc.get('enter_answer_prompt')} ({hint}): ").strip().lower()
-                if user_answer == 'm': break
-            else:
-                user_answer = input(self.loc.get('enter_answer_prompt')).strip().lower()
-                if user_answer == 'm': break
-
-            if user_answer == correct_partizip:
-                print(self.loc.get('correct'))
-                stats['total_score'] += 1
-            else:
-                print(self.loc.get('incorrect', answer=correct_partizip))
-                stats['total_score'] = max(0, stats['total_score'] - 1)
-            
-            print("-" * 20)
+        question = Question([self.loc.get('question_partizip', verb=verb_data.infinitive)], correct_partizip,
+                            category='partizip_2', key=verb_data.infinitive, on_discard=put_back)
+        difficulty = resolve_difficulty(stats, difficulty, question.category, question.key)
+        if difficulty == 'easy':
+            # Generate distractors
+            distractors = [v.partizip_2 for v in random.sample(self.deck, 3) if v.partizip_2 != correct_partizip]
+            question.options = [correct_partizip] + distractors[:3]
+            random.shuffle(question.options)
+        elif difficulty == 'medium':
+            # Hint: first letter and length
+            question.hint = correct_partizip[0] + "_" * (len(correct_partizip) - 1)
+        return question
 
     def _update_stats(self, stats, category, key, is_correct):
         if is_correct:
-            stats['total_score'] += 1
-            stats[category][key]['correct'] += 1
+            add_score(stats, 1)
         else:
-            stats['total_score'] = max(0, stats['total_score'] - 1) # Prevents negative score
-            stats[category][key]['incorrect'] += 1
\ No newline at end of file
+            add_score(stats, -1)
+        count_answer(stats, category, key, is_correct)
\ No newline at end of file
@@ -1,121 +1,172 @@
 ﻿import random
-from utils.file_handler import load_json
-from utils.ui import clear_screen
+import weakref
+from pathlib import Path
+from utils.file_handler import load_corpus, load_records
+from utils.records import VocabItem
+from utils.ui import Frame
+from utils.stats_manager import count_answer, add_score
+from utils.quiz import Question, QuizRunner, choose_difficulty
+from utils.adaptive import resolve_difficulty
+from utils.scheduler import QuestionSource
+from utils.shuffle_bag import Sampler
+from utils.item_priors import category_priors, prior_weight
+from utils.deck import Deck, choose_items
+from utils.corpus_watcher import default_watcher
+from utils.translations import translate
+from utils.weight_index import WeightIndex
 import config
 
 class VocabularyTrainer:
-    def __init__(self, loc, data_file, category_key, title_key):
+    def __init__(self, loc, data_file, category_key, title_key, sampling='random'):
         """
         :param loc: объект локализации
         :param data_file: путь к json файлу (например, config.W_FRAGEN_FILE)
         :param category_key: ключ для сохранения статистики (например, 'w_fragen')
         :param title_key: ключ заголовка для UI
+        :param sampling: 'random' - взвешенный случайный выбор, 'bag' - мешок с полным покрытием колоды
         """
         self.loc = loc
-        self.items = load_json(data_file)
+        items = load_corpus(data_file, VocabItem, key_field='word')
         self.category_key = category_key
         self.title_key = title_key
+        self.corpus = Path(data_file).stem
         
-        if not self.items:
+        if not items:
             raise FileNotFoundError(f"Could not load data from {data_file}")
 
+        self.deck = Deck(items, text_fields=('sentence', 'answer', 'word'), key_field='word', extra_text=self._translation,
+                         sources=[data_file])
+        self.session_items = self.deck
+        self.sampler = Sampler(category_key, sampling, weak_category=category_key, key_field='word')
+        # (deck version, position -> prior weight of the calibrated items)
+        self._priors = (None, {})
+        # id(stats) -> (reference to the stats, deck version, WeightIndex): one per learner,
+        # since a worker process shares its trainers between learners.
+        self._indexes = {}
+        default_watcher.watch(data_file, self._reload)
+
+    def _reload(self, path):
+        items = load_records(path, VocabItem)
+        if items:
+            self.deck.update(items)
+
     def run(self, stats):
-        difficulty = self._choose_difficulty()
+        difficulty = choose_difficulty(self.loc)
+        self.session_items = choose_items(self.loc, self.deck)
         self._run_training(stats, difficulty)
 
+    def question_sources(self, stats, difficulty):
+        """Question kinds of this trainer for the mixed mode."""
+        on_answer = lambda question, is_correct: self._update_stats(stats, question.category, question.key, is_correct)
+        return [
+            QuestionSource(self.category_key, self.category_key, self.title_key, lambda: self._make_question(stats, difficulty), on_answer)
+        ]
+
+    def _translation(self, item):
+        return translate(item, self.corpus, item.word, self.loc.language)
+
     def _run_training(self, stats, difficulty):
-        clear_screen()
         title = self.loc.get(self.title_key) 
-        print(f"--- {title} (Level: {difficulty.upper()}) ---")
-        print(self.loc.get('exit_to_menu_prompt'))
+        Frame(clear=True).add(
+            f"--- {title} (Level: {difficulty.upper()}) ---",
+            self.loc.get('exit_to_menu_prompt')
+        ).render()
+        QuizRunner(self.loc).run(
+            stats,
+            lambda: self._make_question(stats, difficulty),
+            lambda question, is_correct: self._update_stats(stats, question.category, question.key, is_correct)
+        )
 
-        while True:
+    def _make_question(self, stats, difficulty):
+        put_back = None
+        if self.sampler.sampling == 'bag':
+            item, put_back = self.sampler.choose(stats, self.session_items)
+        else:
             item = self._get_weighted_choice(stats, self.category_key)
-            
-            question_sentence = item['sentence']
-            correct_answer = item['answer']
-            translation = item['translation'].get(self.loc.language, "???")
-
-            print(self.loc.get('current_score', score=stats['total_score']))
-            print(f"\n{self.loc.get('question_fill_blank')}")
-            print(f"  {question_sentence}")
-            print(f"  ({self.loc.get('translation_hint', text=translation)})")
-
-            user_answer = ""
-
-            if difficulty == 'easy':
-                options = {correct_answer}
-                while len(options) < min(4, len(self.items)):
-                    distractor = random.choice(self.items)['answer']
-                    options.add(distractor)
-                
-                shuffled_options = list(options)
-                random.shuffle(shuffled_options)
-
-                for i, option in enumerate(shuffled_options, 1):
-                    print(f"{i}. {option}")
-                
-                user_choice = input(f"\n{self.loc.get('your_choice', options=f'1-{len(options)}')} ").lower()
-                if user_choice == 'm': break
-                
-                try:
-                    user_answer = shuffled_options[int(user_choice) - 1]
-                except (ValueError, IndexError):
-                    print(f"\n⚠️ {self.loc.get('invalid_input')}\n")
-                    continue
+        
+        correct_answer = item.answer
+        translation = self._translation(item) or "???"
+        lines = [
+            f"\n{self.loc.get('question_fill_blank')}",
+            f"  {item.sentence}",
+            f"  ({self.loc.get('translation_hint', text=translation)})"
+        ]
+        question = Question(lines, correct_answer, category=self.category_key, key=item.word, on_discard=put_back)
+        difficulty = resolve_difficulty(stats, difficulty, question.category, question.key)
 
-            elif difficulty == 'medium':
-                hint = correct_answer[0] + "_" * (len(correct_answer) - 1)
-                user_answer = input(f"\n{self.loc.get('enter_answer_prompt')} ({hint}): ").strip()
-                if user_answer.lower() == 'm': break
+        if difficulty == 'easy':
+            options = {correct_answer}
+            while len(options) < min(4, len(self.deck)):
+                distractor = random.choice(self.deck).answer
+                options.add(distractor)
+            
+            question.options = list(options)
+            random.shuffle(question.options)
+        elif difficulty == 'medium':
+            question.hint = correct_answer[0] + "_" * (len(correct_answer) - 1)
+        return question
 
-            else: # hard
-                user_answer = input(f"\n{self.loc.get('enter_answer_prompt')} ").strip()
-                if user_answer.lower() == 'm': break
+    def _get_weighted_choice(self, stats, category):
+        if self.session_items is not self.deck:
+            # A filtered session is a small list, so every item is weighed.
+            counters = stats.get(category, {})
+            weights = [self._weight(counters.get(item.word), prior_weight(category, item.word)) for item in self.session_items]
+            return random.choices(self.session_items, weights=weights, k=1)[0]
+        return self.deck[self._weight_index(stats, category).draw()]
 
-            if user_answer.lower() == correct_answer.lower():
-                print(self.loc.get('correct'))
-                self._update_stats(stats, self.category_key, item['word'], True)
-            else:
-                print(self.loc.get('incorrect', answer=correct_answer))
-                self._update_stats(stats, self.category_key, item['word'], False)
-            
-            print("-" * 20)
+    def _weight_index(self, stats, category):
+        """
+        Weights of the whole deck: items with stats have their own weight, unseen items with a
+        calibrated difficulty weigh their prior and all other items weigh 1. The counters are
+        read once per learner and deck version (a tiered category is scanned on disk then);
+        after that every answer updates one weight, so a question never reads the counters.
+        """
+        entry = self._indexes.get(id(stats))
+        if entry is None or entry[0]() is not stats or entry[1] != self.deck.version:
+            weights = [1] * len(self.deck)
+            for position, weight in self._prior_weights(category).items():
+                weights[position] = weight
+            for key, data in stats.get(category, {}).items():
+                position = self.deck.position_of(key)
+                if position is not None:
+                    weights[position] = self._weight(data)
+            # Learners whose stats are gone are dropped with the next new index.
+            self._indexes = {key: entry for key, entry in self._indexes.items() if entry[0]() is not None}
+            entry = self._indexes[id(stats)] = (_reference(stats), self.deck.version, WeightIndex(weights))
+        return entry[2]
 
-    def _choose_difficulty(self):
-        while True:
-            print(self.loc.get('choose_difficulty'))
-            print(self.loc.get('difficulty_easy'))
-            print(self.loc.get('difficulty_medium'))
-            print(self.loc.get('difficulty_hard'))
-            choice = input(self.loc.get('your_choice', options="1-3") + " ")
-            if choice == '1': return 'easy'
-            if choice == '2': return 'medium'
-            if choice == '3': return 'hard'
-            print(self.loc.get('invalid_input'))
+    def _prior_weights(self, category):
+        # The key lookups run once per deck version, not on every question.
+        version, weights = self._priors
+        if version != self.deck.version:
+            weights = {}
+            for key, weight in category_priors(category).items():
+                position = self.deck.position_of(key)
+                if position is not None:
+                    weights[position] = weight
+            self._priors = (self.deck.version, weights)
+        return weights
 
-    def _get_weighted_choice(self, stats, category):
-        if category not in stats:
-            stats[category] = {}
-        
-        items_list = self.items
-        weights = []
-        
-        for item in items_list:
-            key = item['word']
-            if key not in stats[category]:
-                stats[category][key] = {"correct": 0, "incorrect": 0}
-            
-            data = stats[category][key]
-            weight = 1 + (data['incorrect'] * 2) - (data['correct'] * 0.5)
-            weights.append(max(0.1, weight))
-            
-        return random.choices(items_list, weights=weights, k=1)[0]
+    def _weight(self, data, prior=1):
+        if data is None:
+            return prior
+        return max(0.1, 1 + (data['incorrect'] * 2) - (data['correct'] * 0.5))
 
     def _update_stats(self, stats, category, key, is_correct):
         if is_correct:
-            stats['total_score'] += 1
-            stats[category][key]['correct'] += 1
+            add_score(stats, 1)
         else:
-            stats['total_score'] = max(0, stats['total_score'] - 1)
-            stats[category][key]['incorrect'] += 1
\ No newline at end of file
+            add_score(stats, -1)
+        count_answer(stats, category, key, is_correct)
+        entry = self._indexes.get(id(stats))
+        if entry is not None and entry[0]() is stats and entry[1] == self.deck.version:
+            position = self.deck.position_of(key)
+            if position is not None:
+                entry[2].set(position, self._weight(stats[category][key]))
+
+def _reference(stats):
+    try:
+        return weakref.ref(stats)
+    except TypeError:
+        # A plain dict cannot be weakly referenced; it is kept alive with the trainer.
+        return lambda: stats
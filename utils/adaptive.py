@@ -0,0 +1,49 @@
+import math
+import time
+import config
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+def decay_update(entry, is_correct, now=None, half_life=config.DECAY_HALF_LIFE):
+    """
+    Adds one answer to an exponentially decayed [correct, answers, timestamp] triple.
+    Both sums are decayed to `now` first, so older answers count less. O(1).
+    """
+    now = now or time.time()
+    correct, answers, updated = entry or (0, 0, now)
+    factor = _decay_factor(now - updated, half_life)
+    correct = correct * factor + (1 if is_correct else 0)
+    answers = answers * factor + 1
+    return [round(correct, 3), round(answers, 3), int(now)]
+
+def decayed_accuracy(entry, now=None, half_life=config.DECAY_HALF_LIFE):
+    """
+    Returns (accuracy, evidence): the decayed share of correct answers and how many
+    answers it is still based on. Time lowers the evidence but not the accuracy.
+    """
+    if not entry or not entry[1]:
+        return None, 0
+    correct, answers, updated = entry
+    return correct / answers, answers * _decay_factor((now or time.time()) - updated, half_life)
+
+def resolve_difficulty(stats, difficulty, category, key):
+    """
+    Returns the difficulty for one question. 'adaptive' becomes easy (choice), medium (hint)
+    or hard (free input) depending on the recent accuracy of the item; items with little
+    recent evidence use the accuracy of their category instead.
+    """
+    if difficulty != 'adaptive':
+        return difficulty
+    accuracy, evidence = decayed_accuracy(stats.get(category, {}).get(key, {}).get('decay'))
+    if evidence < config.ADAPTIVE_MIN_EVIDENCE:
+        accuracy, evidence = decayed_accuracy(stats.get('category_decay', {}).get(category))
+    if evidence < config.ADAPTIVE_MIN_EVIDENCE:
+        return 'easy'
+    if accuracy >= config.ADAPTIVE_HARD_ACCURACY:
+        return 'hard'
+    if accuracy >= config.ADAPTIVE_MEDIUM_ACCURACY:
+        return 'medium'
+    return 'easy'
+
+def _decay_factor(elapsed, half_life):
+    return math.pow(0.5, max(0, elapsed) / half_life)
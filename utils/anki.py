@@ -0,0 +1,450 @@
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import textwrap
+import time
+import zipfile
+from pathlib import Path
+import config
+from utils.file_handler import load_json, load_corpus, save_json
+from utils.records import Noun, Verb, VocabItem, RecordError
+from utils.noun_predictor import NounPredictor, annotate
+from utils.translations import translate
+from utils.stats_store import load_stats
+
+FIELD_SEPARATOR = '\x1f'
+# Newer Anki versions put a stub collection.anki2 next to the real collection.anki21.
+COLLECTION_NAMES = ('collection.anki21', 'collection.anki2')
+_TAG_RE = re.compile(r'<[^>]+>')
+_SOUND_RE = re.compile(r'\[sound:[^\]]*\]')
+_SPACE_RE = re.compile(r'\s+')
+
+class Target:
+    """A corpus kind notes can be imported into: its record class, key field and Anki field names."""
+    def __init__(self, record_class, key_field, fields, categories=()):
+        """
+        :param fields: поле записи -> возможные имена поля в Anki; первое имя используется при экспорте
+        :param categories: категории статистики, ключом в которых служит key_field
+        """
+        self.record_class = record_class
+        self.key_field = key_field
+        self.fields = fields
+        self.categories = categories
+
+TARGETS = {
+    'vocab': Target(VocabItem, 'word', {
+        'word': ('Word', 'Front', 'German'),
+        'sentence': ('Sentence', 'Example'),
+        'answer': ('Answer',),
+        'translation': ('Translation', 'Meaning', 'Back'),
+    }),
+    'nouns': Target(Noun, 'singular', {
+        'singular': ('Singular', 'Noun', 'Front', 'German'),
+        'gender': ('Gender', 'Article'),
+        'plural': ('Plural',),
+        'translation': ('Translation', 'Meaning', 'Back'),
+    }),
+    'verbs': Target(Verb, 'infinitive', {
+        'infinitive': ('Infinitive', 'Verb', 'Front', 'German'),
+        'auxiliary': ('Auxiliary',),
+        'partizip_2': ('Partizip II', 'Partizip', 'Participle'),
+        'translation': ('Translation', 'Meaning', 'Back'),
+    }, categories=('perfekt_auxiliary', 'partizip_2')),
+}
+
+def import_apkg(apkg_path, target, corpus_path, field_map=None, language='en', batch_size=config.ANKI_BATCH_SIZE, predictor=None):
+    """
+    Imports the notes of an .apkg file into a corpus file and returns counts of
+    imported, duplicate and skipped notes. Notes are read in batches of `batch_size` and
+    the corpus is written item by item to a temporary file that replaces it at the end, so
+    memory holds one batch, the keys of all items and the translations of the new notes.
+    An existing JSON corpus is read as a whole once (a compiled one is streamed) and
+    released before the notes are read.
+    Items whose key is already in the corpus (case-insensitive) are skipped as duplicates.
+    :param field_map: поле записи -> имя поля в Anki, дополняет имена по умолчанию
+    :param predictor: NounPredictor; существительные без рода или множественного числа
+        дополняются предсказанием, неуверенные помечаются тегом review
+    """
+    target = TARGETS[target]
+    corpus_path = Path(corpus_path)
+    seen = set()
+    translations = {}
+    counts = {'imported': 0, 'duplicates': 0, 'skipped': 0}
+    partial = corpus_path.with_name(corpus_path.name + '.part')
+    output = _ItemWriter(partial)
+    try:
+        if corpus_path.exists():
+            for item in load_corpus(corpus_path, target.record_class) or []:
+                item = _content(item)
+                seen.add(_fold(item[target.key_field]))
+                output.add(item)
+        _import_notes(apkg_path, target, field_map, predictor, batch_size, seen, output, translations, counts)
+        output.close()
+        if counts['imported']:
+            os.replace(partial, corpus_path)
+    finally:
+        output.close()
+        partial.unlink(missing_ok=True)
+
+    if counts['imported'] and translations:
+        _merge_translations(corpus_path.stem, translations, language)
+    return counts
+
+def _import_notes(apkg_path, target, field_map, predictor, batch_size, seen, output, translations, counts):
+    with _open_collection(apkg_path) as db:
+        layouts = {}
+        for model_id, names in _note_fields(db).items():
+            layouts[model_id] = _field_positions(names, target, field_map or {})
+        cursor = db.execute("SELECT mid, flds, tags FROM notes ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for model_id, flds, tags in rows:
+                item = _note_to_item(flds.split(FIELD_SEPARATOR), layouts.get(model_id, {}), target, tags, predictor)
+                if item is None:
+                    counts['skipped'] += 1
+                    continue
+                key = _fold(item[target.key_field])
+                if key in seen:
+                    counts['duplicates'] += 1
+                    continue
+                translation = item.pop('translation', None)
+                try:
+                    target.record_class.from_dict(item)
+                except RecordError:
+                    counts['skipped'] += 1
+                    continue
+                seen.add(key)
+                output.add(item)
+                if 'review' in item.get('tags', {}):
+                    counts['review'] = counts.get('review', 0) + 1
+                if translation:
+                    translations[item[target.key_field]] = translation
+                counts['imported'] += 1
+
+class _ItemWriter:
+    """Writes a JSON list one item at a time, in the layout of save_json."""
+    def __init__(self, path):
+        self._file = open(path, 'w', encoding='utf-8')
+        self._count = 0
+
+    def add(self, item):
+        self._file.write(",\n" if self._count else "[\n")
+        self._file.write(textwrap.indent(json.dumps(item, indent=4, ensure_ascii=False), '    '))
+        self._count += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.write("\n]" if self._count else "[]")
+            self._file.close()
+
+def export_apkg(apkg_path, target, corpus_path, stats=None, categories=None, language='en'):
+    """
+    Writes a corpus as an Anki deck. Per-item answers from stats become the cards'
+    review history (one revlog entry per answer), so Anki starts with our progress.
+    Returns the number of exported notes.
+    :param categories: категории статистики элементов; по умолчанию берутся из Target
+    """
+    target = TARGETS[target]
+    corpus_path = Path(corpus_path)
+    items = load_corpus(corpus_path, target.record_class)
+    if items is None:
+        return 0
+    stats = stats or {}
+    categories = categories or target.categories or (corpus_path.stem,)
+    now = int(time.time())
+    model_id, deck_id = now * 1000, now * 1000 + 1
+    field_names = [names[0] for names in target.fields.values()]
+    revlog_ids = set()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / 'collection.anki2'
+        db = sqlite3.connect(db_path)
+        db.executescript(ANKI_SCHEMA)
+        deck_name = f"deutsch::{corpus_path.stem}"
+        db.execute("INSERT INTO col VALUES (1, ?, ?, ?, 11, 0, 0, 0, ?, ?, ?, ?, '{}')", (
+            now - now % 86400, now * 1000, now * 1000, json.dumps(_collection_conf(deck_id, model_id)),
+            json.dumps({str(model_id): _model(model_id, deck_id, f"deutsch: {corpus_path.stem}", field_names)}),
+            json.dumps({'1': _deck(1, 'Default'), str(deck_id): _deck(deck_id, deck_name)}),
+            json.dumps({'1': _deck_conf()})
+        ))
+
+        for position, item in enumerate(items):
+            key = item.get(target.key_field)
+            values = [_export_value(item, field, corpus_path.stem, key, language) for field in target.fields]
+            note_id = model_id + 2 + position
+            guid = hashlib.sha1(f"deutsch:{corpus_path.stem}:{key}".encode('utf-8')).hexdigest()[:10]
+            db.execute("INSERT INTO notes VALUES (?, ?, ?, ?, -1, ?, ?, ?, ?, 0, '')", (
+                note_id, guid, model_id, now, _export_tags(item), FIELD_SEPARATOR.join(values),
+                values[0], _checksum(values[0])
+            ))
+
+            correct, incorrect, last_seen, next_review = _item_history(stats, categories, key, now)
+            reps = correct + incorrect
+            if reps:
+                interval = max(1, round((next_review - now) / 86400)) if next_review else 1
+                # Review cards are due in days counted from the collection's creation (today).
+                card = (2, 2, interval, interval)
+            else:
+                card = (0, 0, position, 0)
+            card_id = note_id
+            db.execute("INSERT INTO cards VALUES (?, ?, ?, 0, ?, -1, ?, ?, ?, ?, 2500, ?, ?, 0, 0, 0, 0, '')", (
+                card_id, note_id, deck_id, now, card[0], card[1], card[2], card[3], reps, incorrect
+            ))
+            # Only the totals are known, so the answers are spread over the seconds before the last one.
+            answers = [1] * incorrect + [3] * correct
+            for n, ease in enumerate(answers):
+                revlog_id = last_seen * 1000 - (reps - n) * 1000
+                while revlog_id in revlog_ids:
+                    revlog_id += 1
+                revlog_ids.add(revlog_id)
+                db.execute("INSERT INTO revlog VALUES (?, ?, -1, ?, 0, 0, 2500, 0, ?)", (
+                    revlog_id, card_id, ease, 0 if n == 0 else 1
+                ))
+        db.commit()
+        db.close()
+
+        with zipfile.ZipFile(apkg_path, 'w', zipfile.ZIP_DEFLATED) as apkg:
+            apkg.write(db_path, 'collection.anki2')
+            apkg.writestr('media', '{}')
+    return len(items)
+
+class _open_collection:
+    """Extracts the collection of an .apkg to a temporary file and opens it read-only."""
+    def __init__(self, apkg_path):
+        self.apkg_path = apkg_path
+        self._tmp = None
+        self._db = None
+
+    def __enter__(self):
+        with zipfile.ZipFile(self.apkg_path) as apkg:
+            names = set(apkg.namelist())
+            name = next((name for name in COLLECTION_NAMES if name in names), None)
+            if name is None:
+                raise ValueError(f"{self.apkg_path}: no Anki collection inside (only legacy .anki2/.anki21 are supported)")
+            self._tmp = tempfile.TemporaryDirectory()
+            path = Path(self._tmp.name) / name
+            with apkg.open(name) as source, open(path, 'wb') as out:
+                shutil.copyfileobj(source, out)
+        self._db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        return self._db
+
+    def __exit__(self, *exc):
+        self._db.close()
+        self._tmp.cleanup()
+
+def _note_fields(db):
+    """Returns model id -> field names; newer collections keep them in a table, older ones in col.models."""
+    has_table = db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'fields'").fetchone()
+    if has_table:
+        models = {}
+        for model_id, _, name in db.execute("SELECT ntid, ord, name FROM fields ORDER BY ntid, ord"):
+            models.setdefault(model_id, []).append(name)
+        return models
+    models = json.loads(db.execute("SELECT models FROM col").fetchone()[0])
+    return {int(model_id): [f['name'] for f in sorted(model['flds'], key=lambda f: f['ord'])]
+            for model_id, model in models.items()}
+
+def _field_positions(names, target, field_map):
+    """Maps record fields to field positions of one note type; explicit mappings win over default names."""
+    positions = {_fold(name): i for i, name in enumerate(names)}
+    layout = {}
+    for field, candidates in target.fields.items():
+        for name in ((field_map[field],) if field in field_map else candidates):
+            if _fold(name) in positions:
+                layout[field] = positions[_fold(name)]
+                break
+    return layout
+
+def _note_to_item(values, layout, target, tags, predictor=None):
+    item = {}
+    for field, position in layout.items():
+        if position < len(values):
+            value = _clean(values[position])
+            if value:
+                item[field] = value
+    tags = _import_tags(tags)
+    if tags:
+        item['tags'] = tags
+    if target.record_class is Noun:
+        _split_article(item)
+        if predictor is not None and item.get('singular'):
+            annotate([item], predictor)
+    elif target.record_class is Verb and item.get('auxiliary') not in ('haben', 'sein'):
+        return None
+    if any(not item.get(name) for name in target.record_class.REQUIRED):
+        return None
+    return item
+
+def _split_article(item):
+    """Accepts "der Tisch" / "die Tische" in the noun fields when there is no separate gender field."""
+    singular = item.get('singular', '')
+    article, _, noun = singular.partition(' ')
+    if article.lower() in ('der', 'die', 'das') and noun:
+        item.setdefault('gender', article.lower())
+        item['singular'] = noun
+    plural = item.get('plural', '')
+    if plural.lower().startswith('die '):
+        item['plural'] = plural[4:]
+    if item.get('gender', '').lower() not in ('der', 'die', 'das'):
+        item.pop('gender', None)
+    else:
+        item['gender'] = item['gender'].lower()
+
+def _import_tags(tags):
+    """Hierarchical Anki tags like "level::A1" become item tags; plain tags are dropped."""
+    result = {}
+    for tag in tags.split():
+        name, sep, value = tag.partition('::')
+        if sep and value:
+            result[name] = value
+    return result
+
+def _export_tags(item):
+    tags = item.get('tags', {})
+    return f" {' '.join(f'{name}::{value}' for name, value in tags.items())} " if tags else ''
+
+def _export_value(item, field, corpus, key, language):
+    if field == 'translation':
+        return html.escape(translate(item, corpus, key, language) or '')
+    return html.escape(str(item.get(field, '')))
+
+def _item_history(stats, categories, key, now):
+    correct = incorrect = 0
+    last_seen, next_review = 0, 0
+    for category in categories:
+        data = stats.get(category, {}).get(key)
+        if not isinstance(data, dict):
+            continue
+        correct += data.get('correct', 0)
+        incorrect += data.get('incorrect', 0)
+        if data.get('decay'):
+            last_seen = max(last_seen, int(data['decay'][2]))
+        next_review = max(next_review, data.get('next_review', 0))
+    return correct, incorrect, last_seen or now, next_review
+
+def _merge_translations(corpus, translations, language):
+    """Adds imported translations to data/translations/<language>.json without overwriting existing ones."""
+    path = config.TRANSLATIONS_DIR / f"{language}.json"
+    table = (load_json(path) if path.exists() else None) or {}
+    section = table.setdefault(corpus, {})
+    for key, text in translations.items():
+        section.setdefault(key, text)
+    save_json(path, table)
+
+def _clean(value):
+    """Strips HTML markup and sound references from an Anki field."""
+    value = _SOUND_RE.sub('', value.replace('<br>', ' ').replace('&nbsp;', ' '))
+    return _SPACE_RE.sub(' ', html.unescape(_TAG_RE.sub('', value))).strip()
+
+def _checksum(value):
+    return int(hashlib.sha1(_clean(value).encode('utf-8')).hexdigest()[:8], 16)
+
+def _fold(value):
+    return str(value).casefold()
+
+def _content(item):
+    return item.to_dict() if hasattr(item, 'to_dict') else item
+
+def _model(model_id, deck_id, name, field_names):
+    return {
+        "id": model_id, "name": name, "type": 0, "mod": model_id // 1000, "usn": -1, "sortf": 0, "did": deck_id,
+        "tmpls": [{
+            "name": "Card 1", "ord": 0, "did": None, "bqfmt": "", "bafmt": "",
+            "qfmt": "{{" + field_names[0] + "}}",
+            "afmt": "{{FrontSide}}<hr id=answer>" + "<br>".join("{{" + name + "}}" for name in field_names[1:])
+        }],
+        "flds": [{"name": name, "ord": i, "sticky": False, "rtl": False, "font": "Arial", "size": 20, "media": []}
+                 for i, name in enumerate(field_names)],
+        "css": ".card { font-family: arial; font-size: 20px; text-align: center; }",
+        "latexPre": "\\documentclass[12pt]{article}\n\\begin{document}\n", "latexPost": "\\end{document}",
+        "tags": [], "vers": [], "req": [[0, "any", [0]]]
+    }
+
+def _deck(deck_id, name):
+    return {
+        "id": deck_id, "name": name, "desc": "", "mod": 0, "usn": -1, "collapsed": False, "dyn": 0, "conf": 1,
+        "newToday": [0, 0], "revToday": [0, 0], "lrnToday": [0, 0], "timeToday": [0, 0], "extendNew": 10, "extendRev": 50
+    }
+
+def _deck_conf():
+    return {
+        "id": 1, "name": "Default", "mod": 0, "usn": -1, "maxTaken": 60, "autoplay": True, "timer": 0, "replayq": True,
+        "new": {"delays": [1, 10], "ints": [1, 4, 7], "initialFactor": 2500, "order": 1, "perDay": 20},
+        "rev": {"perDay": 200, "ease4": 1.3, "fuzz": 0.05, "maxIvl": 36500},
+        "lapse": {"delays": [10], "mult": 0, "minInt": 1, "leechFails": 8, "leechAction": 0}
+    }
+
+def _collection_conf(deck_id, model_id):
+    return {"activeDecks": [deck_id], "curDeck": deck_id, "curModel": str(model_id), "nextPos": 1,
+            "sortType": "noteFld", "sortBackwards": False, "newSpread": 0, "collapseTime": 1200}
+
+# Legacy collection schema (version 11), which every Anki version can import.
+ANKI_SCHEMA = """
+CREATE TABLE col (id integer primary key, crt integer not null, mod integer not null, scm integer not null,
+    ver integer not null, dty integer not null, usn integer not null, ls integer not null, conf text not null,
+    models text not null, decks text not null, dconf text not null, tags text not null);
+CREATE TABLE notes (id integer primary key, guid text not null, mid integer not null, mod integer not null,
+    usn integer not null, tags text not null, flds text not null, sfld integer not null, csum integer not null,
+    flags integer not null, data text not null);
+CREATE TABLE cards (id integer primary key, nid integer not null, did integer not null, ord integer not null,
+    mod integer not null, usn integer not null, type integer not null, queue integer not null, due integer not null,
+    ivl integer not null, factor integer not null, reps integer not null, lapses integer not null,
+    left integer not null, odue integer not null, odid integer not null, flags integer not null, data text not null);
+CREATE TABLE revlog (id integer primary key, cid integer not null, usn integer not null, ease integer not null,
+    ivl integer not null, lastIvl integer not null, factor integer not null, time integer not null, type integer not null);
+CREATE TABLE graves (usn integer not null, oid integer not null, type integer not null);
+CREATE INDEX ix_notes_csum ON notes (csum);
+CREATE INDEX ix_cards_nid ON cards (nid);
+CREATE INDEX ix_revlog_cid ON revlog (cid);
+"""
+
+def _parse_map(pairs):
+    field_map = {}
+    for pair in pairs or []:
+        field, sep, name = pair.partition('=')
+        if not sep:
+            raise argparse.ArgumentTypeError(f"expected field=AnkiField, got '{pair}'")
+        field_map[field] = name
+    return field_map
+
+def main():
+    parser = argparse.ArgumentParser(description="Imports Anki decks into the corpora and exports corpora as Anki decks.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    imp = commands.add_parser('import', help="add the notes of an .apkg file to a corpus")
+    imp.add_argument('apkg')
+    imp.add_argument('corpus', help="corpus JSON file, e.g. data/w_fragen.json")
+    imp.add_argument('--target', choices=sorted(TARGETS), default='vocab')
+    imp.add_argument('--map', action='append', metavar='FIELD=ANKI_FIELD', help="use this Anki field for a corpus field")
+    imp.add_argument('--language', default='en', help="language of the translation field")
+    imp.add_argument('--predict', action='store_true', help="nouns: predict a missing gender or plural from the word's ending")
+    exp = commands.add_parser('export', help="write a corpus and its stats as an .apkg file")
+    exp.add_argument('corpus')
+    exp.add_argument('apkg')
+    exp.add_argument('--target', choices=sorted(TARGETS), default='vocab')
+    exp.add_argument('--category', action='append', help="stats category of the items (default: by target)")
+    exp.add_argument('--language', default='en')
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        started = time.perf_counter()
+        predictor = NounPredictor.from_corpus() if args.predict else None
+        counts = import_apkg(args.apkg, args.target, args.corpus, _parse_map(args.map), args.language, predictor=predictor)
+        print(f"Imported {counts['imported']} notes into {args.corpus} "
+              f"({counts['duplicates']} duplicates, {counts['skipped']} skipped) in {time.perf_counter() - started:.1f} s")
+        if counts.get('review'):
+            print(f"{counts['review']} predicted nouns are tagged for review")
+    else:
+        stats = load_stats()
+        count = export_apkg(args.apkg, args.target, args.corpus, stats, args.category, args.language)
+        print(f"Exported {count} notes -> {args.apkg}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+import argparse
+import time
+from collections.abc import Mapping
+import config
+from utils.file_handler import load_json, save_json, file_lock
+from utils.leaderboard import Leaderboard
+from utils.stats_store import ShardedStats
+from utils.stats_sync import LOCAL_KEYS
+
+class GroupAggregates:
+    """
+    Materialized dashboard values of one class: answers and correct answers per category,
+    misses per item (kept ordered, so the most-missed items are read from the top) and the
+    last activity of every member. Each answer updates them in O(1) (O(log items) for the
+    ordered misses), so the dashboard never has to read the students' stats.
+    """
+    def __init__(self, data=None):
+        data = data or {}
+        self.members = data.get('members', {})
+        # category -> [answers, correct]
+        self.categories = data.get('categories', {})
+        self.misses = Leaderboard(data.get('misses'))
+
+    def to_dict(self):
+        return {"members": self.members, "categories": self.categories, "misses": self.misses.scores}
+
+    def record(self, user, category, key, is_correct, now=None):
+        totals = self.categories.setdefault(category, [0, 0])
+        totals[0] += 1
+        if is_correct:
+            totals[1] += 1
+        else:
+            self.misses.add(_item_id(category, key), 1)
+        self.members[user] = now or time.time()
+
+    def add_stats(self, stats):
+        """Adds the lifetime counters of one learner, e.g. of a student joining the class."""
+        for category, key, correct, incorrect in _counters(stats):
+            totals = self.categories.setdefault(category, [0, 0])
+            totals[0] += correct + incorrect
+            totals[1] += correct
+            if incorrect:
+                self.misses.add(_item_id(category, key), incorrect)
+
+    def merge(self, other):
+        """Adds the counts of another aggregate of the same class; members keep their latest activity."""
+        for category, (answers, correct) in other.categories.items():
+            totals = self.categories.setdefault(category, [0, 0])
+            totals[0] += answers
+            totals[1] += correct
+        for item, misses in other.misses.scores.items():
+            self.misses.add(item, misses)
+        for user, last_seen in other.members.items():
+            if (last_seen or 0) >= (self.members.get(user) or 0):
+                self.members[user] = last_seen
+
+    def accuracy(self):
+        """Returns [(category, answers, accuracy), ...] sorted by accuracy, weakest first."""
+        rows = [(category, answers, correct / answers) for category, (answers, correct) in self.categories.items() if answers]
+        return sorted(rows, key=lambda row: row[2])
+
+    def most_missed(self, n=10):
+        """Returns [(category, key, misses), ...] for the n items missed most often."""
+        return [(*item.split(':', 1), misses) for _, item, misses in self.misses.top(n)]
+
+    def active_members(self, window=config.CLASSROOM_ACTIVE_WINDOW, now=None):
+        since = (now or time.time()) - window
+        return sorted(user for user, last_seen in self.members.items() if last_seen and last_seen >= since)
+
+class ClassroomService:
+    """
+    All classes stored in one shared file, like the leaderboard. Fed by the answer hook in
+    stats_manager. The members of a class learn at the same time, so save() merges this
+    session's changes into the current file under a lock instead of writing back what was loaded.
+    """
+    def __init__(self, data=None):
+        data = data or {}
+        self.groups = {group: GroupAggregates(aggregates) for group, aggregates in data.get('groups', {}).items()}
+        # Changes since the last save: answers per class, learners who joined (with the
+        # counters they bring) and classes replaced as a whole.
+        self._changes = {}
+        self._joins = {}
+        self._replaced = {}
+
+    @classmethod
+    def load(cls, path=config.CLASSROOM_FILE):
+        with file_lock(path):
+            return cls(load_json(path) if path.exists() else None)
+
+    def save(self, path=config.CLASSROOM_FILE):
+        with file_lock(path):
+            current = ClassroomService(load_json(path) if path.exists() else None)
+            current.groups.update(self._replaced)
+            for (group, user), joined in self._joins.items():
+                aggregates = current.groups.setdefault(group, GroupAggregates())
+                # Another session of the same learner may have joined them already.
+                if user not in aggregates.members:
+                    aggregates.merge(joined)
+            for group, changes in self._changes.items():
+                current.groups.setdefault(group, GroupAggregates()).merge(changes)
+            save_json(path, {"groups": {group: aggregates.to_dict() for group, aggregates in current.groups.items()}})
+        # The other members' answers become visible after every save.
+        self.groups = current.groups
+        self._changes, self._joins, self._replaced = {}, {}, {}
+
+    def join(self, group, user, stats):
+        """Adds a learner to a class. Their existing counters are added once, so live updates start from them."""
+        aggregates = self.groups.setdefault(group, GroupAggregates())
+        if user not in aggregates.members:
+            joined = GroupAggregates()
+            joined.add_stats(stats)
+            joined.members[user] = None
+            aggregates.merge(joined)
+            self._joins[(group, user)] = joined
+
+    def record(self, group, user, category, key, is_correct):
+        """Called for every answer the trainers count."""
+        now = time.time()
+        self.groups[group].record(user, category, key, is_correct, now)
+        self._changes.setdefault(group, GroupAggregates()).record(user, category, key, is_correct, now)
+
+    def replace(self, group, aggregates):
+        """Replaces the stored aggregates of a class (e.g. with recomputed ones) on the next save."""
+        self.groups[group] = self._replaced[group] = aggregates
+        self._changes.pop(group, None)
+        self._joins = {(joined_group, user): joined for (joined_group, user), joined in self._joins.items()
+                       if joined_group != group}
+
+def recompute(stats_by_user):
+    """Builds the aggregates of a class from scratch out of its members' stats (for consistency checks)."""
+    aggregates = GroupAggregates()
+    for user, stats in stats_by_user.items():
+        aggregates.add_stats(stats)
+        aggregates.members[user] = None
+    return aggregates
+
+def differences(materialized, recomputed):
+    """Returns a list of human-readable differences between two aggregates of the same class."""
+    found = []
+    for category in sorted(set(materialized.categories) | set(recomputed.categories)):
+        a, b = materialized.categories.get(category, [0, 0]), recomputed.categories.get(category, [0, 0])
+        if a != b:
+            found.append(f"{category}: answers/correct {a[0]}/{a[1]}, recomputed {b[0]}/{b[1]}")
+    for item in sorted(set(materialized.misses.scores) | set(recomputed.misses.scores)):
+        a, b = materialized.misses.scores.get(item, 0), recomputed.misses.scores.get(item, 0)
+        if a != b:
+            found.append(f"{item}: {a} misses, recomputed {b}")
+    return found
+
+def _counters(stats):
+    for category, items in stats.items():
+        if category in LOCAL_KEYS or not isinstance(items, Mapping):
+            continue
+        for key, data in items.items():
+            if isinstance(data, dict) and 'correct' in data:
+                yield category, key, data.get('correct', 0), data.get('incorrect', 0)
+
+def _item_id(category, key):
+    return f"{category}:{key}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Class dashboards for teachers.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    dashboard = commands.add_parser('dashboard', help="show accuracy, most-missed items and active learners")
+    dashboard.add_argument('group')
+    dashboard.add_argument('--top', type=int, default=10)
+    check = commands.add_parser('check', help="recompute a class from its members' stats and compare")
+    check.add_argument('group')
+    check.add_argument('members', nargs='+', metavar='USER=STATS_DIR')
+    check.add_argument('--fix', action='store_true', help="replace the stored aggregates with the recomputed ones")
+    args = parser.parse_args()
+
+    service = ClassroomService.load()
+    if args.group not in service.groups:
+        print(f"Unknown class '{args.group}'. Classes: {', '.join(sorted(service.groups)) or '-'}")
+        return
+    aggregates = service.groups[args.group]
+
+    if args.command == 'dashboard':
+        active = aggregates.active_members()
+        print(f"Class {args.group}: {len(aggregates.members)} learners, {len(active)} active in the last "
+              f"{config.CLASSROOM_ACTIVE_WINDOW // 86400} days ({', '.join(active) or '-'})")
+        print("\nAccuracy by category:")
+        for category, answers, accuracy in aggregates.accuracy():
+            print(f"  {category.ljust(24)} {accuracy:>4.0%} of {answers}")
+        print("\nMost missed:")
+        for category, key, misses in aggregates.most_missed(args.top):
+            print(f"  {misses:>5}  {category}: {key}")
+        return
+
+    stats_by_user = {}
+    for member in args.members:
+        user, _, path = member.partition('=')
+        stats_by_user[user] = ShardedStats(path)
+    recomputed = recompute(stats_by_user)
+    found = differences(aggregates, recomputed)
+    for line in found:
+        print(line)
+    print(f"{len(found)} differences")
+    if found and args.fix:
+        for user, last_seen in aggregates.members.items():
+            recomputed.members[user] = last_seen
+        service.replace(args.group, recomputed)
+        service.save()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+from bisect import bisect_right
+from collections.abc import Sequence
+from pathlib import Path
+
+MAGIC = b'DCS1'
+# magic, record count, and the file offsets of: record offset table, record data,
+# key offset table, key data, key -> record position table (key offsets are 0 without a key field)
+HEADER = struct.Struct('<4sIQQQQQ')
+OFFSET = struct.Struct('<Q')
+POSITION = struct.Struct('<I')
+
+COMPILED_SUFFIX = '.dcs'
+
+class CorpusStore(Sequence):
+    """
+    Read-only corpus compiled by write_corpus(): an offset table plus packed UTF-8 JSON records,
+    opened with mmap. Items are decoded only when fetched, so resident memory does not grow
+    with the deck, and worker processes share the pages through the OS page cache.
+    """
+    def __init__(self, path, factory=None):
+        """:param factory: функция, превращающая словарь записи в объект (например, Noun.from_dict)"""
+        self.path = Path(path)
+        self.factory = factory
+        with open(self.path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, self._records, self._data, self._keys, self._key_data, self._key_positions = \
+            HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a compiled corpus file")
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def has_keys(self):
+        """False for a corpus compiled without a key field: find() cannot locate anything."""
+        return bool(self._keys)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        start = self._data + self._offset(self._records, index)
+        end = self._data + self._offset(self._records, index + 1)
+        item = json.loads(self._mm[start:end].decode('utf-8'))
+        return self.factory(item) if self.factory else item
+
+    def find(self, key):
+        """Returns the position of the item with this key (binary search over the sorted keys), or None."""
+        if not self._keys:
+            return None
+        target = key.encode('utf-8')
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self._key(low) == target:
+            return POSITION.unpack_from(self._mm, self._key_positions + low * POSITION.size)[0]
+        return None
+
+    def close(self):
+        self._mm.close()
+
+    def _offset(self, table, index):
+        return OFFSET.unpack_from(self._mm, table + index * OFFSET.size)[0]
+
+    def _key(self, index):
+        start = self._key_data + self._offset(self._keys, index)
+        end = self._key_data + self._offset(self._keys, index + 1)
+        return self._mm[start:end]
+
+class ChainedSequence(Sequence):
+    """Read-only view over several sequences (lists or stores) without copying them."""
+    def __init__(self, *parts):
+        self.parts = parts
+        self._ends = []
+        total = 0
+        for part in parts:
+            total += len(part)
+            self._ends.append(total)
+
+    def __len__(self):
+        return self._ends[-1] if self._ends else 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        part = bisect_right(self._ends, index)
+        start = self._ends[part - 1] if part else 0
+        return self.parts[part][index - start]
+
+def write_corpus(path, items, key_field=None):
+    """Compiles items into the binary corpus format read by CorpusStore."""
+    records = [json.dumps(item, ensure_ascii=False, separators=(',', ':')).encode('utf-8') for item in items]
+    record_offsets = _running_offsets(records)
+
+    keys = []
+    if key_field:
+        keys = sorted((item[key_field].encode('utf-8'), position) for position, item in enumerate(items))
+    key_bytes = [key for key, _ in keys]
+    key_offsets = _running_offsets(key_bytes)
+
+    records_table = HEADER.size
+    data = records_table + len(record_offsets) * OFFSET.size
+    keys_table = data + record_offsets[-1]
+    key_data = keys_table + len(key_offsets) * OFFSET.size
+    key_positions = key_data + key_offsets[-1]
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(records), records_table, data,
+                            keys_table if key_field else 0, key_data, key_positions))
+        f.writelines(OFFSET.pack(offset) for offset in record_offsets)
+        f.writelines(records)
+        f.writelines(OFFSET.pack(offset) for offset in key_offsets)
+        f.writelines(key_bytes)
+        f.writelines(POSITION.pack(position) for _, position in keys)
+
+def compiled_path(json_path):
+    return Path(json_path).with_suffix(COMPILED_SUFFIX)
+
+def _running_offsets(chunks):
+    offsets = [0]
+    for chunk in chunks:
+        offsets.append(offsets[-1] + len(chunk))
+    return offsets
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiles a JSON corpus file into the mmap-able binary format.")
+    parser.add_argument('json_file')
+    # The trainers look items up by key (a learner's counters are stored per key), so a
+    # store without a key table would silently lose them.
+    parser.add_argument('--key', required=True, help="field used for lookups by key, e.g. 'word' or 'singular'")
+    args = parser.parse_args()
+
+    with open(args.json_file, 'r', encoding='utf-8-sig') as f:
+        items = json.load(f)
+    target = compiled_path(args.json_file)
+    write_corpus(target, items, key_field=args.key)
+    print(f"{len(items)} items -> {target} ({os.path.getsize(target)} bytes)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import os
+import time
+import weakref
+import config
+from utils.records import RecordError
+
+class CorpusWatcher:
+    """
+    Polls the modification time of corpus files and calls a reload callback when one changed.
+    Callbacks are held as weak references, so a trainer that is no longer used stops being
+    notified without unregistering.
+    """
+    def __init__(self, interval=config.CORPUS_POLL_INTERVAL):
+        """:param interval: минимальное число секунд между проверками файлов"""
+        self.interval = interval
+        self._files = {}
+        self._last_poll = 0
+
+    def watch(self, path, callback):
+        """Calls callback(path) after `path` changed. Bound methods are not kept alive by the watcher."""
+        entry = self._files.setdefault(str(path), {"signature": _signature(path), "callbacks": []})
+        ref = weakref.WeakMethod(callback) if hasattr(callback, '__self__') else (lambda: callback)
+        entry['callbacks'].append(ref)
+
+    def poll(self, force=False):
+        """Checks the watched files (at most once per interval) and reloads the changed ones."""
+        now = time.monotonic()
+        if not force and now - self._last_poll < self.interval:
+            return
+        self._last_poll = now
+
+        for path, entry in self._files.items():
+            signature = _signature(path)
+            if signature == entry['signature']:
+                continue
+            entry['signature'] = signature
+            alive = []
+            for ref in entry['callbacks']:
+                callback = ref()
+                if callback is None:
+                    continue
+                alive.append(ref)
+                try:
+                    callback(path)
+                except RecordError as e:
+                    # A half-edited file keeps the loaded items until it is saved again.
+                    print(f"Warning: {path} was not reloaded: {e}")
+            entry['callbacks'] = alive
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+default_watcher = CorpusWatcher()
@@ -0,0 +1,196 @@
+import json
+from collections.abc import Sequence
+from pathlib import Path
+from utils.facets import FacetIndex, evaluate, positions_to_bits, bits_to_positions
+from utils.text_index import TextIndex
+
+class Deck(Sequence):
+    """
+    Items of one corpus file together with their search and facet indexes.
+    Items may be a list or a memory-mapped CorpusStore; the indexes are built on the
+    first filter query, so a session without filtering never reads the whole deck.
+    """
+    def __init__(self, items, text_fields=None, facet_fields=(), key_field=None, extra_text=None, sources=()):
+        """
+        :param text_fields: поля для полнотекстового поиска; None - без текстового индекса
+        :param facet_fields: простые поля, которые индексируются как фасеты (например, 'gender')
+        :param key_field: поле с уникальным ключом элемента (например, 'word')
+        :param extra_text: функция, возвращающая дополнительный текст для поиска (например, перевод)
+        :param sources: файлы корпуса; время их изменения входит в fingerprint
+        """
+        self.items = items
+        self.text_fields = text_fields
+        self.facet_fields = facet_fields
+        self.key_field = key_field
+        self.extra_text = extra_text
+        # Incremented on every update, so filtered selections know when to re-run their query.
+        self.version = 0
+        self.sources = [Path(path) for path in sources]
+        self._stamp = self._source_stamp()
+        self._text_index = None
+        self._facets = None
+        self._positions = None
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def fingerprint(self):
+        """
+        Tells whether positions saved earlier (e.g. in a shuffle bag) still refer to the same
+        items, also after a restart: the size and the modification times of the source files.
+        Costs O(1); decks without source files can only tell updates of this process apart.
+        """
+        return f"{len(self.items)}:{self._stamp if self.sources else self.version}"
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    @property
+    def text_index(self):
+        if self._text_index is None and self.text_fields:
+            self._text_index = TextIndex(self.items, self.text_fields, self.extra_text)
+        return self._text_index
+
+    @property
+    def facets(self):
+        if self._facets is None:
+            self._facets = FacetIndex(self.items, self.facet_fields)
+        return self._facets
+
+    def position_of(self, key):
+        """Returns the position of the item with this key, or None."""
+        if hasattr(self.items, 'find'):
+            return self.items.find(key)
+        return self._position_map().get(key)
+
+    def select(self, query):
+        """
+        Returns the items matching a query. "facet:value" terms use the facet bitsets,
+        other words are searched in the item text. Supports &, |, ! and parentheses.
+        :raises ValueError: если запрос синтаксически неверен
+        """
+        bits = evaluate(query, self._resolve_atom, self.facets.all_bits)
+        return [self.items[i] for i in bits_to_positions(bits)]
+
+    def update(self, new_items):
+        """
+        Applies a reloaded version of the corpus in place and returns (added, changed, removed).
+        Changed items keep their position, new items are appended and a removed item is
+        replaced by the last one, so the indexes are patched instead of rebuilt.
+        """
+        if not isinstance(self.items, list):
+            self.items = list(self.items)
+        positions = self._position_map()
+        new_by_key = {self._key(item): item for item in new_items}
+
+        removed = [key for key in positions if key not in new_by_key]
+        for key in removed:
+            self._remove(positions[key])
+
+        added = changed = 0
+        for key, item in new_by_key.items():
+            position = positions.get(key)
+            if position is None:
+                self._append(item)
+                added += 1
+            elif _content(self.items[position]) != _content(item):
+                self._replace(position, item)
+                changed += 1
+
+        if added or changed or removed:
+            self.version += 1
+        # The files were read again; a restart would see this stamp too.
+        self._stamp = self._source_stamp()
+        return added, changed, len(removed)
+
+    def _source_stamp(self):
+        return '-'.join(str(path.stat().st_mtime_ns) if path.exists() else '0' for path in self.sources)
+
+    def _append(self, item):
+        self.items.append(item)
+        if self._text_index is not None:
+            self._text_index.add(item)
+        if self._facets is not None:
+            self._facets.add(item)
+        self._positions[self._key(item)] = len(self.items) - 1
+
+    def _replace(self, position, item):
+        old_item = self.items[position]
+        self.items[position] = item
+        if self._text_index is not None:
+            self._text_index.replace(position, item)
+        if self._facets is not None:
+            self._facets.replace(position, old_item, item)
+
+    def _remove(self, position):
+        removed_key = self._key(self.items[position])
+        last = len(self.items) - 1
+        if position != last:
+            self._replace(position, self.items[last])
+            self._positions[self._key(self.items[position])] = position
+        last_item = self.items.pop()
+        if self._text_index is not None:
+            self._text_index.pop()
+        if self._facets is not None:
+            self._facets.pop(last_item)
+        del self._positions[removed_key]
+
+    def _position_map(self):
+        if self._positions is None:
+            self._positions = {self._key(item): i for i, item in enumerate(self.items)}
+        return self._positions
+
+    def _key(self, item):
+        # Decks without a key field are diffed by content: an edited item is removed and re-added.
+        if self.key_field:
+            return item.get(self.key_field)
+        return json.dumps(_content(item), sort_keys=True, ensure_ascii=False)
+
+    def _resolve_atom(self, atom):
+        if ':' in atom:
+            facet, value = atom.split(':', 1)
+            return self.facets.get(facet, value)
+        if self.text_index is None:
+            return 0
+        return positions_to_bits(self.text_index.search(atom), len(self.items))
+
+class DeckSelection(Sequence):
+    """Items of a deck matching a filter query; the query is re-run after the deck was updated."""
+    def __init__(self, deck, query, items):
+        self.deck = deck
+        self.query = query
+        self._items = items
+        self._version = deck.version
+
+    def __len__(self):
+        return len(self._current())
+
+    def __getitem__(self, index):
+        return self._current()[index]
+
+    def _current(self):
+        if self._version != self.deck.version:
+            self._version = self.deck.version
+            # If nothing matches any more, the session continues with the whole deck.
+            self._items = self.deck.select(self.query) or self.deck
+        return self._items
+
+def _content(item):
+    return item.to_dict() if hasattr(item, 'to_dict') else item
+
+def choose_items(loc, deck):
+    """Asks for an optional filter and returns the items the session is restricted to."""
+    while True:
+        query = input(loc.get('filter_prompt')).strip()
+        if not query:
+            return deck
+        try:
+            items = deck.select(query)
+        except ValueError as e:
+            print(loc.get('filter_invalid', error=e))
+            continue
+        if items:
+            print(loc.get('filter_found', count=len(items)))
+            return DeckSelection(deck, query, items)
+        print(loc.get('filter_not_found', query=query))
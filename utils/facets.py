@@ -0,0 +1,147 @@
+import re
+from collections import defaultdict
+
+_TOKEN_RE = re.compile(r"\s*([()&|!]|[^\s()&|!]+)")
+
+class FacetIndex:
+    """
+    One bitset (a Python int, bit i = item i) per facet value, e.g. ('level', 'A1') or ('gender', 'der').
+    Facets come from the optional "tags" dict of an item and from selected plain fields.
+    Any boolean combination of facets is resolved with bitwise operations.
+    """
+    def __init__(self, items, fields=()):
+        self.fields = fields
+        self.size = 0
+        self.bits = {}
+
+        positions = defaultdict(list)
+        for item in items:
+            for facet in self._item_facets(item):
+                positions[facet].append(self.size)
+            self.size += 1
+        for facet, item_positions in positions.items():
+            self.bits[facet] = positions_to_bits(item_positions, self.size)
+
+    def add(self, item):
+        """Indexes a new item and returns its position."""
+        position = self.size
+        self.size += 1
+        for facet in self._item_facets(item):
+            self.bits[facet] = self.bits.get(facet, 0) | (1 << position)
+        return position
+
+    def replace(self, position, old_item, new_item):
+        """Moves the bit of a changed item from its old facets to the new ones."""
+        self._clear(position, old_item)
+        for facet in self._item_facets(new_item):
+            self.bits[facet] = self.bits.get(facet, 0) | (1 << position)
+
+    def pop(self, item):
+        """Removes the item at the last position."""
+        self.size -= 1
+        self._clear(self.size, item)
+
+    def _clear(self, position, item):
+        mask = ~(1 << position)
+        for facet in self._item_facets(item):
+            bits = self.bits.get(facet, 0) & mask
+            if bits:
+                self.bits[facet] = bits
+            else:
+                self.bits.pop(facet, None)
+
+    @property
+    def all_bits(self):
+        return (1 << self.size) - 1
+
+    def get(self, facet, value):
+        return self.bits.get((facet, value.lower()), 0)
+
+    def values(self, facet):
+        """Returns the known values of a facet, e.g. values('level') -> ['a1', 'a2']."""
+        return sorted(value for name, value in self.bits if name == facet)
+
+    def _item_facets(self, item):
+        facets = []
+        for field in self.fields:
+            value = item.get(field)
+            if value is not None:
+                facets.append((field, str(value).lower()))
+        for facet, value in item.get('tags', {}).items():
+            values = value if isinstance(value, list) else [value]
+            facets.extend((facet, str(v).lower()) for v in values)
+        return facets
+
+def positions_to_bits(positions, size):
+    """Builds a bitset from item positions in one pass, without repeated big-int copies."""
+    buffer = bytearray((size + 7) // 8)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, 'little')
+
+def bits_to_positions(bits):
+    """Returns the sorted positions of the set bits."""
+    positions = []
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for byte_index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            positions.append(byte_index * 8 + low.bit_length() - 1)
+            byte ^= low
+    return positions
+
+def evaluate(query, resolve_atom, all_bits):
+    """
+    Evaluates a query like "level:A1 & (topic:household | topic:food) & !plural:e" to a bitset.
+    Adjacent terms without an operator are combined with AND.
+    :param resolve_atom: функция, возвращающая битовое множество для одного терма
+    :raises ValueError: если запрос синтаксически неверен
+    """
+    tokens = _TOKEN_RE.findall(query)
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else None
+
+    def take():
+        nonlocal position
+        position += 1
+        return tokens[position - 1]
+
+    def parse_or():
+        result = parse_and()
+        while peek() == '|':
+            take()
+            result |= parse_and()
+        return result
+
+    def parse_and():
+        result = parse_not()
+        while peek() not in (None, '|', ')'):
+            if peek() == '&':
+                take()
+            result &= parse_not()
+        return result
+
+    def parse_not():
+        token = peek()
+        if token is None:
+            raise ValueError("Unexpected end of query")
+        if token == '!':
+            take()
+            return all_bits & ~parse_not()
+        if token == '(':
+            take()
+            result = parse_or()
+            if peek() != ')':
+                raise ValueError("Missing ')'")
+            take()
+            return result
+        if token in ('&', '|', ')'):
+            raise ValueError(f"Unexpected '{token}'")
+        return resolve_atom(take())
+
+    result = parse_or()
+    if peek() is not None:
+        raise ValueError(f"Unexpected '{peek()}'")
+    return result
@@ -1,4 +1,13 @@
 import json
+from contextlib import contextmanager
+from pathlib import Path
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+from utils.corpus_store import CorpusStore, compiled_path
+from utils.records import build_records
 
 def load_json(file_path, encoding='utf-8-sig'):
     """Loads a JSON file and returns its content."""
@@ -12,7 +21,52 @@ def load_json(file_path, encoding='utf-8-sig'):
         print(f"Error: Failed to decode JSON in {file_path}:\n{e}")
         return None
 
+def load_records(file_path, record_class):
+    """Loads a list of items as typed records. Malformed items raise RecordError right away."""
+    return build_records(load_json(file_path), record_class, str(file_path))
+
+def load_corpus(file_path, record_class, key_field=None):
+    """
+    Loads a list corpus as typed records. A compiled .dcs file next to the JSON file is
+    memory-mapped instead, as long as it is not older than the JSON source.
+    :param key_field: поле, по которому тренажер ищет элементы; скомпилированный файл без ключей
+        тогда отвергается
+    :raises ValueError: если скомпилированный файл не содержит таблицы ключей для key_field
+    """
+    source, compiled = Path(file_path), compiled_path(file_path)
+    if compiled.exists() and (not source.exists() or compiled.stat().st_mtime >= source.stat().st_mtime):
+        store = CorpusStore(compiled, factory=record_class.from_dict)
+        if key_field and not store.has_keys:
+            store.close()
+            raise ValueError(f"{compiled} was compiled without a key table, but its items are looked up by "
+                             f"'{key_field}': recompile it with --key {key_field}")
+        return store
+    return load_records(file_path, record_class)
+
 def save_json(file_path, data, encoding='utf-8'):
     """Saves data to a JSON file."""
     with open(file_path, 'w', encoding=encoding) as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
\ No newline at end of file
+        json.dump(data, f, indent=4, ensure_ascii=False)
+
+@contextmanager
+def file_lock(file_path):
+    """
+    Holds an exclusive lock for a read-modify-write of a file that several processes
+    share (leaderboard, classroom). The lock is taken on "<name>.lock" next to it and
+    blocks until the other process is done.
+    """
+    lock_path = Path(file_path).with_name(Path(file_path).name + '.lock')
+    with open(lock_path, 'a+b') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,135 @@
+import argparse
+import sys
+import time
+from collections.abc import Mapping
+from multiprocessing import Pool
+from pathlib import Path
+try:
+    import numpy as np
+except ImportError:
+    # Only calibration needs numpy; the trainers read the published difficulties without it.
+    np = None
+import config
+from utils.file_handler import load_json, save_json
+from utils.stats_sync import LOCAL_KEYS
+from utils.stats_store import ShardedStats, HEADER_FILE
+
+NUMPY_MISSING = "Calibration needs numpy (pip install numpy). The trainer itself runs without it."
+
+def read_answers(path):
+    """
+    Returns [(category, key, correct, answers), ...] for every item counter of one learner's
+    stats, given as a stats directory or as a stats file in the old single-file format.
+    """
+    path = Path(path)
+    stats = ShardedStats(path) if path.is_dir() else load_json(path)
+    if stats is None:
+        return []
+    answers = []
+    for category, items in stats.items():
+        if category in LOCAL_KEYS or not isinstance(items, Mapping):
+            continue
+        for key, data in items.items():
+            if isinstance(data, dict) and 'correct' in data:
+                total = data.get('correct', 0) + data.get('incorrect', 0)
+                if total:
+                    answers.append((category, key, data['correct'], total))
+    return answers
+
+def collect(paths, workers=None, batch_size=16):
+    """
+    Reads the stats files of all learners in parallel and returns the observations as
+    arrays (learner, item, correct, answers) plus the list of (category, key) items.
+    Files are handed to the workers in batches of `batch_size`.
+    """
+    item_ids = {}
+    learners, items, correct, answers = [], [], [], []
+    with Pool(workers) as pool:
+        for learner, rows in enumerate(pool.imap(read_answers, paths, chunksize=batch_size)):
+            for category, key, right, total in rows:
+                item = item_ids.setdefault((category, key), len(item_ids))
+                learners.append(learner)
+                items.append(item)
+                correct.append(right)
+                answers.append(total)
+    return (np.array(learners, dtype=np.int64), np.array(items, dtype=np.int64),
+            np.array(correct, dtype=np.float64), np.array(answers, dtype=np.float64), list(item_ids))
+
+def fit_rasch(learners, items, correct, answers, l2=config.IRT_L2, iterations=200, tolerance=1e-4):
+    """
+    Fits the Rasch model P(correct) = sigmoid(ability[learner] - difficulty[item]) to binomial
+    counts by alternating Newton steps, each one vectorized over all observations with bincount.
+    The L2 penalty is a normal prior around 0; it keeps items that everyone (or no one)
+    answers correctly finite and fixes the scale, so an average item has difficulty 0.
+    Returns (ability, difficulty).
+    """
+    ability = np.zeros(learners.max() + 1 if len(learners) else 0)
+    difficulty = np.zeros(items.max() + 1 if len(items) else 0)
+    for _ in range(iterations):
+        residual, information = _derivatives(ability, difficulty, learners, items, correct, answers)
+        step = (np.bincount(learners, residual, len(ability)) - l2 * ability) \
+            / (np.bincount(learners, information, len(ability)) + l2)
+        ability += np.clip(step, -1, 1)
+
+        residual, information = _derivatives(ability, difficulty, learners, items, correct, answers)
+        # The likelihood falls with difficulty, hence the minus sign.
+        item_step = (-np.bincount(items, residual, len(difficulty)) - l2 * difficulty) \
+            / (np.bincount(items, information, len(difficulty)) + l2)
+        difficulty += np.clip(item_step, -1, 1)
+
+        if max(np.abs(step).max(initial=0), np.abs(item_step).max(initial=0)) < tolerance:
+            break
+    return ability, difficulty
+
+def _derivatives(ability, difficulty, learners, items, correct, answers):
+    expected = 1 / (1 + np.exp(difficulty[items] - ability[learners]))
+    return correct - answers * expected, answers * expected * (1 - expected)
+
+def calibrate(paths, output=config.ITEM_DIFFICULTY_FILE, workers=None, min_answers=config.IRT_MIN_ANSWERS, l2=config.IRT_L2):
+    """Fits difficulties over all learners' stats files and writes them to the corpus data. Returns the item count."""
+    if np is None:
+        raise RuntimeError(NUMPY_MISSING)
+    learners, items, correct, answers, item_keys = collect(paths, workers)
+    if not len(items):
+        return 0
+    _, difficulty = fit_rasch(learners, items, correct, answers, l2)
+    evidence = np.bincount(items, answers, len(item_keys))
+
+    result = {}
+    for (category, key), value, total in zip(item_keys, difficulty, evidence):
+        if total >= min_answers:
+            result.setdefault(category, {})[key] = round(float(value), 3)
+    save_json(output, {
+        "learners": int(learners.max()) + 1,
+        "answers": int(answers.sum()),
+        "calibrated": int(time.time()),
+        "difficulty": result
+    })
+    return sum(len(keys) for keys in result.values())
+
+def _stats_files(sources):
+    for source in map(Path, sources):
+        if source.is_dir() and not (source / HEADER_FILE).exists():
+            # A directory of learners: stats directories and/or single stats files.
+            yield from sorted(p for p in source.iterdir() if (p / HEADER_FILE).exists() or p.suffix == '.json')
+        else:
+            yield source
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrates item difficulties (Rasch model) from the stats of many learners.")
+    parser.add_argument('sources', nargs='+', help="stats of the learners, or directories that contain them")
+    parser.add_argument('--output', default=str(config.ITEM_DIFFICULTY_FILE))
+    parser.add_argument('--workers', type=int, help="processes reading the stats files (default: all cores)")
+    parser.add_argument('--min-answers', type=int, default=config.IRT_MIN_ANSWERS,
+                        help="answers over all learners an item needs to be written")
+    parser.add_argument('--l2', type=float, default=config.IRT_L2, help="strength of the prior towards average difficulty")
+    args = parser.parse_args()
+    if np is None:
+        sys.exit(NUMPY_MISSING)
+
+    started = time.perf_counter()
+    count = calibrate(list(_stats_files(args.sources)), args.output, args.workers, args.min_answers, args.l2)
+    print(f"Calibrated {count} items -> {args.output} in {time.perf_counter() - started:.1f} s")
+
+if __name__ == '__main__':
+    main()
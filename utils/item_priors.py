@@ -0,0 +1,42 @@
+import math
+import threading
+import config
+from utils.file_handler import load_json
+
+_difficulties = None
+_category_priors = {}
+_lock = threading.Lock()
+
+def get_difficulties():
+    """
+    Returns the calibrated item difficulties (category -> key -> logit) written by utils.irt,
+    loading data/item_difficulty.json on first use. Without the file every item is average.
+    """
+    global _difficulties
+    if _difficulties is None:
+        with _lock:
+            if _difficulties is None:
+                path = config.ITEM_DIFFICULTY_FILE
+                data = (load_json(path) if path.exists() else None) or {}
+                _difficulties = data.get('difficulty', {})
+    return _difficulties
+
+def category_priors(category):
+    """Returns key -> prior weight for the calibrated items of one category."""
+    priors = _category_priors.get(category)
+    if priors is None:
+        priors = {key: _weight(difficulty) for key, difficulty in get_difficulties().get(category, {}).items()}
+        _category_priors[category] = priors
+    return priors
+
+def prior_weight(category, key):
+    """
+    Selection weight of an item the learner has never answered: 1 for an average item,
+    up to 2 for items most learners get wrong and down to 0 for items almost everyone knows.
+    """
+    difficulty = get_difficulties().get(category, {}).get(key)
+    return 1 if difficulty is None else _weight(difficulty)
+
+def _weight(difficulty):
+    # Twice the chance that an average learner answers wrong.
+    return 2 / (1 + math.exp(-difficulty))
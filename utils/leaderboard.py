@@ -0,0 +1,229 @@
+import argparse
+import datetime
+import random
+import config
+from utils.file_handler import load_json, save_json, file_lock
+
+MAX_LEVEL = 32
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, height):
+        self.key = key
+        self.next = [None] * height
+        # width[i] - how many positions the link next[i] skips (a link to the end counts as size + 1)
+        self.width = [1] * height
+
+class IndexedSkipList:
+    """
+    Sorted list of unique keys with O(log n) insert, remove, rank and access by rank.
+    Each link stores how many positions it skips, so the rank of a key is the sum
+    of the widths passed on the way to it.
+    """
+    def __init__(self):
+        self.head = _Node(None, MAX_LEVEL)
+        self.level = 1
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def insert(self, key):
+        update, ranks = self._find(key)
+        position = ranks[0]
+        height = self._random_height()
+        if height > self.level:
+            for level in range(self.level, height):
+                update[level] = self.head
+                ranks[level] = 0
+                self.head.width[level] = self.size + 1
+            self.level = height
+
+        node = _Node(key, height)
+        for level in range(height):
+            previous = update[level]
+            node.next[level] = previous.next[level]
+            previous.next[level] = node
+            node.width[level] = previous.width[level] - (position - ranks[level])
+            previous.width[level] = position - ranks[level] + 1
+        for level in range(height, self.level):
+            update[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, key):
+        update, _ = self._find(key)
+        node = update[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+        for level in range(self.level):
+            previous = update[level]
+            if previous.next[level] is node:
+                previous.width[level] += node.width[level] - 1
+                previous.next[level] = node.next[level]
+            else:
+                previous.width[level] -= 1
+        while self.level > 1 and self.head.next[self.level - 1] is None:
+            self.level -= 1
+        self.size -= 1
+
+    def bisect_left(self, key):
+        """Returns the number of keys smaller than `key`."""
+        return self._find(key)[1][0]
+
+    def __getitem__(self, index):
+        return self._node_at(index).key
+
+    def iter_from(self, index):
+        """Yields keys in order, starting at position `index`."""
+        node = self._node_at(index) if index < self.size else None
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+    def _node_at(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        node, position = self.head, 0
+        for level in reversed(range(self.level)):
+            while node.next[level] is not None and position + node.width[level] <= index + 1:
+                position += node.width[level]
+                node = node.next[level]
+        return node
+
+    def _find(self, key):
+        """Returns the last node before `key` on every level and the position of each of them."""
+        update = [None] * MAX_LEVEL
+        ranks = [0] * MAX_LEVEL
+        node, position = self.head, 0
+        for level in reversed(range(self.level)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            update[level] = node
+            ranks[level] = position
+        return update, ranks
+
+    @staticmethod
+    def _random_height():
+        height = 1
+        while height < MAX_LEVEL and random.random() < 0.5:
+            height += 1
+        return height
+
+class Leaderboard:
+    """Scores of many users ordered by score (ties by user name)."""
+    def __init__(self, scores=None):
+        self.scores = {}
+        self._ranking = IndexedSkipList()
+        for user, score in (scores or {}).items():
+            self.set_score(user, score)
+
+    def __len__(self):
+        return len(self.scores)
+
+    def set_score(self, user, score):
+        old = self.scores.get(user)
+        if old == score:
+            return
+        if old is not None:
+            self._ranking.remove((-old, user))
+        self.scores[user] = score
+        self._ranking.insert((-score, user))
+
+    def add(self, user, points):
+        """Adds points to a user's score. Like total_score, it never goes below zero."""
+        self.set_score(user, max(0, self.scores.get(user, 0) + points))
+
+    def rank(self, user):
+        """Returns the 1-based rank of a user; users with equal scores share a rank."""
+        if user not in self.scores:
+            return None
+        return self._ranking.bisect_left((-self.scores[user], '')) + 1
+
+    def top(self, n=10, start=0):
+        """Returns [(rank, user, score), ...] for n users starting at position `start`."""
+        rows = []
+        for negative_score, user in self._ranking.iter_from(start):
+            if len(rows) == n:
+                break
+            rows.append((self.rank(user), user, -negative_score))
+        return rows
+
+class LeaderboardService:
+    """
+    All-time board mirroring total_score plus one board per ISO week with the points
+    earned during that week. Fed by the score hook in stats_manager on every answer.
+    Many learners share the file, so save() merges this session's changes into the
+    current file under a lock instead of writing back what was loaded.
+    """
+    def __init__(self, data=None, keep_weeks=config.LEADERBOARD_WEEKS):
+        data = data or {}
+        self.keep_weeks = keep_weeks
+        self.total = Leaderboard(data.get('scores'))
+        self.weeks = {week: Leaderboard(scores) for week, scores in data.get('weeks', {}).items()}
+        # Changes since the last save: total scores set and points per week and user.
+        self._totals = {}
+        self._points = {}
+
+    @classmethod
+    def load(cls, path=config.LEADERBOARD_FILE):
+        with file_lock(path):
+            return cls(load_json(path) if path.exists() else None)
+
+    def save(self, path=config.LEADERBOARD_FILE):
+        with file_lock(path):
+            current = LeaderboardService(load_json(path) if path.exists() else None, self.keep_weeks)
+            for user, score in self._totals.items():
+                current.total.set_score(user, score)
+            for week, points in self._points.items():
+                board = current.weeks.setdefault(week, Leaderboard())
+                for user, added in points.items():
+                    board.add(user, added)
+            for old in sorted(current.weeks)[:-self.keep_weeks]:
+                del current.weeks[old]
+            save_json(path, {
+                "scores": current.total.scores,
+                "weeks": {week: board.scores for week, board in current.weeks.items()}
+            })
+        # Other learners' scores become visible on the boards after every save.
+        self.total, self.weeks = current.total, current.weeks
+        self._totals, self._points = {}, {}
+
+    def set_total(self, user, total_score):
+        self.total.set_score(user, total_score)
+        self._totals[user] = total_score
+
+    def record(self, user, points, total_score, when=None):
+        """Called on every score change: sets the all-time score and adds points to the week."""
+        self.set_total(user, total_score)
+        self.week(when).add(user, points)
+        week_points = self._points.setdefault(week_of(when), {})
+        week_points[user] = week_points.get(user, 0) + points
+
+    def week(self, when=None):
+        """Returns the board of the week containing `when` (default: now)."""
+        week_id = week_of(when)
+        if week_id not in self.weeks:
+            self.weeks[week_id] = Leaderboard()
+            for old in sorted(self.weeks)[:-self.keep_weeks]:
+                del self.weeks[old]
+        return self.weeks[week_id]
+
+def week_of(when=None):
+    year, week, _ = (when or datetime.date.today()).isocalendar()
+    return f"{year}-W{week:02d}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Shows the leaderboard.")
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--week', action='store_true', help="show this week's points instead of total scores")
+    args = parser.parse_args()
+
+    service = LeaderboardService.load()
+    board = service.weeks.get(week_of(), Leaderboard()) if args.week else service.total
+    for rank, user, score in board.top(args.top):
+        print(f"{rank:>4}. {user.ljust(20)} {score}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+import importlib
+from utils.file_handler import load_json
+import config
+
+class ModeRegistry:
+    """
+    Trainer modes declared in modes.json.
+    A trainer module is imported only when its mode is selected, and decks that only
+    need a data file (like W-Fragen) are configured through "options" without new code.
+    """
+    def __init__(self, manifest_file=config.MODES_FILE):
+        self.modes = load_json(manifest_file)
+        if not self.modes:
+            raise FileNotFoundError(f"Could not load mode manifest {manifest_file}")
+        self._classes = {}
+
+    def __iter__(self):
+        return iter(self.modes)
+
+    def __len__(self):
+        return len(self.modes)
+
+    def get(self, mode_id):
+        for mode in self.modes:
+            if mode['id'] == mode_id:
+                return mode
+        raise KeyError(mode_id)
+
+    def create(self, mode, loc):
+        """Imports the trainer class of a mode (once) and instantiates it."""
+        trainer_class = self._classes.get(mode['id'])
+        if trainer_class is None:
+            module = importlib.import_module(mode['module'])
+            trainer_class = self._classes[mode['id']] = getattr(module, mode['class'])
+
+        options = dict(mode.get('options', {}))
+        if 'data_file' in options:
+            options['data_file'] = config.DATA_DIR / options['data_file']
+        return trainer_class(loc, **options)
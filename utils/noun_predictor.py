@@ -0,0 +1,238 @@
+import argparse
+import config
+from utils.file_handler import load_json, load_corpus, save_json
+from utils.records import Noun
+
+GENDERS = ('der', 'die', 'das')
+# Plural classes as used in the "plural" tag of nouns.json.
+PLURAL_ENDINGS = {'zero': '', 'e': 'e', 'er': 'er', 'n': 'n', 'en': 'en', 'nen': 'nen', 's': 's',
+                  'uml': '', 'uml-e': 'e', 'uml-er': 'er'}
+# Suffix rules that hold for most German nouns; (suffix, gender, plural class).
+RULES = (
+    ('ung', 'die', 'en'), ('heit', 'die', 'en'), ('keit', 'die', 'en'), ('schaft', 'die', 'en'),
+    ('ion', 'die', 'en'), ('tät', 'die', 'en'), ('ik', 'die', 'en'), ('ei', 'die', 'en'),
+    ('ur', 'die', 'en'), ('anz', 'die', 'en'), ('enz', 'die', 'en'), ('ie', 'die', 'n'),
+    ('erin', 'die', 'nen'), ('e', 'die', 'n'),
+    ('chen', 'das', 'zero'), ('lein', 'das', 'zero'), ('ment', 'das', 'e'), ('tum', 'das', 'uml-er'),
+    ('ling', 'der', 'e'), ('or', 'der', 'en'), ('ist', 'der', 'en'), ('er', 'der', 'zero'), ('el', 'der', 'zero'),
+)
+RULE_WEIGHT = 10 # a rule counts like this many nouns with the suffix
+MAX_DEPTH = 8 # longest suffix that is learned from the corpus
+MIN_SUPPORT = 2 # nouns (or rule weight) a suffix needs before it is trusted
+MIN_PART = 3 # shortest head and first part of a compound (Haus|tür, not R|eis)
+HEAD_CONFIDENCE = 0.9 # a compound takes the gender of its head with few exceptions (der Mut, die Demut)
+
+class _Node:
+    __slots__ = ('children', 'genders', 'plurals')
+
+    def __init__(self):
+        self.children = {}
+        self.genders = {}
+        self.plurals = {}
+
+class Prediction:
+    """Predicted gender and plural of a noun with the share of evidence behind each."""
+    def __init__(self, word, gender, gender_confidence, plural_class, plural_confidence, plural_classes):
+        self.word = word
+        self.gender = gender
+        self.gender_confidence = gender_confidence
+        self.plural_class = plural_class
+        self.plural_confidence = plural_confidence
+        # All plural classes seen for the suffix, most likely first.
+        self.plural_classes = plural_classes
+
+    @property
+    def plural(self):
+        return make_plural(self.word, self.plural_class)
+
+class NounPredictor:
+    """
+    Predicts the gender and plural class of a noun from its ending.
+
+    The corpus nouns are stored in a trie of reversed words, and every node counts the
+    genders and plural classes of the nouns ending in that suffix; the rule table adds
+    weighted counts for well-known suffixes. A prediction walks the reversed word, so it
+    costs O(word length), and uses the longest suffix with enough support. A word that
+    is a corpus noun, or ends in one (a compound), takes the gender and plural class of
+    that noun first: Haustür -> Tür -> die, even though "-tür" alone is too rare a suffix.
+    """
+    def __init__(self, nouns=(), rules=RULES):
+        self.root = _Node()
+        # lower-case singular -> (gender, plural class) of the corpus nouns
+        self.heads = {}
+        for noun in nouns:
+            plural_class = plural_class_of(noun)
+            self._add_word(noun.get('singular'), noun.get('gender'), plural_class)
+            if noun.get('singular') and noun.get('gender') in GENDERS:
+                self.heads[noun.get('singular').lower()] = (noun.get('gender'), plural_class)
+        for suffix, gender, plural_class in rules:
+            self._add_suffix(suffix, gender, plural_class, RULE_WEIGHT)
+
+    @classmethod
+    def from_corpus(cls, path=config.NOUNS_FILE):
+        return cls(load_corpus(path, Noun) or ())
+
+    def predict(self, word):
+        node = self.root
+        gender_node = plural_node = self.root
+        for char in reversed(word.lower()[-MAX_DEPTH:]):
+            node = node.children.get(char)
+            if node is None:
+                break
+            if sum(node.genders.values()) >= MIN_SUPPORT:
+                gender_node = node
+            if sum(node.plurals.values()) >= MIN_SUPPORT:
+                plural_node = node
+
+        gender, gender_confidence = _best(gender_node.genders)
+        plural_classes = sorted(plural_node.plurals, key=plural_node.plurals.get, reverse=True)
+        plural_class, plural_confidence = _best(plural_node.plurals)
+        head = self._head(word)
+        if head:
+            gender, head_plural, confidence = head
+            gender_confidence = confidence
+            if head_plural:
+                plural_class, plural_confidence = head_plural, confidence
+                plural_classes = [head_plural] + [other for other in plural_classes if other != head_plural]
+        return Prediction(word, gender or 'der', gender_confidence, plural_class or 'e', plural_confidence, plural_classes)
+
+    def wrong_plurals(self, word, correct_plural, count=2):
+        """Returns plausible but wrong plural forms: the likeliest plural classes for the suffix first."""
+        candidates = self.predict(word).plural_classes + list(PLURAL_ENDINGS)
+        wrong = []
+        for plural_class in candidates:
+            plural = make_plural(word, plural_class)
+            if plural != correct_plural and plural not in wrong:
+                wrong.append(plural)
+                if len(wrong) == count:
+                    break
+        return wrong
+
+    def _head(self, word):
+        """(gender, plural class, confidence) of the corpus noun the word is or ends in, longest first; else None."""
+        word = word.lower()
+        if word in self.heads:
+            return (*self.heads[word], 1.0)
+        for start in range(MIN_PART, len(word) - MIN_PART + 1):
+            head = self.heads.get(word[start:])
+            if head:
+                return (*head, HEAD_CONFIDENCE)
+        return None
+
+    def _add_word(self, word, gender, plural_class):
+        if not word or gender not in GENDERS:
+            return
+        node = self.root
+        _count(node, gender, plural_class, 1)
+        for char in reversed(word.lower()[-MAX_DEPTH:]):
+            node = node.children.setdefault(char, _Node())
+            _count(node, gender, plural_class, 1)
+
+    def _add_suffix(self, suffix, gender, plural_class, weight):
+        # Only the suffix node itself gets the rule, not its shorter suffixes.
+        node = self.root
+        for char in reversed(suffix):
+            node = node.children.setdefault(char, _Node())
+        _count(node, gender, plural_class, weight)
+
+def _count(node, gender, plural_class, weight):
+    node.genders[gender] = node.genders.get(gender, 0) + weight
+    if plural_class:
+        node.plurals[plural_class] = node.plurals.get(plural_class, 0) + weight
+
+def _best(counts):
+    # One extra unseen observation keeps a suffix seen twice from claiming full confidence.
+    if not counts:
+        return None, 0.0
+    value = max(counts, key=counts.get)
+    return value, counts[value] / (sum(counts.values()) + 1)
+
+def umlaut(word):
+    """Puts an umlaut on the last a, o, u or au of a word (Haus -> Häus, Apfel -> Äpfel)."""
+    for i in range(len(word) - 1, -1, -1):
+        char = word[i]
+        if char in 'aouAOU':
+            if char in 'uU' and i > 0 and word[i - 1] in 'aA':
+                i, char = i - 1, word[i - 1]
+            return word[:i] + char.translate(str.maketrans('aouAOU', 'äöüÄÖÜ')) + word[i + 1:]
+    return word
+
+def make_plural(singular, plural_class):
+    """Builds the plural form of a noun for a plural class ('uml-er': Buch -> Bücher)."""
+    stem = umlaut(singular) if plural_class.startswith('uml') else singular
+    ending = PLURAL_ENDINGS[plural_class]
+    if ending in ('n', 'en'):
+        # Lampe -> Lampen, Insel -> Inseln, but Frau -> Frauen and Mann -> Mannen.
+        ending = 'n' if singular.endswith(('e', 'el', 'er')) else 'en'
+    elif ending.startswith('e') and singular.endswith('e'):
+        # Käse -> Käse, never Käsee.
+        ending = ending[1:]
+    return stem + ending
+
+def plural_class_of(noun):
+    """The plural class of a corpus noun: its "plural" tag, else derived from singular and plural."""
+    tagged = (noun.get('tags') or {}).get('plural')
+    if tagged in PLURAL_ENDINGS:
+        return tagged
+    singular, plural = noun.get('singular'), noun.get('plural')
+    if singular and plural:
+        for plural_class in PLURAL_ENDINGS:
+            if make_plural(singular, plural_class) == plural:
+                return plural_class
+    return None
+
+def annotate(items, predictor, min_confidence=config.NOUN_REVIEW_CONFIDENCE):
+    """
+    Fills in a missing gender, plural and plural tag of noun items in place. Predictions
+    below `min_confidence` are marked with a "review" tag. Returns (annotated, flagged).
+    """
+    annotated = flagged = 0
+    for item in items:
+        if item.get('gender') and item.get('plural'):
+            continue
+        prediction = predictor.predict(item['singular'])
+        review = []
+        if not item.get('gender'):
+            item['gender'] = prediction.gender
+            if prediction.gender_confidence < min_confidence:
+                review.append('gender')
+        if not item.get('plural'):
+            item['plural'] = prediction.plural
+            item.setdefault('tags', {})['plural'] = prediction.plural_class
+            if prediction.plural_confidence < min_confidence:
+                review.append('plural')
+        annotated += 1
+        if review:
+            item.setdefault('tags', {})['review'] = ','.join(review)
+            flagged += 1
+    return annotated, flagged
+
+def main():
+    parser = argparse.ArgumentParser(description="Predicts noun genders and plurals from their endings.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    predict = commands.add_parser('predict', help="show predictions for some words")
+    predict.add_argument('words', nargs='+')
+    annotate_cmd = commands.add_parser('annotate', help="fill in missing genders and plurals of a noun list")
+    annotate_cmd.add_argument('input', help="JSON list of nouns or of plain words")
+    annotate_cmd.add_argument('output')
+    annotate_cmd.add_argument('--min-confidence', type=float, default=config.NOUN_REVIEW_CONFIDENCE,
+                              help="predictions below this are tagged for review")
+    args = parser.parse_args()
+
+    predictor = NounPredictor.from_corpus()
+    if args.command == 'predict':
+        for word in args.words:
+            p = predictor.predict(word)
+            print(f"{p.gender} {word} ({p.gender_confidence:.0%}), die {p.plural} [{p.plural_class}] ({p.plural_confidence:.0%})")
+        return
+
+    items = load_json(args.input)
+    if items is None:
+        return
+    items = [{'singular': item} if isinstance(item, str) else item for item in items]
+    annotated, flagged = annotate(items, predictor, args.min_confidence)
+    save_json(args.output, items)
+    print(f"Annotated {annotated} nouns, {flagged} flagged for review -> {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+import json
+import random
+import sys
+import time
+from collections.abc import Mapping
+from utils.scheduler import Scheduler
+from utils.corpus_watcher import default_watcher
+from utils.stats_sync import LOCAL_KEYS
+
+DIFFICULTIES = ('easy', 'medium', 'hard', 'adaptive')
+
+class ProtocolError(Exception):
+    """A command that cannot be carried out; reported as an error event, the session goes on."""
+
+class ProtocolSession:
+    """
+    Drives the trainers with JSON lines instead of menus: one command per input line,
+    one event per output line. Questions come from the same question sources the daily
+    mix uses, so no trainer menu or input() is involved.
+
+    Commands: {"cmd": "modes"}, {"cmd": "start", "mode": "nouns", "source": "noun_articles",
+    "difficulty": "easy"}, {"cmd": "answer", "answer": "der"} (or "option": 1 for choice
+    questions), {"cmd": "stop"}, {"cmd": "stats"} and {"cmd": "quit"}.
+    """
+    def __init__(self, registry, loc, stats, save, output=sys.stdout, trainers=None):
+        """
+        :param save: функция без аргументов, сохраняющая статистику и таблицы лидеров
+        :param output: поток для событий
+        :param trainers: общий кэш тренажеров по id режима (несколько учеников в одном процессе)
+        """
+        self.registry = registry
+        self.loc = loc
+        self.stats = stats
+        self.save = save
+        self.output = output
+        self._trainers = {} if trainers is None else trainers
+        self._session = None
+        self._handlers = {'modes': self._modes, 'start': self._start, 'answer': self._answer,
+                          'stop': self._stop, 'stats': self._stats}
+
+    def run(self, lines):
+        """Handles commands until "quit" or the end of the input."""
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                command = json.loads(line)
+            except json.JSONDecodeError as e:
+                self.emit('error', message=f"invalid JSON: {e}")
+                continue
+            if not self.handle(command):
+                break
+        self.close()
+
+    def handle(self, command):
+        """Carries out one decoded command. Returns False for "quit"."""
+        try:
+            if not isinstance(command, dict):
+                raise ProtocolError("a command must be a JSON object")
+            if command.get('cmd') == 'quit':
+                return False
+            handler = self._handlers.get(command.get('cmd'))
+            if handler is None:
+                raise ProtocolError(f"unknown command {command.get('cmd')!r}")
+            handler(command)
+        except ProtocolError as e:
+            self.emit('error', message=str(e))
+        except Exception as e:
+            self.emit('error', message=f"unexpected error: {e}")
+        return True
+
+    def close(self):
+        """Ends a running session (saving the stats) and says goodbye."""
+        self._end_session()
+        self.emit('bye', total_score=self.stats['total_score'])
+
+    def emit(self, event, **fields):
+        self.output.write(json.dumps({'event': event, **fields}, ensure_ascii=False) + "\n")
+        self.output.flush()
+
+    def _modes(self, command):
+        modes = []
+        for mode in self.registry:
+            sources = self._trainer(mode['id']).question_sources(self.stats, 'adaptive')
+            modes.append({'id': mode['id'], 'title': self.loc.get(mode['menu_key']),
+                          'sources': [source.source_id for source in sources]})
+        self.emit('modes', modes=modes)
+
+    def _start(self, command):
+        difficulty = command.get('difficulty', 'adaptive')
+        if difficulty not in DIFFICULTIES:
+            raise ProtocolError(f"difficulty must be one of {', '.join(DIFFICULTIES)}")
+        mode_id = command.get('mode')
+        trainer = self._trainer(mode_id)
+        sources = trainer.question_sources(self.stats, difficulty)
+        if command.get('source'):
+            sources = [source for source in sources if source.source_id == command['source']]
+            if not sources:
+                raise ProtocolError(f"mode {mode_id!r} has no source {command['source']!r}")
+        self._end_session()
+        # Sources with equal priority are asked in random order, as in the daily mix.
+        random.shuffle(sources)
+        self._session = _Session(mode_id, sources, Scheduler(sources, self.stats, getattr(trainer, 'quotas', None)))
+        self._next_question()
+
+    def _answer(self, command):
+        session = self._require_session()
+        question = session.question
+        if 'option' in command:
+            if not question.options:
+                raise ProtocolError("this question has no options, send \"answer\"")
+            try:
+                user_answer = question.options[int(command['option']) - 1]
+            except (TypeError, ValueError, IndexError):
+                raise ProtocolError(f"option must be 1-{len(question.options)}")
+        elif isinstance(command.get('answer'), str):
+            user_answer = command['answer']
+        else:
+            raise ProtocolError("answer needs \"answer\" (text) or \"option\" (number)")
+
+        elapsed = time.perf_counter_ns() - session.asked_at
+        is_correct = question.is_correct(user_answer)
+        session.sources_by_id[question.source].on_answer(question, is_correct)
+        session.answered += 1
+        session.correct += is_correct
+        self.emit('result', id=session.question_id, correct=is_correct, answer=question.answer,
+                  incorrect_lines=list(question.incorrect_lines) if not is_correct else [],
+                  response_ms=elapsed // 1_000_000, total_score=self.stats['total_score'])
+        self._next_question()
+
+    def _stop(self, command):
+        self._require_session()
+        self._end_session()
+
+    def _stats(self, command):
+        categories = {}
+        for category in self.stats:
+            items = self.stats[category]
+            if category in LOCAL_KEYS or not isinstance(items, Mapping):
+                continue
+            counters = [data for data in items.values() if isinstance(data, dict) and 'correct' in data]
+            if counters:
+                categories[category] = {'correct': sum(data['correct'] for data in counters),
+                                        'incorrect': sum(data.get('incorrect', 0) for data in counters)}
+        self.emit('stats', total_score=self.stats['total_score'], categories=categories)
+
+    def _trainer(self, mode_id):
+        # Trainers stay loaded, so restarting a mode does not read its corpus again.
+        if mode_id not in self._trainers:
+            try:
+                mode = self.registry.get(mode_id)
+            except KeyError:
+                raise ProtocolError(f"unknown mode {mode_id!r}")
+            self._trainers[mode_id] = self.registry.create(mode, self.loc)
+        return self._trainers[mode_id]
+
+    def _require_session(self):
+        if self._session is None:
+            raise ProtocolError("no session, send \"start\" first")
+        return self._session
+
+    def _next_question(self):
+        session = self._session
+        default_watcher.poll()
+        source = session.scheduler.next()
+        question = source.next_question()
+        question.source = source.source_id
+        session.question = question
+        session.question_id += 1
+        session.asked_at = time.perf_counter_ns()
+        self.emit('question', id=session.question_id, mode=session.mode_id, source=source.source_id,
+                  category=question.category, key=question.key, lines=list(question.lines),
+                  options=question.options, hint=question.hint)
+
+    def _end_session(self):
+        session, self._session = self._session, None
+        if session is None:
+            return
+        if session.question is not None and session.question.on_discard:
+            session.question.on_discard()
+        self.save()
+        self.emit('stopped', mode=session.mode_id, answered=session.answered, correct=session.correct,
+                  total_score=self.stats['total_score'])
+
+class _Session:
+    def __init__(self, mode_id, sources, scheduler):
+        self.mode_id = mode_id
+        self.sources_by_id = {source.source_id: source for source in sources}
+        self.scheduler = scheduler
+        self.question = None
+        self.question_id = 0
+        self.asked_at = 0
+        self.answered = 0
+        self.correct = 0
+
+def run_jsonl(registry, loc, stats, save):
+    """
+    Runs the JSON-lines protocol on stdin/stdout. Anything else written to stdout
+    (warnings of the trainers, for example) goes to stderr, so stdout carries only events.
+    """
+    output = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        ProtocolSession(registry, loc, stats, save, output).run(sys.stdin)
+    finally:
+        sys.stdout = output
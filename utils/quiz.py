@@ -0,0 +1,199 @@
+import asyncio
+import sys
+import threading
+import time
+from utils.ui import Frame
+from utils.corpus_watcher import default_watcher
+
+class Question:
+    """A single question produced by a trainer and asked by a QuizRunner."""
+    def __init__(self, lines, answer, options=None, hint=None, check=None,
+                 category=None, key=None, prompt_key='enter_answer_prompt', incorrect_lines=(), source=None,
+                 on_discard=None):
+        """
+        :param lines: строки вопроса, выводятся перед вариантами ответа
+        :param answer: правильный ответ (показывается при ошибке)
+        :param options: варианты для выбора; None означает ввод текста
+        :param hint: подсказка рядом с полем ввода (уровень medium)
+        :param check: своя функция проверки ответа, по умолчанию сравнение без учета регистра
+        :param category: категория статистики
+        :param key: ключ элемента в категории статистики
+        :param prompt_key: ключ локализации для приглашения ввода
+        :param incorrect_lines: дополнительные строки после неверного ответа
+        :param source: id источника вопроса в смешанном режиме
+        :param on_discard: функция без аргументов, вызывается, если вопрос так и не был задан
+        """
+        self.lines = lines
+        self.answer = answer
+        self.options = options
+        self.hint = hint
+        self.check = check
+        self.category = category
+        self.key = key
+        self.prompt_key = prompt_key
+        self.incorrect_lines = incorrect_lines
+        self.source = source
+        self.on_discard = on_discard
+
+    def is_correct(self, user_answer):
+        if self.check:
+            return self.check(user_answer)
+        return user_answer.strip().lower() == self.answer.lower()
+
+class _LineReader:
+    """Reads stdin in a daemon thread, one line per request, so the event loop stays responsive."""
+    def __init__(self, loop):
+        self.loop = loop
+        self.pending = None
+
+    def read(self):
+        """Returns a future for the next line. A read left over from a timed-out question is reused."""
+        if self.pending is None:
+            self.pending = self.loop.create_future()
+            threading.Thread(target=self._read_line, args=(self.pending,), daemon=True).start()
+        return self.pending
+
+    def take(self):
+        line = self.pending.result()
+        self.pending = None
+        return line
+
+    def _read_line(self, future):
+        line = sys.stdin.readline()
+        # EOF behaves like leaving to the menu instead of looping forever.
+        line = line.rstrip('\n') if line else 'm'
+        try:
+            self.loop.call_soon_threadsafe(future.set_result, line)
+        except RuntimeError:
+            pass  # event loop already closed
+
+class QuizRunner:
+    """
+    Asynchronous question loop shared by all trainers.
+    The next question is generated in a worker thread while the learner is typing,
+    so there is no pause between questions even when selection is slow.
+    """
+    def __init__(self, loc, time_limit=None, round_length=None):
+        """
+        :param time_limit: секунд на ответ; None - без ограничения
+        :param round_length: число вопросов в раунде; None - до выхода в меню
+        """
+        self.loc = loc
+        self.time_limit = time_limit
+        self.round_length = round_length
+        self.response_times = []
+
+    def run(self, stats, next_question, on_answer):
+        """
+        Asks questions until the learner enters 'm' or the round is over.
+        :param next_question: функция без аргументов, возвращающая Question
+        :param on_answer: функция (question, is_correct), обновляющая статистику
+        """
+        asyncio.run(self._run(stats, next_question, on_answer))
+
+    async def _run(self, stats, next_question, on_answer):
+        loop = asyncio.get_running_loop()
+        reader = _LineReader(loop)
+        self.response_times = []
+        correct_count = 0
+        asked = 0
+
+        def prepare():
+            # Edited data files are picked up here, in the same thread that reads the decks.
+            default_watcher.poll()
+            # The question text is rendered in the worker thread as well.
+            question = next_question()
+            return question, self._format(question)
+
+        question, text = await loop.run_in_executor(None, prepare)
+        while self.round_length is None or asked < self.round_length:
+            Frame().add(self.loc.get('current_score', score=stats['total_score']), text).render(end='')
+            started = time.perf_counter_ns()
+            prefetch = loop.run_in_executor(None, prepare)
+
+            try:
+                await asyncio.wait_for(asyncio.shield(reader.read()), timeout=self.time_limit)
+            except asyncio.TimeoutError:
+                Frame().add(f"\n{self.loc.get('time_up')}", self.loc.get('incorrect', answer=question.answer), "-" * 20).render()
+                next_one = await prefetch
+                on_answer(question, False)
+                asked += 1
+                question, text = next_one
+                continue
+
+            elapsed = time.perf_counter_ns() - started
+            user_input = reader.take().strip()
+            if user_input.lower() == 'm':
+                _discard((await prefetch)[0])
+                break
+
+            user_answer = user_input
+            if question.options:
+                try:
+                    user_answer = question.options[int(user_input) - 1]
+                except (ValueError, IndexError):
+                    Frame().add(f"\n⚠️ {self.loc.get('invalid_input')}\n").render()
+                    _discard(question)
+                    question, text = await prefetch
+                    continue
+
+            is_correct = question.is_correct(user_answer)
+            self.response_times.append(elapsed)
+            asked += 1
+            # Stats are only written once the prefetching thread no longer reads them.
+            next_one = await prefetch
+            feedback = Frame()
+            if is_correct:
+                correct_count += 1
+                feedback.add(self.loc.get('correct'))
+            else:
+                feedback.add(self.loc.get('incorrect', answer=question.answer), *question.incorrect_lines)
+            on_answer(question, is_correct)
+            if self.time_limit is not None:
+                feedback.add(self.loc.get('response_time', seconds=f"{elapsed / 1e9:.2f}"))
+            feedback.add("-" * 20).render()
+            question, text = next_one
+        # The question on screen (or the prefetched one after a full round) was not answered.
+        _discard(question)
+
+        if self.round_length is not None and asked >= self.round_length:
+            # Also consumes a line still being typed for a question that timed out.
+            Frame().add(self._round_summary(asked, correct_count), self.loc.get('press_enter')).render(end='')
+            await reader.read()
+            reader.take()
+
+    def _format(self, question):
+        lines = list(question.lines)
+        if question.options:
+            lines.extend(f"{i}. {option}" for i, option in enumerate(question.options, 1))
+            lines.append(f"\n{self.loc.get('your_choice', options=f'1-{len(question.options)}')} ")
+        elif question.hint:
+            lines.append(f"\n{self.loc.get(question.prompt_key).rstrip()} ({question.hint}): ")
+        else:
+            lines.append(f"\n{self.loc.get(question.prompt_key)}")
+        return "\n".join(lines)
+
+    def _round_summary(self, asked, correct_count):
+        answered = self.response_times
+        average = sum(answered) / len(answered) / 1e9 if answered else 0
+        return self.loc.get('round_summary', correct=correct_count, total=asked, seconds=f"{average:.2f}")
+
+def _discard(question):
+    if question.on_discard:
+        question.on_discard()
+
+def choose_difficulty(loc):
+    """Difficulty menu shared by all trainers. 'adaptive' is resolved per question."""
+    choices = {'1': 'easy', '2': 'medium', '3': 'hard', '4': 'adaptive'}
+    while True:
+        Frame().add(
+            loc.get('choose_difficulty'),
+            loc.get('difficulty_easy'),
+            loc.get('difficulty_medium'),
+            loc.get('difficulty_hard'),
+            loc.get('difficulty_adaptive')
+        ).render()
+        choice = input(loc.get('your_choice', options="1-4") + " ")
+        if choice in choices:
+            return choices[choice]
+        print(loc.get('invalid_input'))
@@ -0,0 +1,113 @@
+import sys
+
+class RecordError(ValueError):
+    """Raised when a corpus item is malformed, so bad data fails at load time and not mid-session."""
+
+class Record:
+    """
+    Base class for corpus items. Subclasses list their fields in REQUIRED and OPTIONAL;
+    __slots__ keeps items small and attribute access fast in the question loops.
+    """
+    __slots__ = ()
+    REQUIRED = ()
+    OPTIONAL = ()
+    MAPPINGS = ('forms', 'translation', 'change', 'tags')
+
+    def __init__(self, **fields):
+        for name in self.REQUIRED:
+            setattr(self, name, fields[name])
+        for name in self.OPTIONAL:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_dict(cls, data, where='item'):
+        """Validates a raw JSON item and builds the record, interning its strings."""
+        if not isinstance(data, dict):
+            raise RecordError(f"{where}: expected an object, got {type(data).__name__}")
+        missing = [name for name in cls.REQUIRED if data.get(name) in (None, '')]
+        if missing:
+            raise RecordError(f"{where}: missing field(s) {', '.join(missing)}")
+        for name in cls.MAPPINGS:
+            if name in data and not isinstance(data[name], dict):
+                raise RecordError(f"{where}: field '{name}' must be an object")
+        known = set(cls.REQUIRED) | set(cls.OPTIONAL)
+        return cls(**{name: _intern(value) for name, value in data.items() if name in known})
+
+    def get(self, name, default=None):
+        """Dict-style access used by the generic indexes (TextIndex, FacetIndex)."""
+        value = getattr(self, name, None)
+        return default if value is None else value
+
+    def to_dict(self):
+        names = self.REQUIRED + self.OPTIONAL
+        return {name: getattr(self, name) for name in names if getattr(self, name) is not None}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+class Noun(Record):
+    REQUIRED = ('gender', 'singular', 'plural')
+    OPTIONAL = ('tags',)
+    __slots__ = REQUIRED + OPTIONAL
+
+class Verb(Record):
+    REQUIRED = ('infinitive', 'auxiliary', 'partizip_2')
+    OPTIONAL = ('stem', 'change', 'tags')
+    __slots__ = REQUIRED + OPTIONAL
+
+class IrregularVerb(Verb):
+    """A verb with a changed Präsens stem: the trainer reads `stem` and `change` of every one."""
+    REQUIRED = Verb.REQUIRED + ('stem', 'change')
+    OPTIONAL = ('tags',)
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, data, where='item'):
+        record = super().from_dict(data, where)
+        bad = [pronoun for pronoun, stem in record.change.items() if not isinstance(stem, str) or not stem]
+        if bad:
+            raise RecordError(f"{where}: field 'change' needs a stem for {', '.join(bad)}")
+        return record
+
+class PronounRule(Record):
+    REQUIRED = ('pronoun', 'ending', 'group')
+    OPTIONAL = ('key',)
+    __slots__ = REQUIRED + OPTIONAL
+
+class ModalVerb(Record):
+    REQUIRED = ('infinitive', 'forms')
+    OPTIONAL = ('translation', 'tags')
+    __slots__ = REQUIRED + OPTIONAL
+
+class SentenceTask(Record):
+    REQUIRED = ('sentence', 'case')
+    OPTIONAL = ('id', 'gender', 'noun', 'pronoun_nom', 'key', 'translation', 'tags')
+    __slots__ = REQUIRED + OPTIONAL
+
+class SentenceFrame(Record):
+    REQUIRED = ('id', 'template', 'case', 'slot')
+    OPTIONAL = ('verb', 'topics')
+    MAPPINGS = Record.MAPPINGS + ('verb',)
+    __slots__ = REQUIRED + OPTIONAL
+
+class VocabItem(Record):
+    REQUIRED = ('word', 'sentence', 'answer')
+    OPTIONAL = ('translation', 'tags')
+    __slots__ = REQUIRED + OPTIONAL
+
+def build_records(items, record_class, source='corpus'):
+    """Builds records for a list of raw items. Returns None if the items could not be loaded."""
+    if items is None:
+        return None
+    if not isinstance(items, list):
+        raise RecordError(f"{source}: expected a list of items")
+    return [record_class.from_dict(item, f"{source}, item {i}") for i, item in enumerate(items)]
+
+def _intern(value):
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return {sys.intern(k): _intern(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_intern(v) for v in value]
+    return value
@@ -0,0 +1,63 @@
+import heapq
+import itertools
+import time
+import config
+from utils.adaptive import decayed_accuracy
+
+class QuestionSource:
+    """One kind of question a trainer can produce (e.g. noun articles), used by the mixed mode."""
+    def __init__(self, source_id, category, title_key, next_question, on_answer):
+        """
+        :param category: категория статистики, по которой оценивается слабость
+        :param title_key: ключ локализации с названием упражнения
+        :param next_question: функция без аргументов, возвращающая Question
+        :param on_answer: функция (question, is_correct), обновляющая статистику
+        """
+        self.source_id = source_id
+        self.category = category
+        self.title_key = title_key
+        self.next_question = next_question
+        self.on_answer = on_answer
+
+class Scheduler:
+    """
+    Chooses the source of the next question in a mixed session.
+    All sources share one heap ordered by priority: weak categories (low decayed accuracy)
+    and categories not practised for a while come first, and every question already asked
+    from a source in this session lowers its priority, so topics interleave.
+    Picking a source costs O(log n).
+    """
+    def __init__(self, sources, stats, quotas=None):
+        """:param quotas: максимальное число вопросов на категорию за сессию, например {'w_fragen': 3}"""
+        self.sources = sources
+        self.stats = stats
+        self.quotas = quotas or {}
+        self.asked = {source.source_id: 0 for source in sources}
+        self._heap = []
+        self._order = itertools.count()
+        for source in sources:
+            self._push(source)
+
+    def next(self):
+        """Returns the source to ask next. Quotas are relaxed once every source has used up its quota."""
+        if not self._heap:
+            for source in self.sources:
+                self._push(source)
+        _, _, source = heapq.heappop(self._heap)
+        self.asked[source.source_id] += 1
+        quota = self.quotas.get(source.category)
+        if quota is None or self.asked[source.source_id] < quota:
+            self._push(source)
+        return source
+
+    def priority(self, source, now=None):
+        entry = self.stats.get('category_decay', {}).get(source.category)
+        accuracy, evidence = decayed_accuracy(entry, now)
+        weakness = 0.5 if evidence < config.ADAPTIVE_MIN_EVIDENCE else 1 - accuracy
+        idle = (now or time.time()) - entry[2] if entry else config.MIX_DUE_AFTER
+        due = min(1.0, idle / config.MIX_DUE_AFTER)
+        return (weakness + due) / (1 + self.asked[source.source_id])
+
+    def _push(self, source):
+        # heapq is a min-heap; the counter keeps equal priorities in insertion order.
+        heapq.heappush(self._heap, (-self.priority(source), next(self._order), source))
@@ -0,0 +1,113 @@
+import bisect
+from collections.abc import Sequence
+import config
+from utils.file_handler import load_json
+from utils.records import Noun, SentenceFrame, SentenceTask, RecordError, build_records
+
+NOUN_GENDERS = {'der': 'maskulin', 'die': 'feminin', 'das': 'neutral'}
+NUMBERS = ('singular', 'plural')
+SLOTS = ('noun', 'pronoun')
+
+class SentenceSpace(Sequence):
+    """
+    Every sentence that can be built from the frames, as a virtual sequence of SentenceTask.
+    Nothing is materialized: space[i] decodes i as a mixed-radix number
+    (frame, subject, noun, number) or (frame, subject, pronoun), so random.choice(space)
+    samples uniformly from the whole combinatorial space. Memory grows with the number
+    of frames and nouns, not with their product; one item costs O(log frames).
+    """
+    def __init__(self, frames, subjects, pronouns, nouns):
+        """
+        :param frames: записи SentenceFrame
+        :param subjects: подлежащие для фреймов с {subject} (ключи форм глагола)
+        :param pronouns: местоимения для фреймов со slot 'pronoun'
+        :param nouns: записи Noun
+        """
+        self.frames = frames
+        self.subjects = subjects
+        self.pronouns = pronouns
+        self.nouns = nouns
+        # Frames with the same topics share one list of candidate noun positions.
+        self._candidates = {}
+        self._ends = []
+        total = 0
+        for frame in frames:
+            total += self._frame_size(frame)
+            self._ends.append(total)
+
+    def __len__(self):
+        return self._ends[-1] if self._ends else 0
+
+    def __getitem__(self, index):
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("sentence index out of range")
+        frame_no = bisect.bisect_right(self._ends, index)
+        frame = self.frames[frame_no]
+        rank = index - (self._ends[frame_no - 1] if frame_no else 0)
+
+        subjects = self._subjects(frame)
+        rank, subject = divmod(rank, len(subjects))
+        subject = subjects[subject]
+        if frame.slot == 'pronoun':
+            return SentenceTask(sentence=_sentence(frame, subject), case=frame.case, pronoun_nom=self.pronouns[rank])
+
+        rank, number = divmod(rank, len(NUMBERS))
+        noun = self.nouns[self._noun_positions(frame)[rank]]
+        if NUMBERS[number] == 'plural':
+            gender, display = 'plural', noun.plural
+            form = _dative_plural(noun.plural) if frame.case == 'dativ' else noun.plural
+        else:
+            gender, display = NOUN_GENDERS[noun.gender], noun.singular
+            form = noun.singular
+        return SentenceTask(sentence=_sentence(frame, subject, noun=form), case=frame.case, gender=gender, noun=display)
+
+    def _frame_size(self, frame):
+        if frame.slot == 'pronoun':
+            return len(self._subjects(frame)) * len(self.pronouns)
+        return len(self._subjects(frame)) * len(self._noun_positions(frame)) * len(NUMBERS)
+
+    def _subjects(self, frame):
+        return self.subjects if frame.verb else (None,)
+
+    def _noun_positions(self, frame):
+        topics = tuple(sorted(frame.topics)) if frame.topics else None
+        positions = self._candidates.get(topics)
+        if positions is None:
+            positions = [i for i, noun in enumerate(self.nouns)
+                         if topics is None or noun.get('tags', {}).get('topic') in topics]
+            self._candidates[topics] = positions
+        return positions
+
+def _sentence(frame, subject, noun=''):
+    # The blank stays a placeholder; the question makers fill it in.
+    text = frame.template.format(subject=subject or '', verb=frame.verb[subject] if subject else '',
+                                 noun=noun, blank='{blank}')
+    return text[:1].upper() + text[1:]
+
+def _dative_plural(plural):
+    """Dative plural adds -n unless the plural already ends in -n or -s (den Kindern, den Autos)."""
+    return plural if plural.endswith(('n', 's')) else plural + 'n'
+
+def load_space(frames_file=config.SENTENCE_FRAMES_FILE, nouns_file=config.NOUNS_FILE):
+    """
+    Builds the sentence space from the frames and nouns files. Returns None if a file could not be loaded.
+    :raises RecordError: если фрейм задан неверно
+    """
+    data = load_json(frames_file)
+    nouns = build_records(load_json(nouns_file), Noun, str(nouns_file))
+    if not data or not nouns:
+        return None
+    frames = build_records(data.get('frames'), SentenceFrame, str(frames_file))
+    if not frames:
+        return None
+    subjects = data.get('subjects', [])
+    for i, frame in enumerate(frames):
+        where = f"{frames_file}, frame {i}"
+        if frame.slot not in SLOTS:
+            raise RecordError(f"{where}: slot must be one of {', '.join(SLOTS)}")
+        if frame.verb and any(subject not in frame.verb for subject in subjects):
+            raise RecordError(f"{where}: verb forms missing for some subjects")
+    return SentenceSpace(frames, subjects, data.get('object_pronouns', []), nouns)
@@ -0,0 +1,428 @@
+import argparse
+import bisect
+import hashlib
+import io
+import json
+import multiprocessing
+import multiprocessing.connection
+import re
+import sys
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+import config
+from utils.classroom import ClassroomService
+from utils.leaderboard import LeaderboardService
+from utils.localization import Localization
+from utils.mode_registry import ModeRegistry
+from utils.protocol import ProtocolSession
+from utils.stats_manager import on_answer_counted, on_score_change
+from utils.stats_store import load_stats
+
+class HashRing:
+    """
+    Consistent hashing of user ids onto workers. Every worker owns `vnodes` points on a
+    ring of 64-bit hashes and a user belongs to the first point after the hash of its id,
+    so adding or removing a worker moves only the users between its points and their
+    predecessors (about 1/N of them). Lookups are a binary search.
+    """
+    def __init__(self, nodes=(), vnodes=config.SHARD_VNODES):
+        self.vnodes = vnodes
+        self._points = []
+        self._owners = []
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        for i in range(self.vnodes):
+            point = _hash(f"{node}#{i}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node):
+        kept = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != node]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    def node_for(self, key):
+        if not self._points:
+            raise LookupError("the hash ring has no nodes")
+        return self._owners[bisect.bisect(self._points, _hash(key)) % len(self._points)]
+
+    @property
+    def nodes(self):
+        return sorted(set(self._owners))
+
+def _hash(key):
+    # Python's hash() of a str differs between processes, so a fixed digest is used.
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+class _Learner:
+    """One user inside a worker: their stats and their protocol session."""
+    def __init__(self, directory, registry, loc, trainers, save_shared):
+        """:param save_shared: функция без аргументов, сохраняющая общие файлы (таблицу лидеров, класс)"""
+        self.stats = load_stats(directory, directory.with_suffix('.json'))
+        self.save_shared = save_shared
+        self.output = io.StringIO()
+        self.session = ProtocolSession(registry, loc, self.stats, self.save, self.output, trainers)
+
+    def save(self):
+        self.stats.save()
+        self.save_shared()
+
+    def handle(self, command):
+        if command.get('cmd') == 'quit':
+            return self.release()
+        self.session.handle(command)
+        return self._events()
+
+    def release(self):
+        """Ends a running session and writes the stats, so another worker can take the user over."""
+        self.session.close()
+        self.save()
+        return self._events()
+
+    def _events(self):
+        lines = self.output.getvalue().splitlines()
+        self.output.seek(0)
+        self.output.truncate()
+        return lines
+
+def _worker(conn, learners_dir, lang, shared_files, group=None):
+    """
+    Worker process: owns the stats of the users the ring gives it, so they need no locks.
+    Trainers (and through them the corpora) are loaded once per worker and shared by its
+    users; compiled corpora are memory-mapped, so all workers share their pages.
+    Messages are batches [(user, command), ...]; the reply is a list of event lines per command.
+    The message 'cpu' is answered with the CPU time the worker has used.
+    The leaderboard and the class of `group` are shared by all workers; their save()
+    merges under a file lock.
+    """
+    loc = Localization(lang)
+    registry = ModeRegistry()
+    trainers = {}
+    learners = {}
+    # The hooks get the stats, not the user; the stats object tells whose they are.
+    users_by_stats = {}
+    leaderboard_file = shared_files['leaderboard']
+    leaderboard = LeaderboardService.load(leaderboard_file)
+    on_score_change(lambda stats, points:
+                    leaderboard.record(users_by_stats[id(stats)], points, stats['total_score']))
+    classroom = None
+    if group:
+        classroom = ClassroomService.load(shared_files['classroom'])
+        on_answer_counted(lambda stats, category, key, is_correct:
+                          classroom.record(group, users_by_stats[id(stats)], category, key, is_correct))
+
+    def save_shared():
+        leaderboard.save(leaderboard_file)
+        if classroom:
+            classroom.save(shared_files['classroom'])
+    while True:
+        batch = conn.recv()
+        if batch == 'cpu':
+            conn.send(time.process_time())
+            continue
+        if batch is None:
+            for learner in learners.values():
+                learner.release()
+            conn.send(None)
+            return
+        replies = []
+        for user, command in batch:
+            if command.get('cmd') == 'release':
+                learner = learners.pop(user, None)
+                replies.append(learner.release() if learner else [])
+                if learner:
+                    del users_by_stats[id(learner.stats)]
+                continue
+            learner = learners.get(user)
+            if learner is None:
+                learner = learners[user] = _Learner(_user_dir(learners_dir, user), registry, loc, trainers, save_shared)
+                users_by_stats[id(learner.stats)] = user
+                leaderboard.set_total(user, learner.stats['total_score'])
+                if classroom:
+                    classroom.join(group, user, learner.stats)
+            replies.append(learner.handle(command))
+            if command.get('cmd') == 'quit':
+                del learners[user]
+                del users_by_stats[id(learner.stats)]
+        conn.send(replies)
+
+def _user_dir(learners_dir, user):
+    if re.fullmatch(r'[\w.-]{1,64}', user) and not user.startswith('.'):
+        return Path(learners_dir) / user
+    # Ids that are not safe as a directory name get a stable hashed one.
+    return Path(learners_dir) / f"user-{hashlib.sha1(user.encode('utf-8')).hexdigest()[:16]}"
+
+class ShardRouter:
+    """
+    Front of the sharded server: routes the commands of every user to the worker that owns
+    the user. A batch is split per worker and all workers run their parts at the same time.
+    stream() keeps several batches in flight, so a worker that is done with its part starts
+    the next one instead of waiting for the slowest worker and for the router.
+    """
+    def __init__(self, workers=config.SHARD_WORKERS, learners_dir=config.LEARNERS_DIR, lang='en', shared_dir=None,
+                 group=config.GROUP_ID):
+        """
+        :param shared_dir: каталог общих файлов (таблица лидеров, классы); по умолчанию пути из config
+        :param group: класс, в который входят все ученики сервера; None - без класса
+        """
+        self.learners_dir = Path(learners_dir)
+        self.lang = lang
+        self.group = group
+        shared = {'leaderboard': config.LEADERBOARD_FILE, 'classroom': config.CLASSROOM_FILE}
+        self.shared_files = {name: Path(shared_dir) / path.name if shared_dir else path for name, path in shared.items()}
+        for path in [self.learners_dir, *(path.parent for path in self.shared_files.values())]:
+            path.mkdir(parents=True, exist_ok=True)
+        self.ring = HashRing()
+        # user -> worker on the current ring; a ring lookup hashes the id, and this is the router's hot path.
+        self._routes = {}
+        self.workers = {}
+        # Users that have state in a worker, with that worker.
+        self.owners = {}
+        self._started = 0
+        for _ in range(workers):
+            self.add_worker()
+
+    def send(self, batch):
+        """:param batch: [(user, command), ...]; returns the event lines of each command, in order."""
+        return next(self.stream([batch]))
+
+    def stream(self, batches, depth=config.SHARD_PIPELINE_DEPTH):
+        """
+        Sends batches and yields the event lines of each, batch by batch and in order.
+        Up to `depth` batches are in flight. A worker runs its parts in the order they were
+        sent, so the commands of one user still run one after another.
+        """
+        batches = iter(batches)
+        in_flight = deque()
+        for batch in batches:
+            in_flight.append(self._submit(batch))
+            if len(in_flight) == depth:
+                break
+        while in_flight:
+            replies, parts = in_flight[0]
+            # The first reply of a worker that still owes the oldest batch belongs to that batch.
+            conns = {self.workers[worker][1]: worker for worker in parts}
+            for conn in multiprocessing.connection.wait(list(conns)):
+                worker = conns[conn]
+                for (index, user, command), events in zip(parts.pop(worker), conn.recv()):
+                    replies[index] = events
+                    if command.get('cmd') == 'quit':
+                        self.owners.pop(user, None)
+                        self._routes.pop(user, None)
+                    else:
+                        self.owners[user] = worker
+            if parts:
+                continue
+            in_flight.popleft()
+            for batch in batches:
+                in_flight.append(self._submit(batch))
+                break
+            yield replies
+
+    def worker_cpu(self):
+        """CPU seconds used by each worker process so far."""
+        for _, conn in self.workers.values():
+            conn.send('cpu')
+        return {name: conn.recv() for name, (_, conn) in self.workers.items()}
+
+    def add_worker(self):
+        name = f"w{self._started}"
+        self._started += 1
+        parent, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_worker, daemon=True,
+                                          args=(child, self.learners_dir, self.lang, self.shared_files, self.group))
+        process.start()
+        self.workers[name] = (process, parent)
+        self.ring.add(name)
+        self._routes.clear()
+        return name, self._rebalance()
+
+    def remove_worker(self, name):
+        """Returns the events of the moved users, like _rebalance()."""
+        if name not in self.workers or len(self.workers) == 1:
+            raise ValueError(f"cannot remove worker {name!r}")
+        self.ring.remove(name)
+        self._routes.clear()
+        released = self._rebalance()
+        process, conn = self.workers.pop(name)
+        _stop(process, conn)
+        return released
+
+    def close(self):
+        for process, conn in self.workers.values():
+            _stop(process, conn)
+        self.workers.clear()
+        self.owners.clear()
+        self._routes.clear()
+
+    def _submit(self, batch):
+        parts = {}
+        for index, (user, command) in enumerate(batch):
+            parts.setdefault(self._route(user), []).append((index, user, command))
+        for worker, part in parts.items():
+            self.workers[worker][1].send([(user, command) for _, user, command in part])
+        return [None] * len(batch), parts
+
+    def _route(self, user):
+        worker = self._routes.get(user)
+        if worker is None:
+            worker = self._routes[user] = self.ring.node_for(user)
+        return worker
+
+    def _rebalance(self):
+        """
+        Hands over the users whose owner changed on the ring: the old worker ends their
+        session and writes their stats, the new one reads them on the next command.
+        Other users are not touched. Returns [(user, event lines), ...] of the moved users:
+        their session ended ("stopped", "bye"), so the client has to start it again.
+        """
+        moved = {}
+        for user, owner in self.owners.items():
+            if self._route(user) != owner:
+                moved.setdefault(owner, []).append((user, {'cmd': 'release'}))
+        for owner, batch in moved.items():
+            self.workers[owner][1].send(batch)
+        released = []
+        for owner, batch in moved.items():
+            for (user, _), events in zip(batch, self.workers[owner][1].recv()):
+                del self.owners[user]
+                released.append((user, events))
+        return released
+
+def _stop(process, conn):
+    conn.send(None)
+    conn.recv()
+    process.join()
+
+def serve(router, lines, output):
+    """
+    Reads commands with a "user" field, one JSON object (or a JSON array, sent as one
+    parallel batch) per line. Commands without a user manage the server: "workers",
+    "add_worker" and "remove_worker" ("worker": name). Users moved by a rebalance get
+    the "stopped" and "bye" events of their ended session right after the reply.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+            commands = data if isinstance(data, list) else [data]
+            if not all(isinstance(command, dict) for command in commands):
+                raise ValueError("commands must be JSON objects")
+        except ValueError as e:
+            _write(output, {'event': 'error', 'message': f"invalid command: {e}"})
+            continue
+
+        batch = []
+        for command in commands:
+            if 'user' in command:
+                batch.append((str(command['user']), command))
+            else:
+                reply, released = _admin(router, command)
+                _write(output, reply)
+                _write_events(output, released)
+        if batch:
+            _write_events(output, [(user, events) for (user, _), events in zip(batch, router.send(batch))])
+
+def _admin(router, command):
+    """Returns the reply and the events of the users whose session a rebalance ended."""
+    try:
+        if command.get('cmd') == 'add_worker':
+            name, released = router.add_worker()
+            return {'event': 'rebalanced', 'added': name, 'moved': len(released), 'workers': router.ring.nodes}, released
+        if command.get('cmd') == 'remove_worker':
+            released = router.remove_worker(command.get('worker'))
+            return ({'event': 'rebalanced', 'removed': command.get('worker'), 'moved': len(released),
+                     'workers': router.ring.nodes}, released)
+        if command.get('cmd') == 'workers':
+            users = {name: 0 for name in router.workers}
+            for owner in router.owners.values():
+                users[owner] += 1
+            return {'event': 'workers', 'users': users}, []
+        return {'event': 'error', 'message': "a command needs a \"user\", or must be workers/add_worker/remove_worker"}, []
+    except ValueError as e:
+        return {'event': 'error', 'message': str(e)}, []
+
+def _write_events(output, events_by_user):
+    for user, events in events_by_user:
+        for event in events:
+            _write(output, {'user': user, **json.loads(event)})
+
+def _write(output, event):
+    output.write(json.dumps(event, ensure_ascii=False) + "\n")
+    output.flush()
+
+def bench(worker_counts, users, rounds, learners_dir):
+    """
+    Drives `users` simulated learners through `rounds` answers each on routers with the given
+    worker counts. Every round is one batch and the rounds are streamed, so the workers
+    answer at the same time and do not wait for each other between rounds. Returns
+    [(workers, answers per second, seconds, router CPU seconds, worker CPU seconds), ...]:
+    a router CPU time close to the wall time means the router, not the workers, sets the rate.
+    """
+    results = []
+    user_ids = [f"bench-{i}" for i in range(users)]
+    for count in worker_counts:
+        router = ShardRouter(count, learners_dir, shared_dir=learners_dir)
+        try:
+            router.send([(user, {'cmd': 'start', 'mode': 'nouns', 'source': 'noun_articles', 'difficulty': 'easy'})
+                         for user in user_ids])
+            answer = [(user, {'cmd': 'answer', 'option': 1}) for user in user_ids]
+            workers_before = sum(router.worker_cpu().values())
+            router_before = time.process_time()
+            started = time.perf_counter()
+            for _ in router.stream(answer for _ in range(rounds)):
+                pass
+            elapsed = time.perf_counter() - started
+            router_cpu = time.process_time() - router_before
+            worker_cpu = sum(router.worker_cpu().values()) - workers_before
+            router.send([(user, {'cmd': 'quit'}) for user in user_ids])
+        finally:
+            router.close()
+        results.append((count, users * rounds / elapsed, elapsed, router_cpu, worker_cpu))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Serves many learners from worker processes sharded by user id.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_cmd = commands.add_parser('serve', help="route JSON-lines commands from stdin to the workers")
+    serve_cmd.add_argument('--workers', type=int, default=config.SHARD_WORKERS)
+    serve_cmd.add_argument('--learners-dir', default=str(config.LEARNERS_DIR))
+    serve_cmd.add_argument('--lang', choices=('en', 'ru'), default='en')
+    serve_cmd.add_argument('--group', default=config.GROUP_ID, help="class of all learners (default: $DEUTSCH_GROUP)")
+    bench_cmd = commands.add_parser('bench', help="measure answers per second for several worker counts")
+    bench_cmd.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    bench_cmd.add_argument('--users', type=int, default=64)
+    bench_cmd.add_argument('--rounds', type=int, default=50, help="answers per user")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        router = ShardRouter(args.workers, args.learners_dir, args.lang, group=args.group)
+        output = sys.stdout
+        sys.stdout = sys.stderr
+        try:
+            serve(router, sys.stdin, output)
+        finally:
+            router.close()
+            sys.stdout = output
+        return
+
+    cores = multiprocessing.cpu_count()
+    print(f"{args.users} learners, {args.rounds} answers each, {cores} cores")
+    with tempfile.TemporaryDirectory() as learners_dir:
+        results = bench(args.workers, args.users, args.rounds, learners_dir)
+    for count, rate, elapsed, router_cpu, worker_cpu in results:
+        print(f"  {count:>3} workers: {rate:>9.0f} answers/s  router CPU {router_cpu / elapsed:>4.0%}, "
+              f"workers CPU {worker_cpu / elapsed:>4.0%} of the wall time")
+    if cores <= max(args.workers):
+        # The workers and the router share the cores, so more workers cannot answer faster.
+        print(f"Only {cores} cores for {max(args.workers)} workers and the router: this run does not show scaling.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+import random
+import config
+from utils.adaptive import decayed_accuracy
+
+SAMPLING_MODES = ('random', 'bag')
+
+class ShuffleBag:
+    """
+    Draws every position of a deck once, in random order, before any position repeats.
+
+    The order of a round is a keyed pseudo-random permutation of the positions (a small
+    Feistel network), so the bag keeps only a seed and a counter instead of the shuffled
+    list and every draw is O(1). A refill may add weak items a second time. Items drawn in
+    the last few draws are put aside and asked later, also across the end of a round.
+    The state is a plain dict, so it can be stored in the stats and survive restarts.
+    """
+    def __init__(self, state, size, weak_positions=None, recent=config.SHUFFLE_BAG_RECENT, fingerprint=None):
+        """
+        :param state: словарь состояния, изменяется на месте
+        :param size: число элементов колоды
+        :param fingerprint: отпечаток колоды (Deck.fingerprint); при его изменении начинается новый круг;
+            None - правка колоды видна только по размеру
+        :param weak_positions: функция без аргументов, возвращающая позиции слабых элементов;
+            вызывается только при новом круге
+        :param recent: сколько последних элементов не повторять
+        """
+        self.state = state
+        self.size = size
+        self.weak_positions = weak_positions
+        self.recent_limit = min(recent, size // 2)
+        self.fingerprint = fingerprint
+
+    def draw(self):
+        """Returns the position of the next item."""
+        state = self.state
+        if state.get('size') != self.size or state.get('deck') != self.fingerprint:
+            # The deck was edited (an item replaced by another one keeps the size, not the
+            # source files' fingerprint): positions changed, so a new round starts.
+            state['pending'] = []
+            state['recent'] = []
+            self._refill()
+
+        while True:
+            pending = state['pending']
+            for i, position in enumerate(pending):
+                if position not in state['recent']:
+                    del pending[i]
+                    return self._deliver(position)
+
+            round_length = self.size + len(state['extra'])
+            while state['drawn'] < round_length:
+                slot = _permute(state['drawn'], round_length, state['seed'])
+                state['drawn'] += 1
+                position = slot if slot < self.size else state['extra'][slot - self.size]
+                if position in state['recent']:
+                    pending.append(position)
+                    continue
+                return self._deliver(position)
+
+            if pending:
+                # Only recently seen items are left in this round; the oldest of them is due.
+                return self._deliver(pending.pop(0))
+            self._refill()
+
+    def put_back(self, position):
+        """Returns a drawn item that was never asked (e.g. the session ended), so the round still covers it."""
+        if position in self.state['recent']:
+            self.state['recent'].remove(position)
+        self.state['pending'].insert(0, position)
+
+    def _deliver(self, position):
+        recent = self.state['recent']
+        recent.append(position)
+        del recent[:max(0, len(recent) - self.recent_limit)]
+        return position
+
+    def _refill(self):
+        extra = list(self.weak_positions())[:self.size] if self.weak_positions else []
+        self.state.update(seed=random.getrandbits(32), size=self.size, deck=self.fingerprint, drawn=0, extra=extra)
+        self.state.setdefault('pending', [])
+        self.state.setdefault('recent', [])
+
+class Sampler:
+    """
+    Chooses the items of one deck, either uniformly at random ('random') or from a
+    shuffle bag kept in stats['bags'] ('bag'). The mode is set per deck in modes.json.
+    """
+    def __init__(self, bag_id, sampling='random', weak_category=None, key_field=None, weak_keys=None):
+        """
+        :param bag_id: имя мешка в stats['bags']
+        :param sampling: 'random' или 'bag'
+        :param weak_category: категория статистики, по которой слабые элементы кладутся в мешок дважды
+        :param key_field: поле элемента, служащее ключом в weak_category
+        :param weak_keys: функция элемент -> [(категория, ключ), ...] для элементов, чей ключ
+            статистики не является полем (например, "gender-case"); элемент слаб, если слаб любой ключ
+        """
+        if sampling not in SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling mode '{sampling}', expected one of {', '.join(SAMPLING_MODES)}")
+        self.bag_id = bag_id
+        self.sampling = sampling
+        self.weak_category = weak_category
+        self.key_field = key_field
+        self.weak_keys = weak_keys
+
+    def choose(self, stats, items):
+        """
+        Returns (item, put_back). put_back is None in random mode; in bag mode it should
+        become the question's on_discard, so an item that was never asked is not lost.
+        """
+        if self.sampling == 'random':
+            return random.choice(items), None
+        # A filtered session has its own bag, so coverage is about the filtered items.
+        query = getattr(items, 'query', None)
+        bag_id = f"{self.bag_id}?{query}" if query else self.bag_id
+        state = stats.setdefault('bags', {}).setdefault(bag_id, {})
+        # A filtered selection changes with its deck. Lists and virtual spaces have no
+        # fingerprint: hashing their items would decode every one of them.
+        deck = getattr(items, 'deck', items)
+        bag = ShuffleBag(state, len(items), lambda: self._weak_positions(stats, items),
+                         fingerprint=getattr(deck, 'fingerprint', None))
+        position = bag.draw()
+        return items[position], lambda: bag.put_back(position)
+
+    def _weak_positions(self, stats, items):
+        # Runs once per round. A deck that finds items by the stats key gets the weak items
+        # from the learner's counters; any other deck is probed at a bounded number of
+        # random positions, so a virtual space or a memory-mapped corpus is never decoded whole.
+        if self.weak_keys is None and not self.weak_category:
+            return []
+        if self.weak_keys is None and self.key_field and getattr(items, 'key_field', None) == self.key_field:
+            weak = []
+            for key, data in stats.get(self.weak_category, {}).items():
+                if _is_weak(data):
+                    position = items.position_of(key)
+                    if position is not None:
+                        weak.append(position)
+            return weak
+
+        counters = {}
+        weak = []
+        for position in random.sample(range(len(items)), min(len(items), config.SHUFFLE_BAG_WEAK_PROBES)):
+            item = items[position]
+            if self.weak_keys is not None:
+                keys = self.weak_keys(item)
+            else:
+                keys = [(self.weak_category, item.get(self.key_field))]
+            for category, key in keys:
+                if category not in counters:
+                    counters[category] = stats.get(category, {})
+                if _is_weak(counters[category].get(key)):
+                    weak.append(position)
+                    break
+        return weak
+
+def _is_weak(data):
+    if not data:
+        return False
+    accuracy, evidence = decayed_accuracy(data.get('decay'))
+    return evidence >= config.ADAPTIVE_MIN_EVIDENCE and accuracy < config.ADAPTIVE_MEDIUM_ACCURACY
+
+def _permute(index, size, seed):
+    """Position of `index` in a pseudo-random permutation of range(size) chosen by `seed`."""
+    half = max(1, ((size - 1).bit_length() + 1) // 2)
+    mask = (1 << half) - 1
+    # The Feistel network permutes range(4 ** half); cycle walking maps its output back
+    # into range(size), which takes fewer than four steps on average.
+    while True:
+        left, right = index >> half, index & mask
+        for round_key in range(4):
+            left, right = right, left ^ (_mix(right, seed, round_key) & mask)
+        index = (left << half) | right
+        if index < size:
+            return index
+
+def _mix(value, seed, round_key):
+    x = ((value + 1) * 0x9E3779B1 ^ (seed + round_key * 0x85EBCA6B)) & 0xFFFFFFFF
+    x = ((x ^ (x >> 15)) * 0x2C1B3C6D) & 0xFFFFFFFF
+    return x ^ (x >> 12)
@@ -1,4 +1,6 @@
 ﻿import time
+from utils.adaptive import decay_update
+from utils import timeseries
 
 class StatsManager:
     def __init__(self, stats_dict):
@@ -49,4 +51,44 @@ class StatsManager:
         
         data['next_review'] = time.time() + wait_time
         
-        self.stats[category][key] = data
\ No newline at end of file
+        self.stats[category][key] = data
+
+
+def get_counter(stats, category, key):
+    """Returns the counter of an item, creating it on first use."""
+    return stats.setdefault(category, {}).setdefault(key, {"correct": 0, "incorrect": 0})
+
+def count_answer(stats, category, key, is_correct):
+    """Updates the lifetime counter of an item and the decayed accuracy of the item and its category."""
+    counter = get_counter(stats, category, key)
+    counter['correct' if is_correct else 'incorrect'] += 1
+    now = time.time()
+    counter['decay'] = decay_update(counter.get('decay'), is_correct, now)
+    category_decay = stats.setdefault('category_decay', {})
+    category_decay[category] = decay_update(category_decay.get(category), is_correct, now)
+    timeseries.record(stats, category, is_correct, now)
+    for hook in _answer_hooks:
+        hook(stats, category, key, is_correct)
+
+# Functions called as hook(stats, category, key, is_correct) after every counted answer.
+_answer_hooks = []
+
+def on_answer_counted(hook):
+    """Registers a hook that is called with (stats, category, key, is_correct) for every answer."""
+    _answer_hooks.append(hook)
+    return hook
+
+# Functions called as hook(stats, points) after every change of total_score.
+_score_hooks = []
+
+def on_score_change(hook):
+    """Registers a hook that is called with (stats, points) on every score update."""
+    _score_hooks.append(hook)
+    return hook
+
+def add_score(stats, points):
+    """Adds points to total_score (never below zero) and notifies the score hooks."""
+    old_score = stats['total_score']
+    stats['total_score'] = max(0, old_score + points)
+    for hook in _score_hooks:
+        hook(stats, stats['total_score'] - old_score)
@@ -0,0 +1,52 @@
+from collections.abc import Mapping
+
+SCHEMA_VERSION = 1
+
+# Maps the version a migration starts from to the function that upgrades
+# the stats dict by exactly one version.
+MIGRATIONS = {}
+
+def migration(from_version):
+    """Registers a function that migrates stats from `from_version` to the next version."""
+    def decorator(func):
+        MIGRATIONS[from_version] = func
+        return func
+    return decorator
+
+def new_stats():
+    """Returns an empty stats structure. Per-item counters are created on first update."""
+    return {"schema_version": SCHEMA_VERSION, "total_score": 0}
+
+def migrate(stats):
+    """
+    Upgrades stats in place to SCHEMA_VERSION.
+    Returns True if anything was changed and the file should be rewritten.
+    """
+    version = stats.get('schema_version', 0)
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"Stats schema version {version} is newer than supported ({SCHEMA_VERSION}).")
+
+    changed = False
+    while version < SCHEMA_VERSION:
+        MIGRATIONS[version](stats)
+        version += 1
+        stats['schema_version'] = version
+        changed = True
+    return changed
+
+def _is_empty_counter(data):
+    return isinstance(data, dict) and set(data) <= {'correct', 'incorrect'} \
+        and not data.get('correct') and not data.get('incorrect')
+
+@migration(0)
+def _drop_zeroed_counters(stats):
+    """v0 -> v1: drops the zero counters that were pre-created for every article and pronoun key."""
+    for category in list(stats):
+        items = stats[category]
+        if not isinstance(items, Mapping):
+            continue
+        for key in [k for k, v in items.items() if _is_empty_counter(v)]:
+            del items[key]
+        if not items:
+            del stats[category]
+    stats.setdefault('total_score', 0)
@@ -0,0 +1,190 @@
+import hashlib
+import json
+from collections.abc import Mapping, MutableMapping
+from pathlib import Path
+import config
+from utils.file_handler import load_json, save_json
+from utils.stats_schema import new_stats, migrate
+from utils.tiered_stats import ColdStore, HotSet, TieredCategory, COLD_FILE, should_tier
+
+HEADER_FILE = 'header.json'
+
+class ShardedStats(MutableMapping):
+    """
+    The stats dict stored as one file per category plus a small header.
+
+    Scalar entries (total_score, schema_version) live in the header, every category
+    (endings, articles, w_fragen, history...) in its own shard file. A shard is read the
+    first time a trainer accesses it, and save() writes only the shards whose content
+    changed since they were read, so both costs follow what the session used.
+    Categories that outgrow STATS_TIER_THRESHOLD items move to the tiered store instead:
+    their items are kept on disk and only the working set (hot_items) stays in memory.
+    """
+    def __init__(self, directory, header=None, hot_items=config.STATS_HOT_ITEMS):
+        self.directory = Path(directory)
+        path = self.directory / HEADER_FILE
+        on_disk = header is None and path.exists()
+        if header is None:
+            header = (load_json(path) if on_disk else None) or new_stats()
+        header = dict(header)
+        self._categories = set(header.pop('categories', []))
+        self._tiered = set(header.pop('tiered', []))
+        self._hot = HotSet(ColdStore(self.directory / COLD_FILE), hot_items)
+        self._views = {}
+        self._header = header
+        self._shards = {}
+        # Digest of every shard as it is on disk; trainers change shards in place,
+        # so a changed digest is how save() finds the dirty ones.
+        self._digests = {}
+        self._header_digest = _digest(self._header_data()) if on_disk else None
+        self._deleted = set()
+
+    def __getitem__(self, key):
+        if key in self._header:
+            return self._header[key]
+        if key in self._tiered:
+            return self._view(key)
+        if key not in self._shards:
+            if key not in self._categories:
+                raise KeyError(key)
+            data = load_json(self._shard_path(key)) or {}
+            if should_tier(data):
+                self._tier(key, data)
+                return self._view(key)
+            self._shards[key] = data
+            self._digests[key] = _digest(data)
+        return self._shards[key]
+
+    def __setitem__(self, key, value):
+        if key in self._tiered:
+            if value is self._views.get(key):
+                return
+            self._untier(key)
+        if isinstance(value, Mapping) and should_tier(value):
+            self._header.pop(key, None)
+            self._drop_shard(key)
+            self._tier(key, value)
+        elif isinstance(value, dict):
+            self._header.pop(key, None)
+            self._shards[key] = value
+            self._categories.add(key)
+            self._deleted.discard(key)
+        else:
+            self._drop_shard(key)
+            self._header[key] = value
+
+    def __delitem__(self, key):
+        if key in self._header:
+            del self._header[key]
+        elif key in self._tiered:
+            self._untier(key)
+        elif key in self._categories:
+            self._drop_shard(key)
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        # Answered from the header, without reading the shard.
+        return key in self._header or key in self._categories or key in self._tiered
+
+    def __iter__(self):
+        yield from list(self._header)
+        yield from sorted(self._categories | self._tiered)
+
+    def __len__(self):
+        return len(self._header) + len(self._categories) + len(self._tiered)
+
+    def setdefault(self, key, default=None):
+        # MutableMapping.setdefault returns `default` itself, which is not the stored
+        # object for a tiered category.
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def cache_info(self):
+        """Hit/miss counters of the in-memory working set of the tiered categories."""
+        return {**self._hot.info(), "tiered": sorted(self._tiered)}
+
+    def save(self):
+        """Writes the changed shards and the header if it changed. Returns the number of files written."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        written = 0
+        for category, data in self._shards.items():
+            digest = _digest(data)
+            if digest != self._digests.get(category):
+                save_json(self._shard_path(category), data)
+                self._digests[category] = digest
+                written += 1
+        # Tiered items are committed before the shards they came from are deleted.
+        written += self._hot.flush()
+        for category in self._deleted:
+            self._shard_path(category).unlink(missing_ok=True)
+        self._deleted.clear()
+
+        header = self._header_data()
+        digest = _digest(header)
+        if digest != self._header_digest:
+            save_json(self.directory / HEADER_FILE, header)
+            self._header_digest = digest
+            written += 1
+        return written
+
+    def _drop_shard(self, key):
+        if key in self._categories:
+            self._categories.discard(key)
+            self._shards.pop(key, None)
+            self._digests.pop(key, None)
+            self._deleted.add(key)
+
+    def _tier(self, key, data):
+        self._tiered.add(key)
+        self._hot.cold.put_many([(key, item, value) for item, value in data.items()])
+        if key in self._categories:
+            # The shard file is deleted on the next save.
+            self._drop_shard(key)
+
+    def _untier(self, key):
+        self._tiered.discard(key)
+        self._views.pop(key, None)
+        self._hot.drop_category(key)
+
+    def _view(self, key):
+        if key not in self._views:
+            self._views[key] = TieredCategory(key, self._hot)
+        return self._views[key]
+
+    def _header_data(self):
+        data = {**self._header, "categories": sorted(self._categories)}
+        if self._tiered:
+            data["tiered"] = sorted(self._tiered)
+        return data
+
+    def _shard_path(self, category):
+        return self.directory / f"{category}.json"
+
+def _digest(data):
+    return hashlib.sha1(json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')).digest()
+
+def load_stats(directory=config.STATS_DIR, legacy_file=config.STATS_FILE):
+    """
+    Opens the sharded stats and brings them to the current schema.
+    A single-file stats file from older versions is split into shards on first use
+    and kept as <name>.bak.
+    """
+    directory = Path(directory)
+    legacy_file = Path(legacy_file)
+    if not (directory / HEADER_FILE).exists() and legacy_file.exists():
+        data = load_json(legacy_file)
+        if data is not None:
+            stats = ShardedStats(directory, header={})
+            for key, value in data.items():
+                stats[key] = value
+            migrate(stats)
+            stats.save()
+            legacy_file.rename(legacy_file.with_name(legacy_file.name + '.bak'))
+            return stats
+
+    stats = ShardedStats(directory)
+    if migrate(stats):
+        stats.save()
+    return stats
@@ -0,0 +1,227 @@
+import argparse
+import time
+import uuid
+from collections.abc import Mapping
+import config
+from utils.file_handler import load_json, save_json
+from utils.stats_store import load_stats
+
+COUNTER_FIELDS = ('correct', 'incorrect')
+# Top-level entries that are kept per device and not merged.
+LOCAL_KEYS = ('history', 'category_decay', 'bags')
+DELTA_FORMAT = 'deutsch-stats-delta'
+
+class SyncState:
+    """
+    CRDT view of the stats file, kept next to it in german_sync.json.
+
+    correct/incorrect are grow-only counters with one component per device, total_score is
+    a counter whose per-device component may also go down, and any other item field
+    (level, next_review...) is a last-writer-wins register. Every component is stamped with
+    the sequence number of the device that wrote it, so the vector clock of a peer tells
+    exactly which components it is missing.
+
+    The trainers keep writing plain totals to the stats dict; the local component of each
+    counter is derived lazily as total minus the components of the other devices.
+    """
+    def __init__(self, data=None):
+        data = data or {}
+        self.device = data.get('device') or uuid.uuid4().hex[:12]
+        self.clock = data.get('clock', {})
+        self.peers = data.get('peers', {})
+        # category -> key -> field -> device -> [value, seq]
+        self.counters = data.get('counters', {})
+        # device -> [value, seq]
+        self.score = data.get('score', {})
+        # category -> key -> field -> [value, timestamp, device, seq]
+        self.registers = data.get('registers', {})
+
+    @classmethod
+    def load(cls, path=config.SYNC_FILE):
+        return cls(load_json(path) if path.exists() else None)
+
+    def save(self, path=config.SYNC_FILE):
+        save_json(path, {
+            "device": self.device, "clock": self.clock, "peers": self.peers,
+            "counters": self.counters, "score": self.score, "registers": self.registers
+        })
+
+    def refresh(self, stats):
+        """
+        Records local activity since the last sync under one new sequence number.
+        Returns True if stats were changed (a counter that went below what was already
+        synced is restored, since grow-only counters cannot shrink).
+        """
+        seq = self.clock.get(self.device, 0) + 1
+        dirty = restored = False
+
+        for category, key, data in _stat_items(stats):
+            for field in COUNTER_FIELDS:
+                components = self.counters.get(category, {}).get(key, {}).get(field, {})
+                own = components.get(self.device, [0, 0])
+                local = data.get(field, 0) - _remote_sum(components, self.device)
+                if local > own[0]:
+                    fields = self.counters.setdefault(category, {}).setdefault(key, {})
+                    fields.setdefault(field, {})[self.device] = [local, seq]
+                    dirty = True
+                elif local < own[0]:
+                    data[field] = _sum(components)
+                    restored = True
+            for field, value in data.items():
+                if field in COUNTER_FIELDS:
+                    continue
+                fields = self.registers.setdefault(category, {}).setdefault(key, {})
+                if field not in fields or fields[field][0] != value:
+                    fields[field] = [value, time.time(), self.device, seq]
+                    dirty = True
+
+        local_score = stats.get('total_score', 0) - _remote_sum(self.score, self.device)
+        if local_score != self.score.get(self.device, [0, 0])[0]:
+            self.score[self.device] = [local_score, seq]
+            dirty = True
+
+        if dirty:
+            self.clock[self.device] = seq
+        return restored
+
+    def export_delta(self, stats, since=None):
+        """Returns the components a peer with vector clock `since` has not seen yet."""
+        self.refresh(stats)
+        since = since or {}
+
+        def is_new(device, seq):
+            return seq > since.get(device, 0)
+
+        counters = {}
+        for category, keys in self.counters.items():
+            for key, fields in keys.items():
+                for field, components in fields.items():
+                    new = {device: c for device, c in components.items() if is_new(device, c[1])}
+                    if new:
+                        counters.setdefault(category, {}).setdefault(key, {})[field] = new
+
+        registers = {}
+        for category, keys in self.registers.items():
+            for key, fields in keys.items():
+                for field, register in fields.items():
+                    if is_new(register[2], register[3]):
+                        registers.setdefault(category, {}).setdefault(key, {})[field] = register
+
+        return {
+            "format": DELTA_FORMAT,
+            "device": self.device,
+            "clock": dict(self.clock),
+            "counters": counters,
+            "score": {device: c for device, c in self.score.items() if is_new(device, c[1])},
+            "registers": registers
+        }
+
+    def apply_delta(self, stats, delta):
+        """
+        Merges a delta into the sync state and writes the merged values back to stats.
+        Merging is idempotent and order-independent, so importing a delta twice is harmless.
+        """
+        if delta.get('format') != DELTA_FORMAT:
+            raise ValueError("Not a stats delta file")
+        self.refresh(stats)
+
+        for category, keys in delta['counters'].items():
+            for key, fields in keys.items():
+                item = stats.setdefault(category, {}).setdefault(key, {"correct": 0, "incorrect": 0})
+                for field, incoming in fields.items():
+                    components = self.counters.setdefault(category, {}).setdefault(key, {}).setdefault(field, {})
+                    for device, component in incoming.items():
+                        if device != self.device and component[1] > components.get(device, [0, 0])[1]:
+                            components[device] = component
+                    item[field] = _sum(components)
+
+        for device, component in delta['score'].items():
+            if device != self.device and component[1] > self.score.get(device, [0, 0])[1]:
+                self.score[device] = component
+        stats['total_score'] = max(0, _sum(self.score))
+
+        for category, keys in delta['registers'].items():
+            for key, fields in keys.items():
+                item = stats.setdefault(category, {}).setdefault(key, {"correct": 0, "incorrect": 0})
+                for field, incoming in fields.items():
+                    current = self.registers.setdefault(category, {}).setdefault(key, {}).get(field)
+                    if current is None or (incoming[1], incoming[2]) > (current[1], current[2]):
+                        self.registers[category][key][field] = incoming
+                        item[field] = incoming[0]
+
+        sender = delta['device']
+        self.clock = _merge_clocks(self.clock, delta['clock'])
+        self.peers[sender] = _merge_clocks(self.peers.get(sender, {}), delta['clock'])
+
+def _stat_items(stats):
+    """Yields (category, key, item) for every per-item entry of the stats dict."""
+    for category, items in stats.items():
+        if category in LOCAL_KEYS or not isinstance(items, Mapping):
+            continue
+        for key, data in items.items():
+            if isinstance(data, dict):
+                yield category, key, data
+
+def _sum(components):
+    return sum(component[0] for component in components.values())
+
+def _remote_sum(components, device):
+    return sum(component[0] for d, component in components.items() if d != device)
+
+def _merge_clocks(a, b):
+    merged = dict(a)
+    for device, seq in b.items():
+        merged[device] = max(merged.get(device, 0), seq)
+    return merged
+
+def main():
+    parser = argparse.ArgumentParser(description="Exchanges stats deltas between devices.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help="write the changes a peer has not seen yet")
+    export.add_argument('delta_file')
+    source = export.add_mutually_exclusive_group()
+    source.add_argument('--peer', help="device id of a peer we have imported from before")
+    source.add_argument('--since', help="clock file written by 'clock' on the other device")
+    imp = commands.add_parser('import', help="merge a delta exported on another device")
+    imp.add_argument('delta_file')
+    clock = commands.add_parser('clock', help="show (or write) this device's vector clock")
+    clock.add_argument('clock_file', nargs='?')
+    args = parser.parse_args()
+
+    state = SyncState.load()
+    stats = load_stats()
+
+    if args.command == 'export':
+        since = {}
+        if args.peer:
+            since = state.peers.get(args.peer, {})
+        elif args.since:
+            since = load_json(args.since)['clock']
+        delta = state.export_delta(stats, since)
+        save_json(args.delta_file, delta)
+        print(f"Exported {_count_components(delta)} changed components from device {state.device} -> {args.delta_file}")
+    elif args.command == 'import':
+        delta = load_json(args.delta_file)
+        if delta is None:
+            return
+        state.apply_delta(stats, delta)
+        print(f"Merged {_count_components(delta)} components from device {delta['device']}")
+    else:
+        state.refresh(stats)
+        if args.clock_file:
+            save_json(args.clock_file, {"device": state.device, "clock": state.clock})
+        print(f"Device {state.device}: {state.clock}")
+
+    stats.save()
+    state.save()
+
+def _count_components(delta):
+    count = len(delta['score'])
+    for section in ('counters', 'registers'):
+        for keys in delta[section].values():
+            for fields in keys.values():
+                count += sum(len(v) if section == 'counters' else 1 for v in fields.values())
+    return count
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import bisect
+import re
+from collections import defaultdict
+
+_WORD_RE = re.compile(r"\w+")
+
+class TextIndex:
+    """
+    Inverted word index plus trigram index over the text of deck items
+    (sentence, answer, translations...). Built once when a deck is loaded,
+    so filtering a session never scans the whole deck.
+    """
+    def __init__(self, items, fields=('sentence', 'answer', 'word', 'noun', 'translation'), extra_text=None):
+        """:param extra_text: функция, возвращающая дополнительный текст элемента (например, перевод)"""
+        self.fields = fields
+        self.extra_text = extra_text
+        self.texts = []
+        self.words = defaultdict(set)
+        self.trigrams = defaultdict(set)
+        self._sorted_words = None
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        """Indexes a new item and returns its position."""
+        position = len(self.texts)
+        text = self._item_text(item)
+        self.texts.append(text)
+        for word in _WORD_RE.findall(text):
+            self.words[word].add(position)
+        for trigram in _trigrams(text):
+            self.trigrams[trigram].add(position)
+        self._sorted_words = None
+        return position
+
+    def replace(self, position, item):
+        """Re-indexes the item at a position after it was changed."""
+        self._unindex(position)
+        text = self._item_text(item)
+        self.texts[position] = text
+        for word in _WORD_RE.findall(text):
+            self.words[word].add(position)
+        for trigram in _trigrams(text):
+            self.trigrams[trigram].add(position)
+
+    def pop(self):
+        """Removes the item at the last position."""
+        self._unindex(len(self.texts) - 1)
+        self.texts.pop()
+
+    def _unindex(self, position):
+        text = self.texts[position]
+        for postings, terms in ((self.words, set(_WORD_RE.findall(text))), (self.trigrams, _trigrams(text))):
+            for term in terms:
+                postings[term].discard(position)
+                if not postings[term]:
+                    del postings[term]
+        self._sorted_words = None
+
+    def search(self, query):
+        """
+        Returns sorted positions of items containing every term of the query.
+        Terms of 3+ characters match anywhere in the text (via trigrams),
+        shorter terms match the beginning of a word.
+        """
+        result = None
+        for term in _WORD_RE.findall(query.lower()):
+            matches = self._match_substring(term) if len(term) >= 3 else self._match_prefix(term)
+            result = matches if result is None else result & matches
+            if not result:
+                return []
+        return sorted(result) if result else []
+
+    def _match_substring(self, term):
+        candidates = None
+        for trigram in _trigrams(term):
+            postings = self.trigrams.get(trigram, set())
+            candidates = set(postings) if candidates is None else candidates & postings
+            if not candidates:
+                return set()
+        # Trigrams can match out of order, so confirm on the (small) candidate set.
+        return {position for position in candidates if term in self.texts[position]}
+
+    def _match_prefix(self, term):
+        if self._sorted_words is None:
+            self._sorted_words = sorted(self.words)
+        matches = set()
+        start = bisect.bisect_left(self._sorted_words, term)
+        for word in self._sorted_words[start:]:
+            if not word.startswith(term):
+                break
+            matches |= self.words[word]
+        return matches
+
+    def _item_text(self, item):
+        parts = []
+        for field in self.fields:
+            value = item.get(field)
+            if isinstance(value, dict):
+                parts.extend(str(v) for v in value.values())
+            elif value:
+                parts.append(str(value))
+        if self.extra_text:
+            parts.append(self.extra_text(item) or '')
+        return " ".join(parts).replace('{blank}', ' ').lower()
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
@@ -0,0 +1,309 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from pathlib import Path
+import config
+
+COLD_FILE = 'items.sqlite'
+
+class ColdStore:
+    """Item counters on disk, one sqlite row per (category, key), so a single item is read without its category."""
+    def __init__(self, path):
+        self.path = Path(path)
+        self._db = None
+
+    @property
+    def db(self):
+        # Opened on first use: most sessions never touch a tiered category.
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # The quiz prefetches questions in a worker thread; HotSet serializes the access.
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS items (
+                    category TEXT NOT NULL, key TEXT NOT NULL, data TEXT NOT NULL,
+                    touched REAL NOT NULL, due REAL,
+                    PRIMARY KEY (category, key)) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS items_touched ON items (touched);
+            """)
+        return self._db
+
+    def get(self, category, key):
+        row = self.db.execute("SELECT data FROM items WHERE category = ? AND key = ?", (category, key)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def keys(self, category):
+        return [key for key, in self.db.execute("SELECT key FROM items WHERE category = ?", (category,))]
+
+    def scan(self, category):
+        cursor = self.db.execute("SELECT key, data FROM items WHERE category = ?", (category,))
+        return ((key, json.loads(data)) for key, data in cursor)
+
+    def put_many(self, entries, now=None):
+        """:param entries: [(category, key, data), ...]"""
+        now = now or time.time()
+        self.db.executemany(
+            "INSERT OR REPLACE INTO items (category, key, data, touched, due) VALUES (?, ?, ?, ?, ?)",
+            [(category, key, json.dumps(data, ensure_ascii=False), now, data.get('next_review'))
+             for category, key, data in entries])
+
+    def delete(self, category, key=None):
+        if key is None:
+            self.db.execute("DELETE FROM items WHERE category = ?", (category,))
+        else:
+            self.db.execute("DELETE FROM items WHERE category = ? AND key = ?", (category, key))
+
+    def warm(self, limit, now=None):
+        """Returns the `limit` items most worth keeping in memory: due for review first, then the most recently used."""
+        return [(category, key, json.loads(data)) for category, key, data in self.db.execute(
+            "SELECT category, key, data FROM items ORDER BY due IS NULL OR due > ?, touched DESC LIMIT ?",
+            (now or time.time(), limit))]
+
+    def commit(self):
+        if self._db is not None:
+            self._db.commit()
+
+class _Item(dict):
+    """An item counter handed out by the hot set; weakly referenced once it is evicted."""
+    __slots__ = ('digest', '__weakref__')
+
+class HotSet:
+    """
+    The working set of item counters shared by all tiered categories: at most `capacity`
+    items in memory, in LRU order. Reading an item that is not in memory faults it in from
+    the cold store (a miss) and evicts the least recently used one. Trainers change items
+    in place, so an evicted item is written back only if its digest changed. A caller may
+    still hold an evicted item and change it later: unchanged evicted items stay reachable
+    through a weak reference, are handed out again instead of a second copy, and are
+    checked once more at flush().
+    """
+    def __init__(self, cold, capacity=config.STATS_HOT_ITEMS):
+        self.cold = cold
+        self.capacity = max(1, capacity)
+        # (category, key) -> [data, digest as loaded, or None for items not yet on disk]
+        self.entries = OrderedDict()
+        self._evicted = {}
+        # Unchanged evicted items that someone still references; their digest is on the item.
+        self._detached = weakref.WeakValueDictionary()
+        self._deleted = set()
+        self._warmed = False
+        self._lock = threading.RLock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, category, key):
+        with self._lock:
+            self._warm()
+            item = (category, key)
+            entry = self.entries.get(item)
+            if entry is not None:
+                self.entries.move_to_end(item)
+                self.hits += 1
+                return entry[0]
+            if item in self._deleted:
+                return None
+            self.misses += 1
+            detached = self._detached.pop(item, None)
+            if item in self._evicted:
+                data, digest = self._evicted.pop(item), None
+            elif detached is not None:
+                data, digest = detached, detached.digest
+            else:
+                data = self.cold.get(category, key)
+                if data is None:
+                    return None
+                data = _Item(data)
+                digest = _digest(data)
+            self._admit(item, data, digest)
+            return data
+
+    def put(self, category, key, data):
+        with self._lock:
+            self._warm()
+            item = (category, key)
+            self._deleted.discard(item)
+            self._evicted.pop(item, None)
+            self._detached.pop(item, None)
+            # A copy, so every item in the set can be weakly referenced.
+            data = _Item(data)
+            self._admit(item, data, None)
+            return data
+
+    def delete(self, category, key):
+        with self._lock:
+            item = (category, key)
+            self.entries.pop(item, None)
+            self._evicted.pop(item, None)
+            self._detached.pop(item, None)
+            self._deleted.add(item)
+
+    def drop_category(self, category):
+        with self._lock:
+            for item in [item for item in list(self.entries) + list(self._evicted) + list(self._detached)
+                         if item[0] == category]:
+                self.entries.pop(item, None)
+                self._evicted.pop(item, None)
+                self._detached.pop(item, None)
+            self._deleted = {item for item in self._deleted if item[0] != category}
+            self.cold.delete(category)
+
+    def keys(self, category):
+        """All keys of a category, in memory or on disk. Does not change the LRU order."""
+        with self._lock:
+            keys = dict.fromkeys(self.cold.keys(category))
+            for item in list(self.entries) + list(self._evicted):
+                if item[0] == category:
+                    keys[item[1]] = None
+            return [key for key in keys if (category, key) not in self._deleted]
+
+    def scan(self, category):
+        """Yields (key, data) of a whole category without bringing the cold items into memory."""
+        with self._lock:
+            self._warm()
+            hot = [(key, entry[0]) for (item_category, key), entry in self.entries.items() if item_category == category]
+            hot += [(key, data) for (item_category, key), data in self._evicted.items() if item_category == category]
+            hot += [(key, data) for (item_category, key), data in list(self._detached.items()) if item_category == category]
+            cold = self.cold.scan(category)
+        seen = set()
+        for key, data in hot:
+            seen.add(key)
+            yield key, data
+        for key, data in cold:
+            if key not in seen and (category, key) not in self._deleted:
+                yield key, data
+
+    def flush(self):
+        """Writes changed and evicted items and commits. Returns the number of items written."""
+        with self._lock:
+            changed = [(category, key, entry[0]) for (category, key), entry in self.entries.items()
+                       if entry[1] is None or _digest(entry[0]) != entry[1]]
+            changed += [(category, key, data) for (category, key), data in self._evicted.items()]
+            detached = [(category, key, data) for (category, key), data in list(self._detached.items())
+                        if _digest(data) != data.digest]
+            changed += detached
+            if changed:
+                self.cold.put_many(changed)
+            for category, key in self._deleted:
+                self.cold.delete(category, key)
+            for category, key, data in changed:
+                entry = self.entries.get((category, key))
+                if entry is not None:
+                    entry[1] = _digest(data)
+            for _, _, data in detached:
+                data.digest = _digest(data)
+            # Written evicted items may still be held by someone, like the unchanged ones.
+            for item, data in self._evicted.items():
+                data.digest = _digest(data)
+                self._detached[item] = data
+            self._evicted.clear()
+            self._deleted.clear()
+            self.cold.commit()
+            return len(changed)
+
+    def info(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self.entries), "capacity": self.capacity}
+
+    def _admit(self, item, data, digest):
+        self.entries[item] = [data, digest]
+        self.entries.move_to_end(item)
+        while len(self.entries) > self.capacity:
+            old_item, (old_data, old_digest) = self.entries.popitem(last=False)
+            self.evictions += 1
+            if old_digest is None or _digest(old_data) != old_digest:
+                self._evicted[old_item] = old_data
+            else:
+                old_data.digest = old_digest
+                self._detached[old_item] = old_data
+        if len(self._evicted) >= self.capacity:
+            # Changed items waiting for the next save are memory too.
+            self.flush()
+
+    def _warm(self):
+        # Items due for review and the ones used last start in memory, so a new session
+        # begins with hits instead of a miss per item.
+        if self._warmed:
+            return
+        self._warmed = True
+        if self.cold.path.exists():
+            for category, key, data in self.cold.warm(self.capacity // 2):
+                self.entries[(category, key)] = [_Item(data), _digest(data)]
+
+class TieredCategory(MutableMapping):
+    """
+    One stats category whose items live in the hot set and the cold store. Indexing,
+    get() and setdefault() return the live item, so in-place changes are saved, also
+    when the item was evicted meanwhile. Assigning stores a copy: change the item read
+    back, not the dict assigned. items() and values() read the category without faulting
+    it into memory; change the items they return through indexing instead.
+    """
+    def __init__(self, category, hot):
+        self.category = category
+        self.hot = hot
+
+    def __getitem__(self, key):
+        data = self.hot.get(self.category, key)
+        if data is None:
+            raise KeyError(key)
+        return data
+
+    def __setitem__(self, key, value):
+        self.hot.put(self.category, key, value)
+
+    def setdefault(self, key, default=None):
+        # MutableMapping.setdefault would return `default`, not the stored copy.
+        data = self.hot.get(self.category, key)
+        if data is None:
+            data = self.hot.put(self.category, key, default)
+        return data
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.hot.delete(self.category, key)
+
+    def __iter__(self):
+        return iter(self.hot.keys(self.category))
+
+    def __len__(self):
+        return len(self.hot.keys(self.category))
+
+    def items(self):
+        return self.hot.scan(self.category)
+
+    def values(self):
+        return (data for _, data in self.hot.scan(self.category))
+
+def should_tier(data, threshold=config.STATS_TIER_THRESHOLD):
+    """A category is tiered once it has more than `threshold` item counters."""
+    return len(data) > threshold and all(isinstance(value, dict) for value in data.values())
+
+def _digest(data):
+    return hashlib.sha1(json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')).digest()
+
+def main():
+    parser = argparse.ArgumentParser(description="Shows how a stats directory is split between the hot and the cold tier.")
+    parser.add_argument('directory', nargs='?', default=str(config.STATS_DIR))
+    args = parser.parse_args()
+
+    path = Path(args.directory) / COLD_FILE
+    if not path.exists():
+        print(f"No cold store in {args.directory}: no category has more than {config.STATS_TIER_THRESHOLD} items.")
+        return
+    cold = ColdStore(path)
+    rows = cold.db.execute("SELECT category, COUNT(*), SUM(LENGTH(data)) FROM items GROUP BY category ORDER BY 2 DESC").fetchall()
+    for category, count, size in rows:
+        print(f"  {category.ljust(24)} {count:>7} items {size / 1024:>8.1f} KiB")
+    total = sum(count for _, count, _ in rows)
+    print(f"{total} items on disk; up to {config.STATS_HOT_ITEMS} are kept in memory "
+          f"({min(total, config.STATS_HOT_ITEMS // 2)} preloaded at start)")
+
+if __name__ == '__main__':
+    main()
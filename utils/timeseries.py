@@ -0,0 +1,94 @@
+import argparse
+import csv
+import sys
+import time
+import config
+from utils.stats_store import load_stats
+
+SPARK_CHARS = ' ▁▂▃▄▅▆▇█'
+# 1970-01-01 was a Thursday; counting buckets from Monday 1970-01-05 makes weeks start on Monday.
+_MONDAY_OFFSET = 4 * 86400
+
+def record(stats, category, is_correct, now=None):
+    """
+    Adds one answer to the current bucket of every tier in stats['history'].
+    Each tier keeps only its last `size` buckets, so older answers survive only in
+    the coarser tiers (hours -> days -> weeks) and the history stays bounded.
+    """
+    now = now or time.time()
+    tiers = stats.setdefault('history', {}).setdefault(category, {})
+    for name, width, size in config.HISTORY_TIERS:
+        buckets = tiers.setdefault(name, {})
+        bucket = str(_bucket_id(now, width))
+        if bucket not in buckets:
+            buckets[bucket] = [0, 0]
+            if len(buckets) > size:
+                _evict(buckets, int(bucket) - size)
+        buckets[bucket][0] += 1
+        if is_correct:
+            buckets[bucket][1] += 1
+
+def series(stats, tier, count, categories=None, now=None):
+    """
+    Returns [(bucket_start, answers, correct), ...] for the last `count` buckets of a tier,
+    oldest first, summed over the given categories (default: all). Empty buckets are included.
+    """
+    width = _tier_width(tier)
+    last = _bucket_id(now or time.time(), width)
+    totals = {bucket: [0, 0] for bucket in range(last - count + 1, last + 1)}
+    for category, tiers in stats.get('history', {}).items():
+        if categories is not None and category not in categories:
+            continue
+        for bucket, (answers, correct) in tiers.get(tier, {}).items():
+            bucket = int(bucket)
+            if bucket in totals:
+                totals[bucket][0] += answers
+                totals[bucket][1] += correct
+    return [(_bucket_start(bucket, width), answers, correct) for bucket, (answers, correct) in totals.items()]
+
+def sparkline(values):
+    """Renders numbers as a row of block characters scaled to the largest value."""
+    top = max(values, default=0)
+    if not top:
+        return SPARK_CHARS[0] * len(values)
+    return ''.join(SPARK_CHARS[round(value / top * (len(SPARK_CHARS) - 1))] for value in values)
+
+def _bucket_id(timestamp, width):
+    # Buckets follow local time, so a "day" ends at local midnight.
+    local = timestamp + time.localtime(timestamp).tm_gmtoff
+    return int((local - _MONDAY_OFFSET) // width)
+
+def _bucket_start(bucket, width):
+    local = bucket * width + _MONDAY_OFFSET
+    return local - time.localtime(local).tm_gmtoff
+
+def _tier_width(tier):
+    for name, width, _ in config.HISTORY_TIERS:
+        if name == tier:
+            return width
+    raise ValueError(f"Unknown history tier: {tier}")
+
+def _evict(buckets, oldest_kept):
+    for bucket in [bucket for bucket in buckets if int(bucket) <= oldest_kept]:
+        del buckets[bucket]
+
+def main():
+    parser = argparse.ArgumentParser(description="Exports the practice history as CSV.")
+    parser.add_argument('--tier', default='day', choices=[name for name, _, _ in config.HISTORY_TIERS])
+    parser.add_argument('--output', help="CSV file (default: stdout)")
+    args = parser.parse_args()
+
+    stats = load_stats()
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    writer = csv.writer(out)
+    writer.writerow(['category', 'start', 'answers', 'correct', 'accuracy'])
+    width = _tier_width(args.tier)
+    for category, tiers in sorted(stats.get('history', {}).items()):
+        for bucket, (answers, correct) in sorted(tiers.get(args.tier, {}).items(), key=lambda item: int(item[0])):
+            start = time.strftime('%Y-%m-%d %H:%M', time.localtime(_bucket_start(int(bucket), width)))
+            writer.writerow([category, start, answers, correct, f"{correct / answers:.3f}"])
+    if args.output:
+        out.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+import threading
+import config
+from utils.file_handler import load_json
+
+_tables = {}
+_lock = threading.Lock()
+
+def get_table(language):
+    """
+    Returns the translation table of one language (corpus -> item id -> text),
+    loading data/translations/<language>.json on first use. Languages that are
+    never asked for are never read.
+    """
+    table = _tables.get(language)
+    if table is None:
+        with _lock:
+            if language not in _tables:
+                path = config.TRANSLATIONS_DIR / f"{language}.json"
+                _tables[language] = (load_json(path) if path.exists() else None) or {}
+            table = _tables[language]
+    return table
+
+def translate(item, corpus, item_id, language):
+    """
+    Returns the translation of an item, or None.
+    Items that still carry an inline "translation" dict (the old data format) use it directly.
+    """
+    inline = item.get('translation')
+    if inline:
+        return inline.get(language)
+    return get_table(language).get(corpus, {}).get(item_id)
@@ -1,10 +1,54 @@
-import subprocess
+import os
 import sys
 
-def clear_screen():
-    """Clears the console screen in a platform-independent way."""
-    command = 'cls' if sys.platform == 'win32' else 'clear'
+CLEAR_SEQUENCE = "\033[H\033[2J\033[3J"
+
+_ansi_supported = None
+
+def supports_ansi():
+    """Checks once whether stdout is a terminal that understands ANSI escape sequences."""
+    global _ansi_supported
+    if _ansi_supported is None:
+        _ansi_supported = _detect_ansi()
+    return _ansi_supported
+
+def _detect_ansi():
+    if not sys.stdout.isatty() or os.environ.get('TERM') == 'dumb':
+        return False
+    if sys.platform != 'win32':
+        return True
     try:
-        subprocess.run(command, shell=True, check=True)
+        # Windows 10+ consoles understand ANSI once virtual terminal processing is enabled.
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        mode = ctypes.c_uint32()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False
+        return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))  # ENABLE_VIRTUAL_TERMINAL_PROCESSING
     except Exception:
-        print("\n" * 100)
\ No newline at end of file
+        return False
+
+def clear_screen():
+    """Clears the console screen with ANSI escape sequences, without spawning a process."""
+    Frame(clear=True).render()
+
+class Frame:
+    """Collects everything shown for one screen or question and writes it with a single flush."""
+    def __init__(self, clear=False):
+        self.clear = clear
+        self.lines = []
+
+    def add(self, *lines):
+        self.lines.extend(lines)
+        return self
+
+    def render(self, end='\n'):
+        """Writes the frame. Dumb terminals and pipes get a blank line instead of the clear sequence."""
+        parts = []
+        if self.clear:
+            parts.append(CLEAR_SEQUENCE if supports_ansi() else "\n")
+        if self.lines:
+            parts.append("\n".join(self.lines) + end)
+        sys.stdout.write("".join(parts))
+        sys.stdout.flush()
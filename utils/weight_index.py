@@ -0,0 +1,46 @@
+import random
+
+class WeightIndex:
+    """
+    Selection weights of the positions 0..n-1 of a deck, kept in a Fenwick tree: changing
+    one weight and drawing a position by weight both cost O(log n), so a weighted draw
+    never looks at every item (or at every counter of the learner).
+    """
+    def __init__(self, weights):
+        self.weights = list(weights)
+        self._tree = [0.0] + self.weights
+        size = len(self.weights)
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                self._tree[parent] += self._tree[i]
+        self.total = sum(self.weights)
+        self._top = 1 << size.bit_length() >> 1 if size else 0
+
+    def __len__(self):
+        return len(self.weights)
+
+    def set(self, position, weight):
+        delta = weight - self.weights[position]
+        if not delta:
+            return
+        self.weights[position] = weight
+        self.total += delta
+        i = position + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def draw(self):
+        """Returns a position with a probability proportional to its weight."""
+        target = random.random() * self.total
+        position = 0
+        step = self._top
+        while step:
+            following = position + step
+            if following < len(self._tree) and self._tree[following] <= target:
+                position = following
+                target -= self._tree[following]
+            step >>= 1
+        # Rounding can leave the target past the last weight.
+        return min(position, len(self.weights) - 1)